@@ -10,7 +10,7 @@ def create_smart_agent(
     vector_db_type: str = "chromadb",
     vector_db_config: Dict[str, Any] = None,
     collection_prefix: str = "user_faq_",
-    embedding_dimension: int = 384,
+    embedding_dimension: Optional[int] = None,
     max_chunks: int = 5,
     agent_id: str = None,
     agent_details: Dict[str, Any] = None,
@@ -18,8 +18,7 @@ def create_smart_agent(
     
     if vector_db_config is None:
         vector_db_config = {}
-    vector_db_layer = VectorDBClientFactory()
-    vector_db = vector_db_layer.get_client(vector_db_type, **vector_db_config)
+    vector_db = VectorDBClientFactory.get_connected_client(vector_db_type, **vector_db_config)
     agent = create_agent(
             llm_provider = agent_details.llm_provider,
             api_key = agent_details.api_key,
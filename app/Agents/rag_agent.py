@@ -1,17 +1,27 @@
 import os
+import asyncio
 from typing import List, Dict, Any, Optional, Tuple, Type
 from pydantic import BaseModel, Field
 import numpy as np
 from opik import track
 
 from app.Agents_services.base_agents import BaseAgent
-from app.vector_db_service.vector_database import DocumentChunk, SearchResult
+from app.vector_db_service.vector_database import DocumentChunk, SearchResult, run_blocking
 from app.vector_db_service.clients.chromadb import ChromaDBClient
+from app.vector_db_service.factory import VectorDBClientFactory
 from app.middleware.database import FAQEntry, SessionLocal
+from app.middleware.logger import logger
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from app.Agents.query_rewrite_agent import QueryRewriteAgent
 from app.Agents.query_expansion import QueryExpansionAgent
+from app.embedding_service.server import get_embedding_server
+from app.embedding_service.registry import get_embedding_dimension
+from app.vector_db_service.compression import StorageSpec
+from app.vector_db_service.indexing import IndexSpec
+from app.vector_db_service.sync import CollectionSync
+from app.search_service.fusion import max_score_fusion
+from app.search_service.hybrid import HybridSearcher, HYBRID_SEARCH
 
 class RAGResponse(BaseModel):
     answer: str = Field(..., description="The answer generated by the RAG agent")
@@ -28,16 +38,23 @@ class ConversationalRAGAgent:
         llm_agent: BaseAgent,
         vector_db_client: Optional[ChromaDBClient] = None,
         collection_prefix: str = "user_faq_",
-        embedding_dimension: int = 384,  # Default for all-MiniLM-L6-v2
-        max_chunks: int = 5
+        embedding_dimension: Optional[int] = None,  # Defaults to the embedding model's dimension
+        max_chunks: int = 5,
+        storage: Optional[StorageSpec] = None,
+        index: Optional[IndexSpec] = None,
+        hybrid: bool = HYBRID_SEARCH
     ):
         self.llm_agent = llm_agent
-        self.vector_db = vector_db_client or ChromaDBClient(persistence_path="./chroma_db")
-        self.vector_db.connect()
+        # Clients come connected from VectorDBClientFactory's shared cache
+        self.vector_db = vector_db_client or VectorDBClientFactory.get_connected_client("chromadb", persistence_path="./chroma_db")
         self.collection_prefix = collection_prefix
-        self.embedding_dimension = embedding_dimension
+        self.embedding_dimension = embedding_dimension or get_embedding_dimension()
         self.max_chunks = max_chunks
+        self.storage = storage
+        self.index = index
         self.db = SessionLocal()
+        # BM25 over the synced FAQ entries, fused with dense results
+        self.searcher = HybridSearcher(self.vector_db, self.db) if hybrid else None
         self.query_rewrite_agent = QueryRewriteAgent(llm_agent)
         self.query_expansion_agent = QueryExpansionAgent(llm_agent)
         
@@ -69,46 +86,35 @@ Remember, you are Nexus Assistant, and your purpose is to help users find inform
         Check if collection exists for user, if not create and populate it from FAQs
         """
         collection_name = f"{self.collection_prefix}{user_id}"
-        # Create collection
-        success = self.vector_db.create_collection(collection_name, self.embedding_dimension)
-        if not success:
-            return False
-            
-        # Get FAQs for user
+        
+        # Get FAQ jobs for user
         from app.middleware.database import FinetuneJob
         fine_tune_jobs = self.db.query(FinetuneJob).filter(FinetuneJob.user_id == user_id).all()
         job_ids = []
         for job in fine_tune_jobs:
             job_ids.extend(job.job_ids.split(","))
-        faqs = self.db.query(FAQEntry).filter(FAQEntry.job_id.in_(job_ids)).all()
+        
+        # Already synced from these jobs and nothing changed: skip loading and hashing every entry
+        sync = CollectionSync(self.db)
+        if sync.is_current(collection_name, job_ids):
+            return True
+        
+        # Create collection
+        success = await run_blocking(self.vector_db.create_collection, collection_name, self.embedding_dimension, self.storage, self.index)
+        if not success:
+            return False
+        
+        faqs = sync.load_entries(job_ids)
         if not faqs:
             return False
             
-        # Convert FAQs to document chunks
-        chunks = []
-        for i, faq in enumerate(faqs):
-            from sentence_transformers import SentenceTransformer
-            model = SentenceTransformer('all-MiniLM-L6-v2')
-            
-            text = f"Q: {faq.question}\nA: {faq.answer}"
-            embedding = model.encode(text).tolist()
-            
-            # Create document chunk
-            chunk = DocumentChunk(
-                id=f"{faq.id}",
-                text=text,
-                embedding=embedding,
-                metadata={
-                    "section": faq.section,
-                    "question": faq.question,
-                    "chunk_index": i
-                }
-            )
-            chunks.append(chunk)
-            
-        # Ingest chunks
-        success = self.vector_db.ingest_documents(collection_name, chunks)
-        return success
+        # Embed and upsert only new or edited FAQs; unchanged collections skip the vector DB entirely
+        try:
+            await run_blocking(sync.sync, self.vector_db, collection_name, job_ids, faqs)
+        except Exception as e:
+            logger.error(f"Failed to sync collection {collection_name}: {e}")
+            return False
+        return True
     
     @track
     async def enhance_query(self, query: str, chat_history: List[Tuple[str, str]] = None) -> List[str]:
@@ -140,30 +146,28 @@ Remember, you are Nexus Assistant, and your purpose is to help users find inform
             return []
         
         enhanced_queries = await self.enhance_query(query, chat_history)
-        from sentence_transformers import SentenceTransformer
-        model = SentenceTransformer('all-MiniLM-L6-v2')
         
-        all_results = []
-        for enhanced_query in enhanced_queries:
-            # Generate embedding for query
-            query_embedding = model.encode(enhanced_query).tolist()
-            
-            # Search for similar chunks
-            results = self.vector_db.search(
-                collection_name=collection_name,
-                query_vector=query_embedding,
-                top_k=self.max_chunks
+        # Encode every query variant in one batched forward pass
+        query_embeddings = await get_embedding_server().encode_many(enhanced_queries)
+        
+        if self.searcher is not None:
+            # Dense and lexical rankings of every variant, fused by rank
+            return await self.searcher.asearch(
+                collection_name,
+                enhanced_queries,
+                np.asarray(query_embeddings, dtype=np.float32),
+                self.max_chunks
             )
-            all_results.extend(results)
-    
-        unique_results = {}
-        for result in all_results:
-            if result.id not in unique_results or result.score > unique_results[result.id].score:
-                unique_results[result.id] = result
-
-        # Sort by score and take top k or Reranking
-        sorted_results = sorted(unique_results.values(), key=lambda x: x.score, reverse=True)
-        return sorted_results[:self.max_chunks]
+        
+        # Search all variants in one batched call without blocking the event loop
+        all_results = await self.vector_db.asearch_batch(
+            collection_name=collection_name,
+            query_vectors=np.asarray(query_embeddings, dtype=np.float32),
+            top_k=self.max_chunks
+        )
+        
+        # Keep each chunk's best score across variants; reranking could go here
+        return max_score_fusion(all_results, self.max_chunks)
     
     @track
     def format_knowledge_chunks(self, chunks: List[SearchResult]) -> str:
@@ -8,7 +8,10 @@ from app.vector_db_service.vector_database import DocumentChunk, SearchResult
 from app.vector_db_service.clients.chromadb import ChromaDBClient
 from app.middleware.database import FAQEntry, SessionLocal
 from sqlalchemy.orm import Session
-from sentence_transformers import SentenceTransformer
+from app.embedding_service.server import get_embedding_server
+from app.embedding_service.registry import get_embedding_dimension
+from app.search_service.fusion import max_score_fusion
+from app.search_service.hybrid import HybridSearcher, HYBRID_SEARCH
 
 class LeadData(BaseModel):
     """Model for lead data that needs to be collected"""
@@ -40,16 +43,18 @@ class SmartConversationAgent:
         self, 
         llm_agent: BaseAgent,
         vector_db_client: Optional[ChromaDBClient] = None,
-        embedding_dimension: int = 384,
-        max_chunks: int = 5
+        embedding_dimension: Optional[int] = None,
+        max_chunks: int = 5,
+        hybrid: bool = HYBRID_SEARCH
     ):
         self.llm_agent = llm_agent
+        # Clients come connected from VectorDBClientFactory's shared cache
         self.vector_db = vector_db_client
-        self.vector_db.connect()
-        self.embedding_dimension = embedding_dimension
+        self.embedding_dimension = embedding_dimension or get_embedding_dimension()
         self.max_chunks = max_chunks
         self.db = SessionLocal()
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        # BM25 over the synced FAQ entries, fused with dense results
+        self.searcher = HybridSearcher(self.vector_db, self.db) if hybrid else None
         self.system_prompt_template = """
 You are Hiring Chatbot, a helpful and empathetic AI assistant.
 Your job is to have a natural conversation with the user while:
@@ -106,20 +111,15 @@ Your final output must be valid JSON with exactly these three fields:
         """
         Search for relevant chunks in the vector database using enhanced queries
         """
-        model = self.embedding_model
-        query_embedding = model.encode(query).tolist()
-        results = self.vector_db.search(
+        query_embedding = await get_embedding_server().encode(query)
+        if self.searcher is not None:
+            return await self.searcher.asearch(collection_name, [query], [query_embedding], self.max_chunks)
+        results = await self.vector_db.asearch(
             collection_name=collection_name,
             query_vector=query_embedding,
             top_k=self.max_chunks
             )
-        unique_results = {}
-        for result in results:
-            if result.id not in unique_results or result.score > unique_results[result.id].score:
-                unique_results[result.id] = result
-                
-        sorted_results = sorted(unique_results.values(), key=lambda x: x.score, reverse=True)
-        return sorted_results[:self.max_chunks]
+        return max_score_fusion([results], self.max_chunks)
     
     @track
     def format_lead_data_to_collect(self, missing_lead_data: Dict[str, str]) -> str:
@@ -36,6 +36,9 @@ async def chat_with_model(request: ChatRequest, db: Session = Depends(get_db)):
         )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except ConnectionError as e:
+        logger.error(f"Vector database unavailable: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Vector database unavailable: {str(e)}")
     except Exception as e:
         logger.error(f"Error chatting with model: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error chatting with model: {str(e)}")
@@ -7,7 +7,7 @@ from datetime import datetime
 from app.middleware.database import get_db, ChatHistory
 from app.Agents_services.factory import create_agent
 from app.Agents.rag_agent import ConversationalRAGAgent
-from app.vector_db_service.clients.chromadb import ChromaDBClient
+from app.vector_db_service.factory import VectorDBClientFactory
 
 router = APIRouter(
     prefix="/rag-chat",
@@ -44,7 +44,8 @@ async def chat_with_rag(
             base_url = ""
         )
         
-        vector_db = ChromaDBClient(
+        vector_db = VectorDBClientFactory.get_connected_client(
+            "chromadb",
             persistence_path="./chroma_db"
         )
         
@@ -101,5 +102,7 @@ async def chat_with_rag(
             timestamp=datetime.now()
         )
         
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=f"Vector database unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error chatting with RAG agent: {str(e)}")
\ No newline at end of file
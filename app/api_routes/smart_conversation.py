@@ -41,6 +41,8 @@ class FAQIngestRequest(BaseModel):
     agent_id: str
     user_id: str
     faq_job_ids: List[str]
+    storage: Optional[Dict[str, Any]] = None
+    index: Optional[Dict[str, Any]] = None
 class FAQIngestResponse(BaseModel):
     job_id: str
     status: Status
@@ -96,6 +98,8 @@ async def chat_with_smart_agent(
             processing_time=processing_time,
             timestamp=datetime.now()
         )
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=f"Vector database unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error chatting with smart agent: {str(e)}")
 
@@ -105,16 +109,30 @@ async def ingest_faqs(
     agent_id: str = Body(...),
     user_id: str = Body(...),
     faq_job_ids: List[str] = Body(...),
+    storage: Optional[Dict[str, Any]] = Body(None),
+    index: Optional[Dict[str, Any]] = Body(None),
     db: Session = Depends(get_db)
 ):
     request = FAQIngestRequest(
         agent_id=agent_id,
         user_id=user_id,
-        faq_job_ids=faq_job_ids
+        faq_job_ids=faq_job_ids,
+        storage=storage,
+        index=index
     )
     """
     Ingest FAQs for a smart agent and create vector database collection
     """
+    from app.vector_db_service.compression import StorageSpec
+    from app.vector_db_service.indexing import IndexSpec
+    try:
+        StorageSpec.from_dict(request.storage)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid storage options: {str(e)}")
+    try:
+        IndexSpec.from_dict(request.index)
+    except (TypeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid index options: {str(e)}")
     try:
         collection_id = str(uuid.uuid4())
         collection_name = f"agent_{request.agent_id}_faqs"
@@ -132,8 +150,7 @@ async def ingest_faqs(
         )
         db.add(collection)
         db.commit()
-        vector_db = VectorDBClientFactory()
-        client = vector_db.get_client(db_type="chromadb", persistence_path="./chroma_db")
+        client = VectorDBClientFactory.get_connected_client("chromadb", persistence_path="./chroma_db")
         background_tasks.add_task(
             process_faq_ingest_background,
             collection_details={
@@ -142,7 +159,9 @@ async def ingest_faqs(
                 "user_id": request.user_id,
                 "faq_job_ids": request.faq_job_ids,
                 "collection_name": collection_name,
-                "vector_db":client
+                "vector_db":client,
+                "storage": request.storage,
+                "index": request.index
             }
         )
         
@@ -153,6 +172,8 @@ async def ingest_faqs(
             created_at=datetime.now(),
             updated_at=datetime.now()
         )
+    except ConnectionError as e:
+        raise HTTPException(status_code=503, detail=f"Vector database unavailable: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting FAQ ingestion job: {str(e)}")
 
@@ -180,52 +201,60 @@ def process_faq_ingest_background(collection_details: Dict):
         if not agent_details:
             raise Exception(f"Smart agent with ID {collection_details['agent_id']} not found")
         from app.middleware.database import FAQEntry
-        faq_entries = db.query(FAQEntry).filter(FAQEntry.job_id.in_(collection_details['faq_job_ids'])).all()
+        from app.vector_db_service.sync import CollectionSync
+        sync = CollectionSync(db)
+        faq_entries = sync.load_entries(collection_details['faq_job_ids'])
         
         if not faq_entries:
             raise Exception(f"No FAQ entries found for the specified job IDs")
         vector_db = collection_details['vector_db']
-        vector_db.connect()
-        from sentence_transformers import SentenceTransformer
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        embedding_dimension = 384  
+        from app.embedding_service.registry import get_embedding_dimension
+        from app.vector_db_service.compression import StorageSpec
+        embedding_dimension = get_embedding_dimension()
+        from app.vector_db_service.indexing import IndexSpec
+        storage = StorageSpec.from_dict(collection_details.get('storage'))
+        index = IndexSpec.from_dict(collection_details.get('index'))
         
-        success = vector_db.create_collection(collection_details['collection_name'], embedding_dimension)
+        success = vector_db.create_collection(collection_details['collection_name'], embedding_dimension, storage, index)
         if not success:
             vector_db.delete_collection(collection_details['collection_name'])
-            success = vector_db.create_collection(collection_details['collection_name'], embedding_dimension)
+            sync.reset(collection_details['collection_name'])
+            success = vector_db.create_collection(collection_details['collection_name'], embedding_dimension, storage, index)
             if not success:
                 raise Exception(f"Failed to create vector database collection {collection_details['collection_name']}")
         
-        from app.vector_db_service.models import DocumentChunk
-        chunks = []
+        from app.embedding_service.sharded import ingest_faqs_sharded, EMBEDDING_SHARDED_MIN_ENTRIES
+        fingerprint = sync.fingerprint(collection_details['faq_job_ids'])
+        sync.backfill_lexical(collection_details['collection_name'], faq_entries)
+        plan = sync.plan(collection_details['collection_name'], faq_entries)
+        pending = len(plan.added) + len(plan.changed)
         
-        for i, faq in enumerate(faq_entries):
-            text = f"Q: {faq.question}\nA: {faq.answer}"
-            embedding = model.encode(text).tolist()
-            
-            chunk = DocumentChunk(
-                id=f"{faq.id}",
-                text=text,
-                embedding=embedding,
-                metadata={
-                    "section": faq.section,
-                    "question": faq.question,
-                    "chunk_index": i
-                }
-            )
-            chunks.append(chunk)
+        def report_progress(ingested: int) -> None:
+            collection.document_count = ingested
+            collection.message = f"Ingested {ingested} of {pending} new or changed FAQ entries"
+            db.commit()
         
-        success = vector_db.ingest_documents(collection_details['collection_name'], chunks)
-        if not success:
-            raise Exception(f"Failed to ingest documents into collection {collection_details['collection_name']}")
+        if pending >= EMBEDDING_SHARDED_MIN_ENTRIES:
+            # Large jobs are spread across a process pool and ingested shard by shard
+            upserts = plan.upserts
+            chunk_indexes = plan.upsert_chunk_indexes()
+            ingest_faqs_sharded(vector_db, collection_details['collection_name'], upserts,
+                                progress=report_progress, chunk_indexes=chunk_indexes)
+            if plan.deleted and not vector_db.delete_documents(collection_details['collection_name'], plan.deleted):
+                raise Exception(f"Failed to delete stale documents from collection {collection_details['collection_name']}")
+            sync.record(collection_details['collection_name'], upserts, plan.deleted, chunk_indexes)
+            sync.remember(collection_details['collection_name'], fingerprint)
+        else:
+            # Re-running an ingest only applies what changed since the last successful run
+            sync.sync(vector_db, collection_details['collection_name'], collection_details['faq_job_ids'], faq_entries, report_progress)
+        document_count = len(faq_entries)
         
         agent_details.collection_name = collection_details['collection_name']
         agent_db.commit()
         
         collection.status = Status.COMPLETED
-        collection.message = f"Successfully ingested {len(chunks)} FAQ entries into collection {collection_details['collection_name']}"
-        collection.document_count = len(chunks)
+        collection.message = f"Successfully ingested {document_count} FAQ entries into collection {collection_details['collection_name']}"
+        collection.document_count = document_count
         collection.completed_at = datetime.now()
         db.commit()
         
@@ -0,0 +1,76 @@
+"""
+Embedding Service - Length-sorted batched encoding for bulk ingestion
+"""
+import os
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+
+from app.embedding_service.registry import get_registry
+from app.middleware.logger import logger
+
+DEFAULT_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+DEFAULT_MAX_BATCH_TOKENS = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "16384"))
+
+
+def plan_batches(lengths: List[int],
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS) -> List[List[int]]:
+    """
+    Group input positions into batches of similar length.
+
+    Positions are sorted by length so each batch pads to a similar size, and a
+    batch is closed when it reaches `batch_size` items or when its padded size
+    (items * longest item) would exceed `max_batch_tokens`.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    current_max = 0
+    for position in order:
+        length = max(lengths[position], 1)
+        padded = (len(current) + 1) * max(current_max, length)
+        if current and (len(current) >= batch_size or padded > max_batch_tokens):
+            batches.append(current)
+            current = []
+            current_max = 0
+        current.append(position)
+        current_max = max(current_max, length)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def encode_batched(texts: List[str],
+                   model_name: Optional[str] = None,
+                   batch_size: int = DEFAULT_BATCH_SIZE,
+                   max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS) -> Tuple[np.ndarray, float]:
+    """
+    Encode many texts in length-sorted batches.
+
+    Returns:
+        The embedding matrix in the original input order and the
+        throughput in texts per second.
+    """
+    if not texts:
+        return np.zeros((0, get_registry().get_dimension(model_name)), dtype=np.float32), 0.0
+
+    registry = get_registry()
+    start_time = time.time()
+
+    lengths = registry.token_lengths(texts, model_name)
+    embeddings = None
+    for batch in plan_batches(lengths, batch_size, max_batch_tokens):
+        batch_embeddings = registry.encode(
+            [texts[i] for i in batch],
+            model_name=model_name,
+            batch_size=len(batch)
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+        embeddings[batch] = batch_embeddings
+
+    elapsed = time.time() - start_time
+    throughput = len(texts) / elapsed if elapsed > 0 else float(len(texts))
+    logger.info(f"Encoded {len(texts)} chunks in {elapsed:.2f}s ({throughput:.1f} chunks/sec)")
+    return embeddings, throughput
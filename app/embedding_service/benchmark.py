@@ -0,0 +1,113 @@
+"""
+Embedding Service - Backend parity check and throughput/memory benchmark
+
+Run with: python -m app.embedding_service.benchmark
+"""
+import gc
+import time
+import resource
+from typing import Dict, List, Optional
+import numpy as np
+
+from app.embedding_service.registry import EmbeddingModelRegistry, DEFAULT_EMBEDDING_MODEL
+
+# Dynamic int8 quantization costs a little more agreement than the fp32 export
+FP32_PARITY_THRESHOLD = 0.99
+INT8_PARITY_THRESHOLD = 0.98
+
+SAMPLE_TEXTS = [
+    "Q: How do I reset my password?\nA: Use the 'Forgot password' link on the login page.",
+    "Q: What is the notice period?\nA: The standard notice period is 60 days.",
+    "Q: Can I work remotely?\nA: Hybrid work is allowed up to three days a week.",
+    "Q: Which documents are needed for onboarding?\nA: ID proof, address proof and previous payslips.",
+    "Q: How are performance reviews conducted?\nA: Reviews happen twice a year with your manager.",
+    "Q: Where can I find the leave policy?\nA: The leave policy is published on the HR portal under Policies.",
+]
+
+
+class ParityError(Exception):
+    """ONNX vectors drifted too far from the SentenceTransformer reference."""
+
+
+def _rss_mb() -> float:
+    """Current resident set size in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _cosine_rows(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Row-wise cosine similarity of two equally shaped matrices."""
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def check_onnx_parity(texts: Optional[List[str]] = None,
+                      model_name: str = DEFAULT_EMBEDDING_MODEL,
+                      quantize: bool = False,
+                      threshold: float = FP32_PARITY_THRESHOLD) -> float:
+    """
+    Compare ONNX vectors against SentenceTransformer vectors.
+
+    Returns the minimum row-wise cosine similarity.
+
+    Raises:
+        ParityError: If it is not above `threshold`
+    """
+    texts = texts or SAMPLE_TEXTS
+    reference = EmbeddingModelRegistry(backend="torch").encode(texts, model_name)
+    candidate = EmbeddingModelRegistry(backend="onnx", onnx_quantize=quantize).encode(texts, model_name)
+    min_cosine = float(_cosine_rows(reference, candidate).min())
+    if not min_cosine > threshold:
+        raise ParityError(f"ONNX{' int8' if quantize else ''} parity {min_cosine:.4f} below {threshold}")
+    return min_cosine
+
+
+def benchmark_backend(backend: str,
+                      texts: List[str],
+                      model_name: str = DEFAULT_EMBEDDING_MODEL,
+                      batch_size: int = 32,
+                      onnx_quantize: bool = False,
+                      onnx_threads: Optional[int] = None) -> Dict[str, float]:
+    """Measure load memory and encode throughput for one backend configuration."""
+    gc.collect()
+    rss_before = _rss_mb()
+    registry = EmbeddingModelRegistry(backend=backend, onnx_quantize=onnx_quantize, onnx_threads=onnx_threads)
+    registry.get_model(model_name)
+    rss_loaded = _rss_mb()
+
+    # Warm up so one-off graph optimisation is not counted
+    registry.encode(texts[:batch_size], model_name, batch_size=batch_size)
+    start_time = time.time()
+    registry.encode(texts, model_name, batch_size=batch_size)
+    elapsed = time.time() - start_time
+
+    return {
+        "texts_per_sec": len(texts) / elapsed if elapsed > 0 else float(len(texts)),
+        "model_rss_mb": rss_loaded - rss_before,
+        "peak_rss_mb": _rss_mb()
+    }
+
+
+def benchmark_backends(num_texts: int = 2000,
+                       model_name: str = DEFAULT_EMBEDDING_MODEL,
+                       onnx_threads: Optional[int] = None) -> Dict[str, Dict[str, float]]:
+    """Benchmark torch, ONNX fp32 and ONNX int8 on the same corpus."""
+    texts = [SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)] + f" ({i})" for i in range(num_texts)]
+    return {
+        "torch": benchmark_backend("torch", texts, model_name),
+        "onnx": benchmark_backend("onnx", texts, model_name, onnx_threads=onnx_threads),
+        "onnx_int8": benchmark_backend("onnx", texts, model_name, onnx_quantize=True, onnx_threads=onnx_threads),
+    }
+
+
+if __name__ == "__main__":
+    print(f"ONNX fp32 parity (min cosine): {check_onnx_parity():.4f}")
+    print(f"ONNX int8 parity (min cosine): {check_onnx_parity(quantize=True, threshold=INT8_PARITY_THRESHOLD):.4f}")
+    for name, stats in benchmark_backends().items():
+        print(f"{name:>10}: {stats['texts_per_sec']:8.1f} texts/sec, "
+              f"model {stats['model_rss_mb']:7.1f} MB, peak RSS {stats['peak_rss_mb']:7.1f} MB")
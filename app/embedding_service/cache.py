@@ -0,0 +1,190 @@
+"""
+Embedding Service - Persistent content-addressed embedding cache
+"""
+import os
+import time
+import hashlib
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+import numpy as np
+
+from app.middleware.logger import logger
+
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "./embedding_cache.db")
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "1000000"))
+# A hit only refreshes last_used once the stored value is older than this many seconds
+EMBEDDING_CACHE_TOUCH_INTERVAL = float(os.getenv("EMBEDDING_CACHE_TOUCH_INTERVAL", "3600"))
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding cache keyed by (model name, model revision, text hash).
+
+    Vectors are stored as float16 blobs in a SQLite table, which halves the
+    footprint of float32 and is far below the precision that matters for
+    cosine retrieval. When the table grows past `max_entries` the least
+    recently used rows are evicted.
+
+    Lookups are read-only: hits whose last_used is older than
+    `touch_interval` are queued and written with the next put_many, so
+    recency is tracked at that granularity without turning every read into
+    a committed write. The row count is kept in memory for the same reason.
+    """
+
+    def __init__(self,
+                 path: str = EMBEDDING_CACHE_PATH,
+                 max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+                 touch_interval: float = EMBEDDING_CACHE_TOUCH_INTERVAL):
+        self.path = path
+        self.max_entries = max_entries
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # Key -> time of a hit whose last_used has not been written yet
+        self._pending_touches: Dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                revision TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings (last_used)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name: str, revision: str, text: str) -> str:
+        """Content address of a text under a specific model and revision."""
+        digest = hashlib.sha256()
+        digest.update(model_name.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(revision.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    def get_many(self, model_name: str, revision: str, texts: List[str]) -> Dict[int, np.ndarray]:
+        """
+        Look up cached embeddings.
+
+        Returns:
+            Mapping from input position to float32 embedding for every hit.
+        """
+        keys = [self.make_key(model_name, revision, text) for text in texts]
+        found = {}
+        now = time.time()
+        with self._lock:
+            # SQLite limits the number of bound parameters per statement
+            for start in range(0, len(keys), 500):
+                batch = list(set(keys[start:start + 500]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector, last_used FROM embeddings WHERE key IN ({placeholders})",
+                    batch
+                ).fetchall()
+                for key, blob, last_used in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+                    if now - last_used > self.touch_interval:
+                        self._pending_touches[key] = now
+
+            results = {i: found[key] for i, key in enumerate(keys) if key in found}
+            self.hits += len(results)
+            self.misses += len(keys) - len(results)
+        return results
+
+    def put_many(self, model_name: str, revision: str, texts: List[str], embeddings: np.ndarray) -> None:
+        """Store embeddings for texts and evict old rows if the cache is over size."""
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (
+                self.make_key(model_name, revision, text),
+                model_name,
+                revision,
+                int(embedding.shape[0]),
+                np.asarray(embedding, dtype=np.float16).tobytes(),
+                now
+            )
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            # A key is a content address, so an existing row already holds this vector
+            cursor = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, model, revision, dimension, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._count += cursor.rowcount
+            if self._pending_touches:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(used, key) for key, used in self._pending_touches.items()]
+                )
+                self._pending_touches.clear()
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Drop the least recently used rows beyond max_entries. Caller holds the lock and commits."""
+        overflow = self._count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN "
+                "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._count -= overflow
+            logger.info(f"Evicted {overflow} entries from embedding cache {self.path}")
+
+    def size(self) -> int:
+        """Number of cached embeddings."""
+        with self._lock:
+            return self._count
+
+    def stats(self) -> Dict[str, float]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            hits, misses, size = self.hits, self.misses, self._count
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": size,
+            "max_entries": self.max_entries
+        }
+
+    def clear(self) -> None:
+        """Remove all cached embeddings and reset counters."""
+        with self._lock:
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self._count = 0
+            self._pending_touches.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Return the process-wide embedding cache, opening it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache()
+    return _cache
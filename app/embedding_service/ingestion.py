@@ -0,0 +1,81 @@
+"""
+Embedding Service - Build DocumentChunks from FAQ entries
+"""
+from typing import List, Optional
+import numpy as np
+
+from app.embedding_service.batching import encode_batched, DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCH_TOKENS
+from app.embedding_service.cache import get_embedding_cache
+from app.embedding_service.registry import get_registry, DEFAULT_EMBEDDING_MODEL
+from app.middleware.logger import logger
+from app.vector_db_service.models import DocumentBatch
+
+
+def faq_to_text(faq) -> str:
+    """Text representation of an FAQ entry used for embedding and retrieval."""
+    return f"Q: {faq.question}\nA: {faq.answer}"
+
+
+def embed_texts(texts: List[str],
+                model_name: Optional[str] = None,
+                batch_size: int = DEFAULT_BATCH_SIZE,
+                max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                use_cache: bool = True) -> np.ndarray:
+    """
+    Embed texts, encoding only those not already in the embedding cache.
+    """
+    if not texts:
+        return np.zeros((0, get_registry().get_dimension(model_name)), dtype=np.float32)
+    if not use_cache:
+        embeddings, _ = encode_batched(texts, model_name, batch_size, max_batch_tokens)
+        return embeddings
+
+    model_name = model_name or DEFAULT_EMBEDDING_MODEL
+    revision = get_registry().get_revision(model_name)
+    cache = get_embedding_cache()
+    cached = cache.get_many(model_name, revision, texts)
+
+    # Encode each distinct unseen text once
+    missing = list(dict.fromkeys(text for i, text in enumerate(texts) if i not in cached))
+    encoded = {}
+    if missing:
+        missing_embeddings, _ = encode_batched(missing, model_name, batch_size, max_batch_tokens)
+        cache.put_many(model_name, revision, missing, missing_embeddings)
+        encoded = dict(zip(missing, missing_embeddings))
+    logger.info(f"Embedding cache: {len(cached)} hits, {len(missing)} texts encoded")
+
+    return np.stack([cached[i] if i in cached else encoded[text] for i, text in enumerate(texts)]).astype(np.float32)
+
+
+def faq_metadata(faq, chunk_index: int) -> dict:
+    """Metadata stored alongside an FAQ chunk."""
+    return {
+        "section": faq.section,
+        "question": faq.question,
+        "chunk_index": chunk_index
+    }
+
+
+def build_faq_chunks(faqs: List,
+                     model_name: Optional[str] = None,
+                     batch_size: int = DEFAULT_BATCH_SIZE,
+                     max_batch_tokens: int = DEFAULT_MAX_BATCH_TOKENS,
+                     use_cache: bool = True,
+                     chunk_indexes: Optional[List[int]] = None) -> DocumentBatch:
+    """
+    Convert FAQEntry rows to a columnar DocumentBatch, encoding uncached texts in batches.
+
+    chunk_indexes gives each entry's position in its full job set, so a
+    partial (diff) ingest numbers chunks the same way a full one does;
+    by default entries are numbered by their position in faqs.
+    """
+    if chunk_indexes is None:
+        chunk_indexes = list(range(len(faqs)))
+    texts = [faq_to_text(faq) for faq in faqs]
+    embeddings = embed_texts(texts, model_name, batch_size, max_batch_tokens, use_cache)
+    return DocumentBatch(
+        ids=[f"{faq.id}" for faq in faqs],
+        texts=texts,
+        embeddings=embeddings,
+        metadatas=[faq_metadata(faq, chunk_index) for faq, chunk_index in zip(faqs, chunk_indexes)]
+    )
@@ -0,0 +1,158 @@
+"""
+Embedding Service - ONNX Runtime CPU backend with optional int8 quantization
+"""
+import os
+import json
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+
+from app.middleware.logger import logger
+
+EMBEDDING_ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "./onnx_models")
+
+
+class ONNXEmbeddingModel:
+    """
+    Sentence embedding model executed with ONNX Runtime.
+
+    The transformer is exported once from the SentenceTransformer checkpoint
+    (and optionally dynamically quantized to int8), then pooled and
+    normalized in NumPy exactly like the SentenceTransformer pipeline. The
+    class mirrors the parts of the SentenceTransformer API the registry uses
+    so the two backends are interchangeable.
+
+    Exports live under EMBEDDING_ONNX_DIR/<model>/<commit>, so pinning a new
+    revision exports a fresh graph instead of serving the old one under the
+    new revision's cache key.
+    """
+
+    def __init__(self,
+                 model_name: str,
+                 revision: Optional[str] = None,
+                 export_dir: str = EMBEDDING_ONNX_DIR,
+                 quantize: bool = False,
+                 intra_op_threads: Optional[int] = None,
+                 commit: Optional[str] = None):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.model_name = model_name
+        self.revision = revision
+        self.quantize = quantize
+        # commit is what the weights are keyed by (see EmbeddingModelRegistry.get_commit)
+        self.commit = commit or revision or "unversioned"
+        self.export_path = Path(export_dir) / model_name.replace("/", "__") / self.commit
+        if not (self.export_path / "config.json").exists():
+            self._export()
+
+        with open(self.export_path / "config.json") as f:
+            config = json.load(f)
+        self.max_seq_length = config["max_seq_length"]
+        self.dimension = config["dimension"]
+        self.normalize = config["normalize"]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.export_path))
+
+        model_file = "model_int8.onnx" if quantize else "model.onnx"
+        if quantize and not (self.export_path / model_file).exists():
+            self._quantize()
+
+        options = ort.SessionOptions()
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(self.export_path / model_file),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def _export(self) -> None:
+        """Export the SentenceTransformer's transformer module to ONNX."""
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        logger.info(f"Exporting {self.model_name} to ONNX at {self.export_path}")
+        os.makedirs(self.export_path, exist_ok=True)
+        st_model = SentenceTransformer(self.model_name, revision=self.revision, device="cpu")
+        transformer = st_model[0].auto_model
+        tokenizer = st_model.tokenizer
+        tokenizer.save_pretrained(str(self.export_path))
+
+        sample = tokenizer(["export sample"], return_tensors="pt")
+        input_names = ["input_ids", "attention_mask"]
+        if "token_type_ids" in sample:
+            input_names.append("token_type_ids")
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+        transformer.eval()
+        with torch.no_grad():
+            torch.onnx.export(
+                transformer,
+                tuple(sample[name] for name in input_names),
+                str(self.export_path / "model.onnx"),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+        normalize = any(type(module).__name__ == "Normalize" for module in st_model)
+        with open(self.export_path / "config.json", "w") as f:
+            json.dump({
+                "model_name": self.model_name,
+                "commit": self.commit,
+                "max_seq_length": st_model.max_seq_length,
+                "dimension": st_model.get_sentence_embedding_dimension(),
+                "normalize": normalize
+            }, f)
+
+    def _quantize(self) -> None:
+        """Dynamically quantize the exported model's weights to int8."""
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        logger.info(f"Quantizing {self.model_name} to int8")
+        quantize_dynamic(
+            str(self.export_path / "model.onnx"),
+            str(self.export_path / "model_int8.onnx"),
+            weight_type=QuantType.QInt8
+        )
+
+    def get_sentence_embedding_dimension(self) -> int:
+        """Embedding dimension, as in SentenceTransformer."""
+        return self.dimension
+
+    def encode(self,
+               texts: Union[str, List[str]],
+               batch_size: int = 32,
+               convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False,
+               show_progress_bar: bool = False) -> np.ndarray:
+        """Encode texts with mean pooling, matching SentenceTransformer.encode."""
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            encoded = self.tokenizer(
+                batch,
+                padding=True,
+                truncation=True,
+                max_length=self.max_seq_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self._input_names if name in encoded}
+            hidden = self.session.run(["last_hidden_state"], feeds)[0]
+
+            mask = encoded["attention_mask"].astype(np.float32)[:, :, None]
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            if self.normalize or normalize_embeddings:
+                pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+            outputs.append(pooled.astype(np.float32))
+
+        embeddings = np.concatenate(outputs, axis=0) if outputs else np.zeros((0, self.dimension), dtype=np.float32)
+        return embeddings[0] if single else embeddings
@@ -0,0 +1,269 @@
+"""
+Embedding Service - Process-wide embedding model registry
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+from typing import Dict, List, Optional, Union
+import numpy as np
+
+from app.middleware.logger import logger
+
+DEFAULT_EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Branch, tag or commit to load; branches and tags are pinned to their current commit
+EMBEDDING_MODEL_REVISION = os.getenv("EMBEDDING_MODEL_REVISION", "main")
+COMMIT_HASH_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+# 'torch' runs SentenceTransformer, 'onnx' runs the exported ONNX Runtime model
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_QUANTIZE = os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true"
+EMBEDDING_ONNX_THREADS = int(os.getenv("EMBEDDING_ONNX_THREADS", "0")) or None
+
+
+def _hub_repo_id(model_name: str) -> str:
+    """Hub repository SentenceTransformer loads for a model name."""
+    # Bare names resolve to the sentence-transformers organisation
+    if "/" in model_name:
+        return model_name
+    return f"sentence-transformers/{model_name}"
+
+
+def _local_fingerprint(path: str) -> str:
+    """Content fingerprint of a model directory from its file names, sizes and mtimes."""
+    digest = hashlib.sha256()
+    for root, _, files in sorted(os.walk(path)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(root, name))
+            digest.update(f"{os.path.relpath(os.path.join(root, name), path)}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return f"local-{digest.hexdigest()[:40]}"
+
+
+def resolve_revision(model_name: str, revision: str = EMBEDDING_MODEL_REVISION) -> str:
+    """
+    Commit hash a branch or tag of a model currently points to.
+
+    Asks the Hub first and falls back to the local snapshot cache when
+    offline; local model directories are fingerprinted instead. If nothing
+    resolves, the unpinned revision is returned with a warning.
+    """
+    if COMMIT_HASH_PATTERN.match(revision):
+        return revision
+    if os.path.isdir(model_name):
+        return _local_fingerprint(model_name)
+
+    repo_id = _hub_repo_id(model_name)
+    try:
+        from huggingface_hub import model_info
+        return model_info(repo_id, revision=revision).sha
+    except Exception as e:
+        hub_error = e
+    try:
+        from huggingface_hub import snapshot_download
+        # Snapshot directories are named after the commit they hold
+        return os.path.basename(snapshot_download(repo_id, revision=revision, local_files_only=True))
+    except Exception:
+        logger.warning(f"Could not resolve revision {revision} of {model_name} to a commit ({hub_error}); "
+                       f"cached embeddings will not notice weight updates")
+        return revision
+
+
+def _read_model_json(model_name: str, revision: Optional[str], filename: str) -> Optional[dict]:
+    """A small JSON file from a model directory or Hub repository, without loading the model."""
+    try:
+        if os.path.isdir(model_name):
+            path = os.path.join(model_name, filename)
+        else:
+            from huggingface_hub import hf_hub_download
+            try:
+                path = hf_hub_download(_hub_repo_id(model_name), filename, revision=revision, local_files_only=True)
+            except Exception:
+                path = hf_hub_download(_hub_repo_id(model_name), filename, revision=revision)
+        with open(path) as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def config_dimension(model_name: str, revision: Optional[str] = None) -> Optional[int]:
+    """
+    Output dimension of a SentenceTransformer read from its module configs:
+    the pooling width times the number of pooling modes, or the last Dense
+    layer's out_features. None when the configs cannot be read.
+    """
+    modules = _read_model_json(model_name, revision, "modules.json")
+    if not modules:
+        return None
+    dimension = None
+    for module in modules:
+        config = _read_model_json(model_name, revision, f"{module['path']}/config.json") if module.get("path") else None
+        if module["type"].endswith("Pooling") and config:
+            modes = sum(1 for key, value in config.items() if key.startswith("pooling_mode_") and value is True)
+            dimension = config["word_embedding_dimension"] * max(1, modes)
+        elif module["type"].endswith("Dense") and config:
+            dimension = config["out_features"]
+    return dimension
+
+
+class EmbeddingModelRegistry:
+    """
+    Loads each embedding model once per process and shares it between threads.
+
+    Loading is guarded by a per-model lock so concurrent first requests do not
+    load duplicate copies of the weights. Inference is serialised per model;
+    the underlying torch runtime already parallelises a single forward pass
+    across CPU cores, so this costs little and keeps shared state safe.
+    """
+
+    def __init__(self,
+                 backend: str = EMBEDDING_BACKEND,
+                 onnx_quantize: bool = EMBEDDING_ONNX_QUANTIZE,
+                 onnx_threads: Optional[int] = EMBEDDING_ONNX_THREADS):
+        self.backend = backend
+        self.onnx_quantize = onnx_quantize
+        self.onnx_threads = onnx_threads
+        self._models: Dict[str, object] = {}
+        self._model_locks: Dict[str, threading.Lock] = {}
+        self._encode_locks: Dict[str, threading.Lock] = {}
+        self._revisions: Dict[str, str] = {}
+        self._dimensions: Dict[str, int] = {}
+        self._revision_locks: Dict[str, threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def _get_lock(self, locks: Dict[str, threading.Lock], model_name: str) -> threading.Lock:
+        """Get or create the lock for a model name."""
+        with self._registry_lock:
+            if model_name not in locks:
+                locks[model_name] = threading.Lock()
+            return locks[model_name]
+
+    def get_model(self, model_name: Optional[str] = None):
+        """Return the shared model instance, loading it on first use."""
+        model_name = model_name or DEFAULT_EMBEDDING_MODEL
+        model = self._models.get(model_name)
+        if model is not None:
+            return model
+
+        with self._get_lock(self._model_locks, model_name):
+            # Another thread may have finished loading while we waited
+            if model_name not in self._models:
+                self._models[model_name] = self._load_model(model_name)
+            return self._models[model_name]
+
+    def _load_model(self, model_name: str):
+        """Instantiate a model with the configured backend, at the commit its cache key names."""
+        revision = self.get_commit(model_name)
+        if not COMMIT_HASH_PATTERN.match(revision):
+            revision = EMBEDDING_MODEL_REVISION if not os.path.isdir(model_name) else None
+        if self.backend == "onnx":
+            from app.embedding_service.onnx_backend import ONNXEmbeddingModel
+            return ONNXEmbeddingModel(
+                model_name,
+                revision=revision,
+                quantize=self.onnx_quantize,
+                intra_op_threads=self.onnx_threads,
+                commit=self.get_commit(model_name)
+            )
+        elif self.backend == "torch":
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name, revision=revision)
+        else:
+            raise ValueError(f"Unsupported embedding backend: {self.backend}")
+
+    def get_commit(self, model_name: Optional[str] = None) -> str:
+        """Commit of the model's weights, resolved once per process without loading the model."""
+        model_name = model_name or DEFAULT_EMBEDDING_MODEL
+        revision = self._revisions.get(model_name)
+        if revision is not None:
+            return revision
+        with self._get_lock(self._revision_locks, model_name):
+            if model_name not in self._revisions:
+                self._revisions[model_name] = resolve_revision(model_name)
+            return self._revisions[model_name]
+
+    def get_revision(self, model_name: Optional[str] = None) -> str:
+        """Revision of the model weights, used to key cached embeddings."""
+        revision = self.get_commit(model_name)
+        # Quantized vectors differ slightly, so they get their own cache namespace
+        if self.backend == "onnx" and self.onnx_quantize:
+            return f"{revision}+onnx-int8"
+        return revision
+
+    def get_dimension(self, model_name: Optional[str] = None) -> int:
+        """
+        Return the embedding dimension of a model.
+
+        Read from the model's config files when it is not loaded yet, so
+        callers that only need the width (e.g. to size a buffer for worker
+        processes) do not pay for loading the weights.
+        """
+        model_name = model_name or DEFAULT_EMBEDDING_MODEL
+        if model_name not in self._models:
+            if model_name not in self._dimensions:
+                revision = self.get_commit(model_name)
+                if not COMMIT_HASH_PATTERN.match(revision):
+                    revision = EMBEDDING_MODEL_REVISION
+                dimension = config_dimension(model_name, revision)
+                if dimension:
+                    self._dimensions[model_name] = dimension
+            if model_name in self._dimensions:
+                return self._dimensions[model_name]
+        return self.get_model(model_name).get_sentence_embedding_dimension()
+
+    def encode(self,
+               texts: Union[str, List[str]],
+               model_name: Optional[str] = None,
+               batch_size: int = 32,
+               normalize_embeddings: bool = False) -> np.ndarray:
+        """
+        Encode one text or a list of texts with a shared model.
+
+        Returns a 1-D array for a single string and a 2-D array otherwise,
+        mirroring SentenceTransformer.encode.
+        """
+        model_name = model_name or DEFAULT_EMBEDDING_MODEL
+        model = self.get_model(model_name)
+        with self._get_lock(self._encode_locks, model_name):
+            return model.encode(
+                texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=normalize_embeddings,
+                show_progress_bar=False
+            )
+
+    def token_lengths(self, texts: List[str], model_name: Optional[str] = None) -> List[int]:
+        """Number of tokens each text occupies after truncation to the model's max length."""
+        model = self.get_model(model_name)
+        tokenized = model.tokenizer(
+            texts,
+            add_special_tokens=True,
+            truncation=True,
+            max_length=model.max_seq_length
+        )
+        return [len(ids) for ids in tokenized["input_ids"]]
+
+    def loaded_models(self) -> List[str]:
+        """Names of the models currently loaded in this process."""
+        return list(self._models.keys())
+
+
+_registry = EmbeddingModelRegistry()
+
+
+def get_registry() -> EmbeddingModelRegistry:
+    """Return the process-wide embedding model registry."""
+    return _registry
+
+
+def encode(texts: Union[str, List[str]],
+           model_name: Optional[str] = None,
+           batch_size: int = 32,
+           normalize_embeddings: bool = False) -> np.ndarray:
+    """Encode texts with the shared model from the process-wide registry."""
+    return _registry.encode(texts, model_name, batch_size, normalize_embeddings)
+
+
+def get_embedding_dimension(model_name: Optional[str] = None) -> int:
+    """Return the embedding dimension of a registered model."""
+    return _registry.get_dimension(model_name)
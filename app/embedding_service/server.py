@@ -0,0 +1,136 @@
+"""
+Embedding Service - Dynamic micro-batching for query-time encoding
+"""
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+import numpy as np
+
+from app.embedding_service.registry import get_registry
+from app.middleware.logger import logger
+
+EMBEDDING_SERVER_MAX_BATCH_SIZE = int(os.getenv("EMBEDDING_SERVER_MAX_BATCH_SIZE", "64"))
+EMBEDDING_SERVER_MAX_WAIT_MS = float(os.getenv("EMBEDDING_SERVER_MAX_WAIT_MS", "5"))
+
+
+class MicroBatchEmbeddingServer:
+    """
+    Coalesces concurrent encode calls into batched forward passes.
+
+    Callers await a per-request future while a single collector task drains
+    the queue: it waits for the first text, then keeps collecting until the
+    batch is full or `max_wait_ms` has passed, and runs the model on a
+    dedicated worker thread so the event loop is never blocked by inference.
+    """
+
+    def __init__(self,
+                 model_name: Optional[str] = None,
+                 max_batch_size: int = EMBEDDING_SERVER_MAX_BATCH_SIZE,
+                 max_wait_ms: float = EMBEDDING_SERVER_MAX_WAIT_MS):
+        self.model_name = model_name
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _ensure_started(self) -> None:
+        """Start the collector task on the running event loop if needed."""
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-worker")
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._task = loop.create_task(self._collect_batches())
+
+    async def encode(self, text: str) -> np.ndarray:
+        """Encode a single text; the call is batched with concurrent callers."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def encode_many(self, texts: List[str]) -> np.ndarray:
+        """Encode several texts, sharing batches with other in-flight requests."""
+        if not texts:
+            return np.zeros((0, get_registry().get_dimension(self.model_name)), dtype=np.float32)
+        embeddings = await asyncio.gather(*(self.encode(text) for text in texts))
+        return np.stack(embeddings)
+
+    async def _collect_batches(self) -> None:
+        """Drain the request queue into batches until cancelled."""
+        while True:
+            batch: List[Tuple[str, asyncio.Future]] = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait_ms / 1000.0
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = await self._loop.run_in_executor(
+                    self._executor,
+                    lambda: get_registry().encode(texts, self.model_name, batch_size=len(texts))
+                )
+                for (_, future), embedding in zip(batch, embeddings):
+                    if not future.done():
+                        future.set_result(embedding)
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} failed: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(RuntimeError("Embedding server stopped"))
+                raise
+
+    async def stop(self) -> None:
+        """
+        Cancel the collector task, fail queued requests and shut the worker
+        thread down once its running batch finishes.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        # Requests still queued would otherwise wait forever
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError("Embedding server stopped"))
+
+        if self._executor is not None:
+            executor, self._executor = self._executor, None
+            await asyncio.get_running_loop().run_in_executor(None, lambda: executor.shutdown(wait=True))
+
+
+_server: Optional[MicroBatchEmbeddingServer] = None
+
+
+def get_embedding_server() -> MicroBatchEmbeddingServer:
+    """Return the process-wide micro-batching embedding server."""
+    global _server
+    if _server is None:
+        _server = MicroBatchEmbeddingServer()
+    return _server
+
+
+async def shutdown_embedding_server() -> None:
+    """Stop the process-wide server, if one was started."""
+    if _server is not None:
+        await _server.stop()
@@ -0,0 +1,152 @@
+"""
+Embedding Service - Multi-process sharded embedding for large ingestion jobs
+"""
+import os
+import time
+import multiprocessing
+from multiprocessing import shared_memory
+from typing import Callable, Iterator, List, Optional, Tuple
+import numpy as np
+
+from app.embedding_service.registry import get_registry, DEFAULT_EMBEDDING_MODEL
+from app.embedding_service.batching import encode_batched, DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCH_TOKENS
+from app.embedding_service.cache import get_embedding_cache
+from app.embedding_service.ingestion import faq_to_text, faq_metadata
+from app.vector_db_service.models import DocumentBatch
+from app.middleware.logger import logger
+
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+EMBEDDING_SHARD_SIZE = int(os.getenv("EMBEDDING_SHARD_SIZE", "1024"))
+EMBEDDING_SHARDED_MIN_ENTRIES = int(os.getenv("EMBEDDING_SHARDED_MIN_ENTRIES", "5000"))
+
+_worker_model_name: Optional[str] = None
+
+
+def _init_worker(model_name: str, intra_op_threads: int) -> None:
+    """Pool initializer: pin thread count and load one model copy per worker."""
+    global _worker_model_name
+    try:
+        import torch
+        torch.set_num_threads(intra_op_threads)
+    except ImportError:
+        pass
+    _worker_model_name = model_name
+    get_registry().get_model(model_name)
+
+
+def _encode_shard(task: Tuple[str, int, int, List[str], int, int]) -> Tuple[int, int]:
+    """
+    Encode one shard and write it straight into the parent's shared matrix.
+
+    Only the row offset and count travel back through the result pipe; the
+    vectors themselves never get pickled.
+    """
+    shm_name, rows, dimension, texts, start, batch_size = task
+    embeddings, _ = encode_batched(texts, _worker_model_name, batch_size, DEFAULT_MAX_BATCH_TOKENS)
+    block = shared_memory.SharedMemory(name=shm_name)
+    matrix = None
+    try:
+        matrix = np.ndarray((rows, dimension), dtype=np.float32, buffer=block.buf)
+        matrix[start:start + len(texts)] = embeddings
+    finally:
+        # The view must be released before the mapping can be closed
+        matrix = None
+        block.close()
+    return start, len(texts)
+
+
+def iter_sharded_embeddings(texts: List[str],
+                            model_name: Optional[str] = None,
+                            num_workers: int = EMBEDDING_WORKERS,
+                            shard_size: int = EMBEDDING_SHARD_SIZE,
+                            batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Tuple[int, np.ndarray]]:
+    """
+    Encode texts across a process pool, yielding shards as they complete.
+
+    Yields:
+        (start offset, embedding matrix) pairs in completion order. Each
+        matrix is a copy, so it stays valid after the shared block is freed.
+    """
+    if not texts:
+        return
+    model_name = model_name or DEFAULT_EMBEDDING_MODEL
+    # Read from the model config; only the workers load the weights
+    dimension = get_registry().get_dimension(model_name)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+
+    block = shared_memory.SharedMemory(create=True, size=len(texts) * dimension * 4)
+    matrix = None
+    try:
+        matrix = np.ndarray((len(texts), dimension), dtype=np.float32, buffer=block.buf)
+        tasks = [
+            (block.name, len(texts), dimension, texts[start:start + shard_size], start, batch_size)
+            for start in range(0, len(texts), shard_size)
+        ]
+        # spawn avoids inheriting torch's thread pools from the parent
+        context = multiprocessing.get_context("spawn")
+        with context.Pool(num_workers, initializer=_init_worker, initargs=(model_name, threads_per_worker)) as pool:
+            for start, count in pool.imap_unordered(_encode_shard, tasks):
+                yield start, matrix[start:start + count].copy()
+    finally:
+        matrix = None
+        block.close()
+        block.unlink()
+
+
+def ingest_faqs_sharded(vector_db,
+                        collection_name: str,
+                        faqs: List,
+                        model_name: Optional[str] = None,
+                        num_workers: int = EMBEDDING_WORKERS,
+                        shard_size: int = EMBEDDING_SHARD_SIZE,
+                        progress: Optional[Callable[[int], None]] = None,
+                        chunk_indexes: Optional[List[int]] = None) -> int:
+    """
+    Embed FAQ entries across worker processes and ingest each shard as it arrives.
+
+    chunk_indexes works as in build_faq_chunks.
+
+    Cached embeddings are ingested first; only cache misses are sent to the
+    pool, and their vectors are added to the cache as shards complete.
+    Shards are streamed through the vector DB's bulk ingestion, so uploads
+    overlap with encoding and are re-cut to the backend's batch size.
+
+    Returns:
+        Number of chunks ingested.
+    """
+    model_name = model_name or DEFAULT_EMBEDDING_MODEL
+    revision = get_registry().get_revision(model_name)
+    cache = get_embedding_cache()
+    start_time = time.time()
+
+    texts = [faq_to_text(faq) for faq in faqs]
+    if chunk_indexes is None:
+        chunk_indexes = list(range(len(faqs)))
+
+    def make_batch(positions: List[int], embeddings: np.ndarray) -> DocumentBatch:
+        return DocumentBatch(
+            ids=[f"{faqs[i].id}" for i in positions],
+            texts=[texts[i] for i in positions],
+            embeddings=embeddings,
+            metadatas=[faq_metadata(faqs[i], chunk_indexes[i]) for i in positions]
+        )
+
+    cached = cache.get_many(model_name, revision, texts)
+
+    def shards() -> Iterator[DocumentBatch]:
+        if cached:
+            positions = list(cached.keys())
+            yield make_batch(positions, np.stack([cached[i] for i in positions]))
+
+        missing = [i for i in range(len(texts)) if i not in cached]
+        missing_texts = [texts[i] for i in missing]
+        for start, embeddings in iter_sharded_embeddings(missing_texts, model_name, num_workers, shard_size):
+            cache.put_many(model_name, revision, missing_texts[start:start + len(embeddings)], embeddings)
+            yield make_batch(missing[start:start + len(embeddings)], embeddings)
+
+    ingested = vector_db.ingest_stream(collection_name, shards(), progress)
+
+    elapsed = time.time() - start_time
+    logger.info(f"Sharded ingestion of {ingested} chunks into {collection_name} with {num_workers} workers "
+                f"took {elapsed:.2f}s ({ingested / elapsed if elapsed > 0 else ingested:.1f} chunks/sec)")
+    return ingested
@@ -12,7 +12,7 @@ from app.middleware.database import FinetuneJob, ChatHistory
 from app.middleware.models import FinetuneStatus, FinetuneType, FinetuneRequest, FinetuneResponse
 from app.Agents_services.factory import create_agent
 from app.Agents.rag_agent import ConversationalRAGAgent
-from app.vector_db_service.clients.chromadb import ChromaDBClient
+from app.vector_db_service.factory import VectorDBClientFactory
 class FinetuneService:
     def __init__(self, db: Session):
         """
@@ -243,7 +243,8 @@ class FinetuneService:
                     model = 'gemini-2.0-flash',
                     base_url = "https://generativelanguage.googleapis.com/v1beta/openai/"
                     )
-                vector_db = ChromaDBClient(
+                vector_db = VectorDBClientFactory.get_connected_client(
+                    "chromadb",
                     persistence_path="./chroma_db"
                     )
                 rag_agent = ConversationalRAGAgent(
@@ -1,5 +1,5 @@
 # Set up database connection
-from sqlalchemy import create_engine, Column, String, DateTime, Integer, Text, ForeignKey
+from sqlalchemy import create_engine, Column, String, DateTime, Integer, Text, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from sqlalchemy.sql import func
@@ -84,6 +84,33 @@ class Collection(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
     completed_at = Column(DateTime, nullable=True)
 
+class CollectionSyncEntry(Base):
+    __tablename__ = "collection_sync_entries"
+
+    collection_name = Column(String, primary_key=True)
+    entry_id = Column(String, primary_key=True)
+    content_hash = Column(String, nullable=False)
+    chunk_index = Column(Integer, nullable=True)
+    synced_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)
+
+class LexicalDocument(Base):
+    __tablename__ = "lexical_documents"
+
+    collection_name = Column(String, primary_key=True)
+    entry_id = Column(String, primary_key=True)
+    length = Column(Integer, nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+
+class LexicalPosting(Base):
+    __tablename__ = "lexical_postings"
+
+    collection_name = Column(String, primary_key=True)
+    term = Column(String, primary_key=True)
+    entry_id = Column(String, primary_key=True)
+    term_frequency = Column(Integer, nullable=False)
+
+    __table_args__ = (Index("ix_lexical_postings_entry", "collection_name", "entry_id"),)
+
 Base.metadata.create_all(bind=engine)
 
 def get_db():
@@ -0,0 +1,56 @@
+"""
+Search Service - Result fusion across multiple query variants
+"""
+import os
+from typing import List
+import numpy as np
+
+from app.vector_db_service.models import SearchResult
+
+# Rank offset of reciprocal-rank fusion; larger values flatten the gap between top ranks
+RRF_K = int(os.getenv("RRF_K", "60"))
+
+
+def max_score_fusion(result_lists: List[List[SearchResult]], top_k: int) -> List[SearchResult]:
+    """
+    Merge result lists keeping each document's best score.
+
+    Scores are ranked once with argsort and the first (best) occurrence of
+    every id is selected with np.unique, instead of a per-result dict loop.
+    """
+    flat = [result for results in result_lists for result in results]
+    if not flat:
+        return []
+
+    ids = np.array([str(result.id) for result in flat])
+    scores = np.array([result.score for result in flat], dtype=np.float32)
+
+    order = np.argsort(-scores, kind="stable")
+    _, first = np.unique(ids[order], return_index=True)
+    best = order[first]
+    best = best[np.argsort(-scores[best], kind="stable")][:top_k]
+    return [flat[i] for i in best]
+
+
+def reciprocal_rank_fusion(result_lists: List[List[SearchResult]], top_k: int, k: int = RRF_K) -> List[SearchResult]:
+    """
+    Merge ranked lists by summing 1 / (k + rank) for every list a document appears in.
+
+    Only ranks are used, so lists scored on different scales (cosine
+    similarity, BM25) can be fused. The first occurrence of each id supplies
+    its text and metadata; the returned score is the fused one.
+    """
+    flat = [result for results in result_lists for result in results]
+    if not flat:
+        return []
+
+    ids = np.array([str(result.id) for result in flat])
+    ranks = np.array([rank for results in result_lists for rank in range(1, len(results) + 1)], dtype=np.float64)
+
+    unique_ids, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    fused = np.bincount(inverse, weights=1.0 / (k + ranks))
+    best = np.argsort(-fused, kind="stable")[:top_k]
+    return [
+        SearchResult(id=flat[first[i]].id, text=flat[first[i]].text, score=float(fused[i]), metadata=flat[first[i]].metadata)
+        for i in best
+    ]
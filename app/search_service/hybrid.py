@@ -0,0 +1,67 @@
+"""
+Search Service - Hybrid dense + BM25 retrieval
+"""
+import asyncio
+import os
+from typing import List, Union
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.middleware.database import SessionLocal
+from app.search_service.fusion import reciprocal_rank_fusion
+from app.search_service.lexical import LexicalIndex
+from app.vector_db_service.models import SearchResult, Vector
+from app.vector_db_service.vector_database import VectorDatabaseClient, run_blocking
+
+# Off by default; agents can also opt in individually with hybrid=True
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "false").lower() == "true"
+# Candidates taken from each ranked list per requested result before fusion
+HYBRID_CANDIDATE_FACTOR = int(os.getenv("HYBRID_CANDIDATE_FACTOR", "4"))
+
+
+class HybridSearcher:
+    """
+    Searches a collection densely and lexically and fuses the rankings with
+    reciprocal-rank fusion.
+
+    Dense search finds paraphrases; BM25 finds exact product names and codes
+    the embedding blurs. Every query variant contributes one dense and one
+    lexical list to the fusion.
+    """
+
+    def __init__(self, vector_db: VectorDatabaseClient, db: Session):
+        self.vector_db = vector_db
+        self.lexical = LexicalIndex(db)
+
+    def search(self,
+               collection_name: str,
+               queries: List[str],
+               query_vectors: Union[np.ndarray, List[Vector]],
+               top_k: int) -> List[SearchResult]:
+        """Fused top_k for query texts and their embeddings (one row per query)."""
+        depth = top_k * HYBRID_CANDIDATE_FACTOR
+        dense = self.vector_db.search_batch(collection_name, np.atleast_2d(query_vectors), depth)
+        lexical = self.lexical.search_many(collection_name, queries, depth)
+        # Dense lists go first so their metadata wins for documents found both ways
+        return reciprocal_rank_fusion(dense + lexical, top_k)
+
+    async def asearch(self,
+                      collection_name: str,
+                      queries: List[str],
+                      query_vectors: Union[np.ndarray, List[Vector]],
+                      top_k: int) -> List[SearchResult]:
+        """Like search, running the dense and lexical halves concurrently off the event loop."""
+        depth = top_k * HYBRID_CANDIDATE_FACTOR
+        dense, lexical = await asyncio.gather(
+            self.vector_db.asearch_batch(collection_name, np.atleast_2d(query_vectors), depth),
+            run_blocking(self._lexical_search_in_worker, collection_name, queries, depth)
+        )
+        return reciprocal_rank_fusion(dense + lexical, top_k)
+
+    def _lexical_search_in_worker(self, collection_name: str, queries: List[str], depth: int) -> List[List[SearchResult]]:
+        """BM25 search on a pool thread, which needs its own session: the caller's is not thread-safe."""
+        db = SessionLocal()
+        try:
+            return LexicalIndex(db, self.lexical.k1, self.lexical.b).search_many(collection_name, queries, depth)
+        finally:
+            db.close()
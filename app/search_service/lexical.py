@@ -0,0 +1,204 @@
+"""
+Search Service - BM25 inverted index over FAQ entries
+"""
+import os
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.middleware.database import FAQEntry, LexicalDocument, LexicalPosting
+from app.vector_db_service.models import SearchResult
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Words joined by - _ . / (product names, codes, versions) are kept whole and also split
+TOKEN_PATTERN = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+TOKEN_SEPARATORS = re.compile(r"[-_./]")
+# Too common to rank on; dropping them keeps the postings for a query small
+STOPWORDS = frozenset("""
+a an and are as at be but by can do does for from how i if in is it its me my of on or
+our so that the their there this to was we what when where which who why will with you your
+""".split())
+# Keep IN (...) lists under SQLite's host parameter limit
+SQLITE_MAX_PARAMS = 900
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word and code tokens, without stopwords."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall((text or "").lower()):
+        parts = TOKEN_SEPARATORS.split(token)
+        if len(parts) > 1:
+            tokens.append(token)
+        tokens.extend(parts)
+    return [token for token in tokens if token not in STOPWORDS]
+
+
+def faq_terms(faq) -> Counter:
+    """Term frequencies of an FAQ entry's question and answer."""
+    return Counter(tokenize(faq.question) + tokenize(faq.answer))
+
+
+class LexicalIndex:
+    """
+    BM25 index of FAQ entries, one per collection, kept in the application
+    database next to the collection's sync state.
+
+    Entries are (re)indexed as they are synced, so the index grows
+    incrementally with the vector collection. Writes are left for the
+    caller to commit.
+    """
+
+    def __init__(self, db: Session, k1: float = BM25_K1, b: float = BM25_B):
+        self.db = db
+        self.k1 = k1
+        self.b = b
+
+    def has_collection(self, collection_name: str) -> bool:
+        return self.db.query(LexicalDocument.entry_id).filter(
+            LexicalDocument.collection_name == collection_name
+        ).first() is not None
+
+    def update(self, collection_name: str, faqs: List, chunk_indexes: Optional[List[int]] = None) -> None:
+        """
+        Index new or edited entries, replacing their previous postings.
+
+        chunk_indexes works as in build_faq_chunks; the stored value is
+        returned in the metadata of lexical hits.
+        """
+        if chunk_indexes is None:
+            chunk_indexes = list(range(len(faqs)))
+        entries = list({str(faq.id): (faq, chunk_index) for faq, chunk_index in zip(faqs, chunk_indexes)}.values())
+        if not entries:
+            return
+        self.remove(collection_name, [str(faq.id) for faq, _ in entries])
+
+        documents, postings = [], []
+        for faq, chunk_index in entries:
+            entry_id = str(faq.id)
+            terms = faq_terms(faq)
+            documents.append({
+                "collection_name": collection_name,
+                "entry_id": entry_id,
+                "length": sum(terms.values()),
+                "chunk_index": chunk_index
+            })
+            postings.extend(
+                {"collection_name": collection_name, "term": term, "entry_id": entry_id, "term_frequency": count}
+                for term, count in terms.items()
+            )
+        self.db.bulk_insert_mappings(LexicalDocument, documents)
+        self.db.bulk_insert_mappings(LexicalPosting, postings)
+
+    def remove(self, collection_name: str, entry_ids: List[str]) -> None:
+        for start in range(0, len(entry_ids), SQLITE_MAX_PARAMS):
+            chunk = entry_ids[start:start + SQLITE_MAX_PARAMS]
+            for model in (LexicalPosting, LexicalDocument):
+                self.db.query(model).filter(
+                    model.collection_name == collection_name,
+                    model.entry_id.in_(chunk)
+                ).delete(synchronize_session=False)
+
+    def reset(self, collection_name: str) -> None:
+        for model in (LexicalPosting, LexicalDocument):
+            self.db.query(model).filter(model.collection_name == collection_name).delete(synchronize_session=False)
+
+    def _stats(self, collection_name: str) -> Tuple[int, float]:
+        count, average_length = self.db.query(
+            func.count(LexicalDocument.entry_id), func.avg(LexicalDocument.length)
+        ).filter(LexicalDocument.collection_name == collection_name).one()
+        return count or 0, float(average_length or 0.0)
+
+    def _scores(self, collection_name: str, terms: List[str], count: int, average_length: float) -> Tuple[np.ndarray, np.ndarray]:
+        """BM25 score of every entry containing at least one of the terms."""
+        rows = (
+            self.db.query(LexicalPosting.term, LexicalPosting.entry_id, LexicalPosting.term_frequency, LexicalDocument.length)
+            .join(LexicalDocument, (LexicalDocument.collection_name == LexicalPosting.collection_name)
+                  & (LexicalDocument.entry_id == LexicalPosting.entry_id))
+            .filter(LexicalPosting.collection_name == collection_name, LexicalPosting.term.in_(terms))
+            .all()
+        )
+        if not rows:
+            return np.array([], dtype=object), np.array([], dtype=np.float64)
+
+        row_terms = np.array([row[0] for row in rows], dtype=object)
+        entry_ids = np.array([row[1] for row in rows], dtype=object)
+        tf = np.array([row[2] for row in rows], dtype=np.float64)
+        lengths = np.array([row[3] for row in rows], dtype=np.float64)
+
+        # Document frequency of each term is the number of postings returned for it
+        _, term_index, df = np.unique(row_terms, return_inverse=True, return_counts=True)
+        idf = np.log(1.0 + (count - df + 0.5) / (df + 0.5))
+        norm = self.k1 * (1.0 - self.b + self.b * lengths / max(average_length, 1e-9))
+        contributions = idf[term_index] * tf * (self.k1 + 1.0) / (tf + norm)
+
+        ids, entry_index = np.unique(entry_ids, return_inverse=True)
+        return ids, np.bincount(entry_index, weights=contributions)
+
+    def search(self, collection_name: str, query: str, top_k: int) -> List[SearchResult]:
+        """Top entries for a query by BM25."""
+        return self.search_many(collection_name, [query], top_k)[0]
+
+    def search_many(self, collection_name: str, queries: List[str], top_k: int) -> List[List[SearchResult]]:
+        """Top entries for each query by BM25, with text and metadata loaded for the hits only."""
+        count, average_length = self._stats(collection_name)
+        ranked: List[List[Tuple[str, float]]] = []
+        for query in queries:
+            terms = list(dict.fromkeys(tokenize(query)))
+            if not count or not terms or top_k <= 0:
+                ranked.append([])
+                continue
+            ids, scores = self._scores(collection_name, terms, count, average_length)
+            if len(ids) > top_k:
+                top = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                top = np.arange(len(ids))
+            top = top[np.argsort(-scores[top], kind="stable")]
+            ranked.append([(ids[i], float(scores[i])) for i in top])
+
+        hit_ids = {entry_id for hits in ranked for entry_id, _ in hits}
+        entries = self._load_entries(hit_ids)
+        chunk_indexes = self._load_chunk_indexes(collection_name, hit_ids)
+        return [
+            [
+                self._to_result(entries[entry_id], score, chunk_indexes.get(entry_id, -1))
+                for entry_id, score in hits if entry_id in entries
+            ]
+            for hits in ranked
+        ]
+
+    def _load_chunk_indexes(self, collection_name: str, entry_ids) -> Dict[str, int]:
+        entry_ids = list(entry_ids)
+        chunk_indexes = {}
+        for start in range(0, len(entry_ids), SQLITE_MAX_PARAMS):
+            rows = (
+                self.db.query(LexicalDocument.entry_id, LexicalDocument.chunk_index)
+                .filter(LexicalDocument.collection_name == collection_name,
+                        LexicalDocument.entry_id.in_(entry_ids[start:start + SQLITE_MAX_PARAMS]))
+                .all()
+            )
+            chunk_indexes.update(dict(rows))
+        return chunk_indexes
+
+    def _load_entries(self, entry_ids) -> Dict[str, object]:
+        # Entry ids are FAQEntry primary keys (see build_faq_chunks)
+        keys = [int(entry_id) for entry_id in entry_ids if str(entry_id).isdigit()]
+        entries = {}
+        for start in range(0, len(keys), SQLITE_MAX_PARAMS):
+            rows = (
+                self.db.query(FAQEntry.id, FAQEntry.section, FAQEntry.question, FAQEntry.answer)
+                .filter(FAQEntry.id.in_(keys[start:start + SQLITE_MAX_PARAMS]))
+                .all()
+            )
+            entries.update({str(row.id): row for row in rows})
+        return entries
+
+    @staticmethod
+    def _to_result(faq, score: float, chunk_index: int) -> SearchResult:
+        from app.embedding_service.ingestion import faq_to_text, faq_metadata
+
+        return SearchResult(id=str(faq.id), text=faq_to_text(faq), score=score, metadata=faq_metadata(faq, chunk_index))
@@ -0,0 +1,310 @@
+"""
+Vector Database Service - Retrieval quality and cost measurements
+
+Run with: python -m app.vector_db_service.benchmark
+
+Set WEAVIATE_BENCHMARK_URL (e.g. http://localhost:8080 for
+docker run -p 8080:8080 semitechnologies/weaviate) to include the
+Weaviate ingest measurement.
+"""
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+
+from app.vector_db_service.models import DocumentBatch
+from app.vector_db_service.compression import StorageSpec
+from app.vector_db_service.indexing import IndexSpec
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    """Ground-truth neighbour positions by exact cosine similarity."""
+    scores = _normalized(queries) @ _normalized(vectors).T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def synthetic_embeddings(num_vectors: int, dimension: int = 384, num_clusters: int = 50, seed: int = 0) -> np.ndarray:
+    """Clustered random vectors that roughly mimic sentence-embedding structure."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(num_clusters, dimension))
+    assignments = rng.integers(0, num_clusters, size=num_vectors)
+    return _normalized(centers[assignments] + 0.5 * rng.normal(size=(num_vectors, dimension)))
+
+
+def measure_storage_recall(vectors: np.ndarray,
+                           queries: np.ndarray,
+                           specs: Optional[Dict[str, StorageSpec]] = None,
+                           k: int = 10) -> List[Dict[str, float]]:
+    """
+    Recall@k and memory for each storage spec, using the FAISS client.
+
+    Returns one row per spec with recall@k, raw vector bytes and the size
+    of the persisted index file.
+    """
+    from app.vector_db_service.clients.faiss import FAISSDBClient
+
+    dimension = vectors.shape[1]
+    specs = specs or {
+        "float32": StorageSpec(),
+        "truncate_256": StorageSpec(dimension=256, reduction="truncate"),
+        "pca_128": StorageSpec(dimension=128, reduction="pca"),
+        "int8": StorageSpec(quantization="int8"),
+        "binary": StorageSpec(quantization="binary", rescore_factor=10),
+        "pca_256_int8": StorageSpec(dimension=256, reduction="pca", quantization="int8"),
+    }
+    truth = exact_top_k(vectors, queries, k)
+    batch = DocumentBatch(
+        ids=[str(i) for i in range(len(vectors))],
+        texts=[""] * len(vectors),
+        embeddings=np.asarray(vectors, dtype=np.float32)
+    )
+
+    rows = []
+    with tempfile.TemporaryDirectory() as storage_path:
+        client = FAISSDBClient(storage_path=storage_path)
+        client.connect()
+        for name, spec in specs.items():
+            client.create_collection(name, dimension, spec)
+            client.ingest_documents(name, batch)
+
+            hits = 0
+            for query, expected in zip(queries, truth):
+                found = {int(result.id) for result in client.search(name, query, top_k=k)}
+                hits += len(found & set(expected.tolist()))
+
+            index_bytes = sum(f.stat().st_size for f in (Path(storage_path) / name).rglob("*") if f.is_file())
+            rows.append({
+                "spec": name,
+                f"recall@{k}": hits / (len(queries) * k),
+                "vector_bytes": spec.bytes_per_vector(dimension) * len(vectors),
+                "disk_bytes": index_bytes
+            })
+    return rows
+
+
+def measure_index_recall(vectors: np.ndarray,
+                         queries: np.ndarray,
+                         specs: Optional[Dict[str, IndexSpec]] = None,
+                         k: int = 10) -> List[Dict[str, float]]:
+    """
+    Recall@k and per-query latency for each ANN index spec, using the FAISS client.
+
+    Specs should set a low train_threshold so the ANN index is actually
+    built for the corpus size being measured.
+    """
+    from app.vector_db_service.clients.faiss import FAISSDBClient
+
+    dimension = vectors.shape[1]
+    nlist = max(16, int(np.sqrt(len(vectors))))
+    specs = specs or {
+        "flat": IndexSpec(),
+        "hnsw": IndexSpec("hnsw", m=32, ef_search=64, train_threshold=0),
+        "ivf_flat": IndexSpec("ivf_flat", nlist=nlist, nprobe=16, train_threshold=0),
+        "ivf_pq": IndexSpec("ivf_pq", nlist=nlist, nprobe=16, pq_m=dimension // 8, train_threshold=0),
+    }
+    truth = exact_top_k(vectors, queries, k)
+    batch = DocumentBatch(
+        ids=[str(i) for i in range(len(vectors))],
+        texts=[""] * len(vectors),
+        embeddings=np.asarray(vectors, dtype=np.float32)
+    )
+
+    rows = []
+    with tempfile.TemporaryDirectory() as storage_path:
+        client = FAISSDBClient(storage_path=storage_path)
+        client.connect()
+        for name, spec in specs.items():
+            client.create_collection(name, dimension, index=spec)
+            client.ingest_documents(name, batch)
+            client.rebuild_index(name)
+
+            hits = 0
+            start = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                found = {int(result.id) for result in client.search(name, query, top_k=k)}
+                hits += len(found & set(expected.tolist()))
+            elapsed = time.perf_counter() - start
+
+            rows.append({
+                "index": name,
+                f"recall@{k}": hits / (len(queries) * k),
+                "ms_per_query": 1000 * elapsed / len(queries)
+            })
+    return rows
+
+
+def measure_batch_speedup(vectors: np.ndarray,
+                          queries: np.ndarray,
+                          batch_size: int = 8,
+                          k: int = 10) -> Dict[str, float]:
+    """
+    Latency of search_batch against looping search() over the same queries,
+    using the FAISS client.
+
+    Queries are sent in groups of batch_size, the shape of one RAG turn's
+    rewritten and expanded query variants.
+    """
+    from app.vector_db_service.clients.faiss import FAISSDBClient
+
+    dimension = vectors.shape[1]
+    batch = DocumentBatch(
+        ids=[str(i) for i in range(len(vectors))],
+        texts=[""] * len(vectors),
+        embeddings=np.asarray(vectors, dtype=np.float32)
+    )
+    groups = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+
+    with tempfile.TemporaryDirectory() as storage_path:
+        client = FAISSDBClient(storage_path=storage_path)
+        client.connect()
+        client.create_collection("batch", dimension)
+        client.ingest_documents("batch", batch)
+
+        start = time.perf_counter()
+        for group in groups:
+            for query in group:
+                client.search("batch", query, top_k=k)
+        loop_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for group in groups:
+            client.search_batch("batch", group, top_k=k)
+        batch_elapsed = time.perf_counter() - start
+
+    return {
+        "batch_size": batch_size,
+        "loop_ms_per_batch": 1000 * loop_elapsed / len(groups),
+        "batch_ms_per_batch": 1000 * batch_elapsed / len(groups),
+        "speedup": loop_elapsed / batch_elapsed
+    }
+
+
+def measure_memory_latency(vectors: np.ndarray,
+                           queries: np.ndarray,
+                           batch_size: int = 8,
+                           k: int = 10) -> List[Dict[str, float]]:
+    """
+    Per-query search latency of the in-process NumPy backend against an
+    embedded ChromaDB collection holding the same vectors, single and batched.
+    """
+    from app.vector_db_service.clients.memory import MemoryDBClient
+    from app.vector_db_service.clients.chromadb import ChromaDBClient
+
+    dimension = vectors.shape[1]
+    batch = DocumentBatch(
+        ids=[str(i) for i in range(len(vectors))],
+        texts=[""] * len(vectors),
+        embeddings=np.asarray(vectors, dtype=np.float32),
+        metadatas=[{"chunk_index": i} for i in range(len(vectors))]
+    )
+    groups = [queries[i:i + batch_size] for i in range(0, len(queries), batch_size)]
+
+    rows = []
+    with tempfile.TemporaryDirectory() as persistence_path:
+        for name, client in (("memory", MemoryDBClient(persistence_path=f"{persistence_path}/memory")),
+                             ("chromadb", ChromaDBClient(persistence_path=f"{persistence_path}/chroma"))):
+            client.connect()
+            client.create_collection("latency", dimension)
+            client.ingest_stream("latency", [batch])
+
+            start = time.perf_counter()
+            for query in queries:
+                client.search("latency", query, top_k=k)
+            single_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for group in groups:
+                client.search_batch("latency", group, top_k=k)
+            batch_elapsed = time.perf_counter() - start
+            client.close()
+
+            rows.append({
+                "backend": name,
+                "ms_per_query": 1000 * single_elapsed / len(queries),
+                "batched_ms_per_query": 1000 * batch_elapsed / len(queries)
+            })
+    return rows
+
+
+def measure_weaviate_ingest(url: str,
+                            vectors: np.ndarray,
+                            queries: np.ndarray,
+                            k: int = 10) -> List[Dict[str, float]]:
+    """
+    Ingest throughput and filtered search latency against a running Weaviate,
+    comparing fixed single-worker batches of 100 with dynamic multi-worker
+    batching. Each configuration writes to its own, afterwards deleted, class.
+    """
+    from urllib.parse import urlparse
+    from app.vector_db_service.clients.weaviate import WeaviateDBClient, WEAVIATE_BATCH_WORKERS
+
+    parsed = urlparse(url)
+    dimension = vectors.shape[1]
+    batch = DocumentBatch(
+        # Weaviate object ids must be UUIDs
+        ids=[str(uuid.UUID(int=i + 1)) for i in range(len(vectors))],
+        texts=[f"chunk {i}" for i in range(len(vectors))],
+        embeddings=np.asarray(vectors, dtype=np.float32),
+        metadatas=[{"section": f"s{i % 20}", "chunk_index": i} for i in range(len(vectors))]
+    )
+
+    configs = [
+        ("fixed-100x1", dict(batch_size=100, batch_workers=1, dynamic_batching=False)),
+        (f"dynamic-x{WEAVIATE_BATCH_WORKERS}", dict(batch_workers=WEAVIATE_BATCH_WORKERS, dynamic_batching=True)),
+    ]
+    rows = []
+    for name, config in configs:
+        client = WeaviateDBClient(host=parsed.hostname, port=parsed.port or 8080, http_host=url, **config)
+        if not client.connect():
+            raise ConnectionError(f"Could not connect to Weaviate at {url}")
+        collection = f"bench_{name.replace('-', '_')}"
+        client.delete_collection(collection)
+        client.create_collection(collection, dimension)
+        try:
+            start = time.perf_counter()
+            client.ingest_stream(collection, [batch])
+            ingest_elapsed = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for query in queries:
+                client.search(collection, query, top_k=k, filters={"section": "s3"})
+            search_elapsed = time.perf_counter() - start
+        finally:
+            client.delete_collection(collection)
+            client.close()
+
+        rows.append({
+            "config": name,
+            "docs_per_second": len(vectors) / ingest_elapsed,
+            "filtered_ms_per_query": 1000 * search_elapsed / len(queries)
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    corpus = synthetic_embeddings(20000)
+    sample = synthetic_embeddings(200, seed=1)
+    for row in measure_storage_recall(corpus, sample):
+        print(f"{row['spec']:>14}: recall@10 {row['recall@10']:.3f}, "
+              f"vectors {row['vector_bytes'] / 1e6:7.2f} MB, on disk {row['disk_bytes'] / 1e6:7.2f} MB")
+    for row in measure_index_recall(corpus, sample):
+        print(f"{row['index']:>14}: recall@10 {row['recall@10']:.3f}, {row['ms_per_query']:.3f} ms/query")
+    speedup = measure_batch_speedup(corpus, sample)
+    print(f"  search_batch: {speedup['batch_ms_per_batch']:.3f} ms vs {speedup['loop_ms_per_batch']:.3f} ms looped "
+          f"per {speedup['batch_size']} queries ({speedup['speedup']:.2f}x)")
+    for row in measure_memory_latency(synthetic_embeddings(5000), sample):
+        print(f"{row['backend']:>14}: {row['ms_per_query']:.3f} ms/query, "
+              f"{row['batched_ms_per_query']:.3f} ms/query batched")
+    weaviate_url = os.getenv("WEAVIATE_BENCHMARK_URL")
+    if weaviate_url:
+        for row in measure_weaviate_ingest(weaviate_url, corpus, sample):
+            print(f"{row['config']:>14}: {row['docs_per_second']:.0f} docs/s ingest, "
+                  f"{row['filtered_ms_per_query']:.3f} ms/filtered query")
@@ -0,0 +1,159 @@
+"""
+Vector Database Service - Streaming bulk ingestion
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator, List, Optional, Union
+import numpy as np
+
+from app.vector_db_service.models import DocumentChunk, DocumentBatch
+from app.middleware.logger import logger
+
+# Zero means use the backend's own ingest_batch_size / ingest_concurrency
+VECTOR_DB_INGEST_BATCH_SIZE = int(os.getenv("VECTOR_DB_INGEST_BATCH_SIZE", "0"))
+VECTOR_DB_INGEST_CONCURRENCY = int(os.getenv("VECTOR_DB_INGEST_CONCURRENCY", "0"))
+VECTOR_DB_INGEST_RETRIES = int(os.getenv("VECTOR_DB_INGEST_RETRIES", "3"))
+VECTOR_DB_INGEST_RETRY_BACKOFF = float(os.getenv("VECTOR_DB_INGEST_RETRY_BACKOFF", "0.5"))
+
+Documents = Iterable[Union[DocumentChunk, DocumentBatch]]
+
+
+def _as_batches(documents: Documents, group_size: int) -> Iterator[DocumentBatch]:
+    """Pass batches through and stack runs of loose chunks into batches."""
+    chunks: List[DocumentChunk] = []
+    for item in documents:
+        if isinstance(item, DocumentBatch):
+            if chunks:
+                yield DocumentBatch.from_documents(chunks)
+                chunks = []
+            if len(item):
+                yield item
+        else:
+            chunks.append(item)
+            if len(chunks) >= group_size:
+                yield DocumentBatch.from_documents(chunks)
+                chunks = []
+    if chunks:
+        yield DocumentBatch.from_documents(chunks)
+
+
+def _row_bytes(batch: DocumentBatch) -> np.ndarray:
+    """Approximate request bytes per row: vector, text and metadata."""
+    vector_bytes = batch.embeddings.shape[1] * 4
+    return np.array([
+        vector_bytes + len(text) + len(str(metadata))
+        for text, metadata in zip(batch.texts, batch.metadatas)
+    ], dtype=np.int64)
+
+
+def _concat(pieces: List[DocumentBatch]) -> DocumentBatch:
+    if len(pieces) == 1:
+        return pieces[0]
+    return DocumentBatch(
+        ids=[doc_id for piece in pieces for doc_id in piece.ids],
+        texts=[text for piece in pieces for text in piece.texts],
+        embeddings=np.concatenate([piece.float32() for piece in pieces]),
+        metadatas=[metadata for piece in pieces for metadata in piece.metadatas]
+    )
+
+
+def iter_batches(documents: Documents, batch_size: int, max_bytes: int) -> Iterator[DocumentBatch]:
+    """
+    Re-cut a stream of chunks and batches into upload batches.
+
+    Each batch holds at most batch_size rows and, estimated, max_bytes of
+    request payload; a single row larger than max_bytes is sent on its own.
+    Input is consumed lazily, so only one batch is buffered at a time.
+    """
+    pending: List[DocumentBatch] = []
+    rows = size = 0
+    for batch in _as_batches(documents, batch_size):
+        row_bytes = _row_bytes(batch)
+        start = 0
+        while start < len(batch):
+            fits_bytes = int(np.searchsorted(np.cumsum(row_bytes[start:]), max_bytes - size, side="right"))
+            take = min(batch_size - rows, fits_bytes, len(batch) - start)
+            if take == 0 and rows == 0:
+                take = 1
+            if take > 0:
+                pending.append(batch.slice(start, start + take))
+                rows += take
+                size += int(row_bytes[start:start + take].sum())
+                start += take
+            if take == 0 or rows >= batch_size:
+                yield _concat(pending)
+                pending, rows, size = [], 0, 0
+    if pending:
+        yield _concat(pending)
+
+
+def _upsert_with_retry(vector_db, collection_name: str, batch: DocumentBatch, max_retries: int) -> int:
+    """Upsert one batch, retrying with exponential backoff; returns rows written."""
+    for attempt in range(max_retries + 1):
+        if vector_db.upsert(collection_name, batch):
+            return len(batch)
+        if attempt < max_retries:
+            delay = VECTOR_DB_INGEST_RETRY_BACKOFF * (2 ** attempt)
+            logger.warning(f"Upsert of {len(batch)} rows into {collection_name} failed, "
+                           f"retrying in {delay:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(delay)
+    raise Exception(f"Failed to upsert batch of {len(batch)} rows starting at id {batch.ids[0]} "
+                    f"into {collection_name} after {max_retries + 1} attempts")
+
+
+def ingest_stream(vector_db,
+                  collection_name: str,
+                  documents: Documents,
+                  batch_size: Optional[int] = None,
+                  max_in_flight: Optional[int] = None,
+                  max_retries: int = VECTOR_DB_INGEST_RETRIES,
+                  progress: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Upsert a stream of chunks and batches in backend-sized, concurrent batches.
+
+    Batches are cut to the client's ingest_batch_size and
+    ingest_max_batch_bytes, and at most max_in_flight upserts run at once
+    so memory stays bounded however long the stream is. A failed batch is
+    retried on its own; if it still fails, no further batches are sent and
+    the error is raised once the running upserts finish.
+
+    Args:
+        progress: Called from the calling thread with the running row count
+            after each batch lands
+
+    Returns:
+        Number of rows upserted.
+    """
+    batch_size = batch_size or VECTOR_DB_INGEST_BATCH_SIZE or vector_db.ingest_batch_size
+    max_in_flight = max_in_flight or VECTOR_DB_INGEST_CONCURRENCY or vector_db.ingest_concurrency
+    start_time = time.time()
+
+    ingested = 0
+    in_flight = set()
+
+    def collect() -> None:
+        nonlocal ingested, in_flight
+        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            ingested += future.result()
+            if progress is not None:
+                progress(ingested)
+
+    with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="vector-db-ingest") as executor:
+        try:
+            for batch in iter_batches(documents, batch_size, vector_db.ingest_max_batch_bytes):
+                if len(in_flight) >= max_in_flight:
+                    collect()
+                in_flight.add(executor.submit(_upsert_with_retry, vector_db, collection_name, batch, max_retries))
+            while in_flight:
+                collect()
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+    elapsed = time.time() - start_time
+    logger.info(f"Streamed {ingested} rows into {collection_name} in batches of up to {batch_size} "
+                f"with {max_in_flight} in flight, took {elapsed:.2f}s")
+    return ingested
@@ -1,16 +1,24 @@
 """
 ChromaDB Vector Database Client Implementation
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
 import chromadb
 from chromadb.config import Settings
 from chromadb.utils import embedding_functions
 
-from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, SearchResult
+from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, DocumentBatch, SearchResult, Vector
+from app.vector_db_service.compression import StorageSpec, VectorProjector
+from app.vector_db_service.indexing import IndexSpec
 
 class ChromaDBClient(VectorDatabaseClient):
     """Client for ChromaDB vector database."""
     
+    # Chroma rejects upserts above its max_batch_size (5461 rows by default);
+    # the embedded client serializes writes on SQLite, so few uploads overlap
+    ingest_batch_size = 5000
+    ingest_concurrency = 2
+    
     def __init__(self, 
                 host: str = 'localhost', 
                 port: int = 8000, 
@@ -22,6 +30,8 @@ class ChromaDBClient(VectorDatabaseClient):
         self.http_mode = http_mode
         self._client = None
         self._collections = {}
+        self._async_client = None
+        self._async_collections = {}
     
     def connect(self) -> bool:
         """Establish connection to ChromaDB."""
@@ -45,8 +55,34 @@ class ChromaDBClient(VectorDatabaseClient):
             print(f"Failed to connect to ChromaDB: {e}")
             return False
     
-    def create_collection(self, collection_name: str, dimension: int) -> bool:
+    def health_check(self) -> bool:
+        """Check the client still answers a heartbeat."""
+        try:
+            return self._client is not None and bool(self._client.heartbeat())
+        except Exception:
+            return False
+    
+    def close(self) -> None:
+        """Drop the client and cached collection handles."""
+        self._client = None
+        self._collections.clear()
+        self._async_client = None
+        self._async_collections.clear()
+    
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
         """Create a new collection in ChromaDB."""
+        # Chroma's HNSW index only stores float32, so only truncation can be applied client-side
+        if storage is not None and (storage.reduction == "pca" or storage.quantization != "none" or storage.on_disk):
+            print(f"ChromaDB only supports truncated storage dimensions, not {storage}")
+            return False
+        # Chroma always builds HNSW; only its graph parameters can be tuned
+        if index is not None and index.index_type not in ("flat", "hnsw"):
+            print(f"ChromaDB only supports HNSW indexes, not {index}")
+            return False
         try:
             try:
                 collection = self._client.get_collection(name=collection_name)
@@ -54,9 +90,22 @@ class ChromaDBClient(VectorDatabaseClient):
                 return True
             except Exception:
                 # Collection doesn't exist, create it
+                spec = storage or StorageSpec()
+                metadata = {
+                    "dimension": dimension,
+                    "storage_dimension": spec.stored_dimension(dimension),
+                    "storage_reduction": spec.reduction,
+                    "storage_quantization": spec.quantization
+                }
+                if index is not None and index.index_type == "hnsw":
+                    metadata.update({
+                        "hnsw:M": index.m,
+                        "hnsw:construction_ef": index.ef_construction,
+                        "hnsw:search_ef": index.ef_search
+                    })
                 collection = self._client.get_or_create_collection(
                     name=collection_name,
-                    metadata={"dimension": dimension}
+                    metadata=metadata
                 )
                 self._collections[collection_name] = collection
                 return True
@@ -70,6 +119,7 @@ class ChromaDBClient(VectorDatabaseClient):
             self._client.delete_collection(name=collection_name)
             if collection_name in self._collections:
                 del self._collections[collection_name]
+            self._async_collections.pop(collection_name, None)
             return True
         except Exception as e:
             print(f"Failed to delete collection {collection_name}: {e}")
@@ -87,22 +137,19 @@ class ChromaDBClient(VectorDatabaseClient):
     def ingest_documents(
         self, 
         collection_name: str, 
-        documents: List[DocumentChunk]) -> bool:
+        documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
         """Ingest multiple document chunks into ChromaDB."""
         try:
             collection = self._get_collection(collection_name)
+            batch = DocumentBatch.from_documents(documents)
             
-            ids = [doc.id for doc in documents]
-            embeddings = [doc.embedding for doc in documents]
-            texts = [doc.text for doc in documents]
-            metadatas = [doc.metadata for doc in documents]
-            
-            # ChromaDB requires unique IDs, so we use upsert to handle duplicates
+            # ChromaDB requires unique IDs, so we use upsert to handle duplicates.
+            # The embedding matrix is passed as a NumPy array without per-row conversion.
             collection.upsert(
-                ids=ids,
-                embeddings=embeddings,
-                documents=texts,
-                metadatas=metadatas
+                ids=batch.ids,
+                embeddings=self._project(self.get_storage_spec(collection_name), batch.float32()),
+                documents=batch.texts,
+                metadatas=batch.metadatas
             )
             print(f"Total documents in {collection_name}: {self.count_documents(collection_name)}")
             return True
@@ -110,13 +157,33 @@ class ChromaDBClient(VectorDatabaseClient):
             print(f"Failed to ingest documents into {collection_name}: {e}")
             return False
     
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """Delete documents by id from ChromaDB."""
+        try:
+            if ids:
+                self._get_collection(collection_name).delete(ids=list(ids))
+            return True
+        except Exception as e:
+            print(f"Failed to delete documents from {collection_name}: {e}")
+            return False
+    
     def search(
         self, 
         collection_name: str,
-        query_vector: List[float],
+        query_vector: Vector,
         top_k: int = 10,
         filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
         """Search for similar vectors in ChromaDB."""
+        results = self.search_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters)
+        return results[0] if results else []
+    
+    def search_batch(
+        self,
+        collection_name: str,
+        query_vectors: Union[np.ndarray, List[Vector]],
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Search with all queries in one multi-embedding ChromaDB query."""
         try:
             collection = self._get_collection(collection_name)
             
@@ -124,36 +191,67 @@ class ChromaDBClient(VectorDatabaseClient):
             where_clause = filters if filters else None
             
             results = collection.query(
-                query_embeddings=[query_vector],
+                query_embeddings=self._project(
+                    self.get_storage_spec(collection_name), np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+                ),
                 n_results=top_k,
                 where=where_clause
             )
             
-            search_results = []
-            
-            # Process results
-            if results["ids"] and len(results["ids"][0]) > 0:
-                for i in range(len(results["ids"][0])):
-                    doc_id = results["ids"][0][i]
-                    text = results["documents"][0][i] if results.get("documents") else ""
-                    metadata = results["metadatas"][0][i] if results.get("metadatas") else {}
-                    distance = results["distances"][0][i] if results.get("distances") else 0.0
-                    
-                    # ChromaDB returns distance, but we want similarity (1 - distance)
-                    score = 1.0 - distance
-                    
-                    search_results.append(SearchResult(
-                        id=doc_id,
-                        text=text,
-                        score=score,
-                        metadata=metadata
-                    ))
-            
-            return search_results
+            return self._to_results(results)
         except Exception as e:
             print(f"Failed to search in {collection_name}: {e}")
             return []
     
+    def _to_results(self, results: Dict[str, Any]) -> List[List[SearchResult]]:
+        batch_results = []
+        
+        # Process results, one row per query
+        for row, ids in enumerate(results["ids"] or []):
+            search_results = []
+            for i in range(len(ids)):
+                doc_id = ids[i]
+                text = results["documents"][row][i] if results.get("documents") else ""
+                metadata = results["metadatas"][row][i] if results.get("metadatas") else {}
+                distance = results["distances"][row][i] if results.get("distances") else 0.0
+                
+                # ChromaDB returns distance, but we want similarity (1 - distance)
+                score = 1.0 - distance
+                
+                search_results.append(SearchResult(
+                    id=doc_id,
+                    text=text,
+                    score=score,
+                    metadata=metadata
+                ))
+            batch_results.append(search_results)
+        
+        return batch_results
+    
+    @staticmethod
+    def _spec_from_metadata(metadata: Optional[Dict[str, Any]]) -> StorageSpec:
+        metadata = metadata or {}
+        if metadata.get("storage_reduction", "none") == "none":
+            return StorageSpec()
+        return StorageSpec(
+            dimension=metadata["storage_dimension"],
+            reduction=metadata["storage_reduction"]
+        )
+    
+    def get_storage_spec(self, collection_name: str) -> Optional[StorageSpec]:
+        """Storage spec recorded in the collection metadata."""
+        try:
+            return self._spec_from_metadata(self._get_collection(collection_name).metadata)
+        except Exception as e:
+            print(f"Failed to read storage spec for {collection_name}: {e}")
+            return None
+    
+    def _project(self, spec: Optional[StorageSpec], vectors: np.ndarray) -> np.ndarray:
+        """Truncate vectors to the collection's stored dimension if one was configured."""
+        if spec is None or spec.is_default():
+            return vectors
+        return VectorProjector(spec, vectors.shape[1]).transform(vectors)
+    
     def count_documents(self, collection_name: str) -> int:
         """Count the number of documents in a collection."""
         try:
@@ -161,4 +259,84 @@ class ChromaDBClient(VectorDatabaseClient):
             return collection.count()
         except Exception as e:
             print(f"Failed to count documents in {collection_name}: {e}")
-            return 0
\ No newline at end of file
+            return 0
+    
+    async def _get_async_collection(self, collection_name: str):
+        """Collection handle on Chroma's async HTTP client."""
+        if collection_name not in self._async_collections:
+            if self._async_client is None:
+                self._async_client = await chromadb.AsyncHttpClient(host=self.host, port=self.port)
+            try:
+                self._async_collections[collection_name] = await self._async_client.get_collection(name=collection_name)
+            except Exception as e:
+                raise ValueError(f"Collection {collection_name} not found: {e}")
+        return self._async_collections[collection_name]
+    
+    # Only the HTTP server has an async client; the embedded PersistentClient
+    # falls back to the shared thread pool in the base class.
+    
+    async def aingest_documents(
+        self,
+        collection_name: str,
+        documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest documents through Chroma's async HTTP client."""
+        if not self.http_mode:
+            return await super().aingest_documents(collection_name, documents)
+        try:
+            collection = await self._get_async_collection(collection_name)
+            batch = DocumentBatch.from_documents(documents)
+            await collection.upsert(
+                ids=batch.ids,
+                embeddings=self._project(self._spec_from_metadata(collection.metadata), batch.float32()),
+                documents=batch.texts,
+                metadatas=batch.metadatas
+            )
+            return True
+        except Exception as e:
+            print(f"Failed to ingest documents into {collection_name}: {e}")
+            return False
+    
+    async def asearch(
+        self,
+        collection_name: str,
+        query_vector: Vector,
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
+        """Search through Chroma's async HTTP client."""
+        results = await self.asearch_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters)
+        return results[0] if results else []
+    
+    async def asearch_batch(
+        self,
+        collection_name: str,
+        query_vectors: Union[np.ndarray, List[Vector]],
+        top_k: int = 10,
+        filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Batched search through Chroma's async HTTP client."""
+        if not self.http_mode:
+            return await super().asearch_batch(collection_name, query_vectors, top_k, filters)
+        try:
+            collection = await self._get_async_collection(collection_name)
+            results = await collection.query(
+                query_embeddings=self._project(
+                    self._spec_from_metadata(collection.metadata),
+                    np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+                ),
+                n_results=top_k,
+                where=filters if filters else None
+            )
+            return self._to_results(results)
+        except Exception as e:
+            print(f"Failed to search in {collection_name}: {e}")
+            return []
+    
+    async def acount_documents(self, collection_name: str) -> int:
+        """Count documents through Chroma's async HTTP client."""
+        if not self.http_mode:
+            return await super().acount_documents(collection_name)
+        try:
+            collection = await self._get_async_collection(collection_name)
+            return await collection.count()
+        except Exception as e:
+            print(f"Failed to count documents in {collection_name}: {e}")
+            return 0
@@ -1,13 +1,17 @@
 """
 FAISS Vector Database Client Implementation
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 import os
 import pickle
+import shutil
 import numpy as np
 import faiss
 from pathlib import Path
-from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, SearchResult
+from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, DocumentBatch, SearchResult, Vector
+from app.vector_db_service.compression import StorageSpec
+from app.vector_db_service.indexing import IndexSpec
+from app.vector_db_service.clients.faiss_storage import FAISSCollectionStore
 
 class FAISSDBClient(VectorDatabaseClient):
     """
@@ -16,13 +20,19 @@ class FAISSDBClient(VectorDatabaseClient):
     Note: FAISS is not a complete database solution but rather a library for
     efficient similarity search. This implementation creates a simple
     database-like interface on top of FAISS with file-based persistence.
+    Each collection is a directory of append-only segments committed through
+    a manifest (see FAISSCollectionStore).
     """
     
+    # Appends serialize on the store lock and each one writes a segment,
+    # so uploads are large and one at a time
+    ingest_batch_size = 20000
+    ingest_max_batch_bytes = 256 * 1024 * 1024
+    ingest_concurrency = 1
+    
     def __init__(self, storage_path: str = "./faiss_indexes"):
         self.storage_path = Path(storage_path)
-        self.indexes = {}
-        self.metadata_store = {}  # Store for document text and metadata
-        self.id_map = {}  # Maps document IDs to internal FAISS indices
+        self.stores: Dict[str, FAISSCollectionStore] = {}
     
     def connect(self) -> bool:
         """Ensure storage directory exists."""
@@ -33,261 +43,241 @@ class FAISSDBClient(VectorDatabaseClient):
             print(f"Failed to create storage directory: {e}")
             return False
     
-    def _get_index_path(self, collection_name: str) -> Path:
-        """Get the path to the FAISS index file."""
-        return self.storage_path / f"{collection_name}.index"
+    def health_check(self) -> bool:
+        """Check the storage directory is still there."""
+        return self.storage_path.is_dir()
     
-    def _get_metadata_path(self, collection_name: str) -> Path:
-        """Get the path to the metadata store file."""
-        return self.storage_path / f"{collection_name}.metadata"
+    def close(self) -> None:
+        """Close every loaded collection's metadata database."""
+        for store in self.stores.values():
+            store.close()
+        self.stores.clear()
     
-    def _get_id_map_path(self, collection_name: str) -> Path:
-        """Get the path to the ID mapping file."""
-        return self.storage_path / f"{collection_name}.idmap"
+    def _get_collection_path(self, collection_name: str) -> Path:
+        """Get the directory holding a collection's segments and manifest."""
+        return self.storage_path / collection_name
     
-    def create_collection(self, collection_name: str, dimension: int) -> bool:
-        """Create a new FAISS index."""
+    def _get_legacy_index_path(self, collection_name: str) -> Path:
+        """Single-file index written by earlier versions of this client."""
+        return self.storage_path / f"{collection_name}.index"
+    
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
+        """
+        Create a new FAISS collection.
+        
+        With an ANN index spec the collection is still searched exactly until
+        it passes the spec's training threshold, then compaction builds the index.
+        """
         try:
-            # Check if index already exists
-            index_path = self._get_index_path(collection_name)
-            if index_path.exists():
-                # Load existing index
-                self.indexes[collection_name] = faiss.read_index(str(index_path))
-                
-                # Load metadata
-                metadata_path = self._get_metadata_path(collection_name)
-                if metadata_path.exists():
-                    with open(metadata_path, 'rb') as f:
-                        self.metadata_store[collection_name] = pickle.load(f)
-                else:
-                    self.metadata_store[collection_name] = {}
-                
-                # Load ID map
-                id_map_path = self._get_id_map_path(collection_name)
-                if id_map_path.exists():
-                    with open(id_map_path, 'rb') as f:
-                        self.id_map[collection_name] = pickle.load(f)
-                else:
-                    self.id_map[collection_name] = {}
-                
+            # Check if collection already exists
+            if self._load_collection(collection_name, quiet=True):
                 return True
             
-            # Create new index - using IndexFlatIP for inner product similarity
-            # (cosine similarity can be achieved by normalizing vectors)
-            index = faiss.IndexFlatIP(dimension)
-            self.indexes[collection_name] = index
-            
-            # Initialize metadata store and ID map
-            self.metadata_store[collection_name] = {}
-            self.id_map[collection_name] = {}
-            
-            # Save empty index, metadata, and ID map
-            self._save_index(collection_name)
-            self._save_metadata(collection_name)
-            self._save_id_map(collection_name)
-            
+            self.stores[collection_name] = FAISSCollectionStore.create(
+                self._get_collection_path(collection_name), dimension, storage or StorageSpec(), index
+            )
             return True
         except Exception as e:
             print(f"Failed to create collection {collection_name}: {e}")
             return False
     
-    def _save_index(self, collection_name: str) -> bool:
-        """Save index to disk."""
-        try:
-            if collection_name in self.indexes:
-                index_path = self._get_index_path(collection_name)
-                faiss.write_index(self.indexes[collection_name], str(index_path))
-                return True
-            return False
-        except Exception as e:
-            print(f"Failed to save index {collection_name}: {e}")
-            return False
-    
-    def _save_metadata(self, collection_name: str) -> bool:
-        """Save metadata store to disk."""
-        try:
-            if collection_name in self.metadata_store:
-                metadata_path = self._get_metadata_path(collection_name)
-                with open(metadata_path, 'wb') as f:
-                    pickle.dump(self.metadata_store[collection_name], f)
-                return True
-            return False
-        except Exception as e:
-            print(f"Failed to save metadata for {collection_name}: {e}")
-            return False
-    
-    def _save_id_map(self, collection_name: str) -> bool:
-        """Save ID mapping to disk."""
-        try:
-            if collection_name in self.id_map:
-                id_map_path = self._get_id_map_path(collection_name)
-                with open(id_map_path, 'wb') as f:
-                    pickle.dump(self.id_map[collection_name], f)
-                return True
-            return False
-        except Exception as e:
-            print(f"Failed to save ID map for {collection_name}: {e}")
-            return False
-    
     def delete_collection(self, collection_name: str) -> bool:
-        """Delete a FAISS index and its metadata."""
+        """Delete a FAISS collection and its files."""
         try:
             # Remove from memory if loaded
-            if collection_name in self.indexes:
-                del self.indexes[collection_name]
+            store = self.stores.pop(collection_name, None)
+            if store is not None:
+                store.close()
             
-            if collection_name in self.metadata_store:
-                del self.metadata_store[collection_name]
-                
-            if collection_name in self.id_map:
-                del self.id_map[collection_name]
+            collection_path = self._get_collection_path(collection_name)
+            if collection_path.exists():
+                shutil.rmtree(collection_path)
             
-            # Delete files if they exist
-            index_path = self._get_index_path(collection_name)
-            if index_path.exists():
-                index_path.unlink()
-            
-            metadata_path = self._get_metadata_path(collection_name)
-            if metadata_path.exists():
-                metadata_path.unlink()
-                
-            id_map_path = self._get_id_map_path(collection_name)
-            if id_map_path.exists():
-                id_map_path.unlink()
+            for suffix in (".index", ".metadata", ".idmap"):
+                legacy_path = self.storage_path / f"{collection_name}{suffix}"
+                if legacy_path.exists():
+                    legacy_path.unlink()
             
             return True
         except Exception as e:
             print(f"Failed to delete collection {collection_name}: {e}")
             return False
     
-    def _load_collection(self, collection_name: str) -> bool:
+    def _load_collection(self, collection_name: str, quiet: bool = False) -> bool:
         """Load collection if not already in memory."""
         try:
-            if collection_name not in self.indexes:
-                index_path = self._get_index_path(collection_name)
-                if not index_path.exists():
-                    raise FileNotFoundError(f"Index {collection_name} does not exist")
-                
-                self.indexes[collection_name] = faiss.read_index(str(index_path))
-                
-                # Load metadata
-                metadata_path = self._get_metadata_path(collection_name)
-                if metadata_path.exists():
-                    with open(metadata_path, 'rb') as f:
-                        self.metadata_store[collection_name] = pickle.load(f)
-                else:
-                    self.metadata_store[collection_name] = {}
-                
-                # Load ID map
-                id_map_path = self._get_id_map_path(collection_name)
-                if id_map_path.exists():
-                    with open(id_map_path, 'rb') as f:
-                        self.id_map[collection_name] = pickle.load(f)
+            if collection_name not in self.stores:
+                collection_path = self._get_collection_path(collection_name)
+                if FAISSCollectionStore.exists(collection_path):
+                    self.stores[collection_name] = FAISSCollectionStore.open(collection_path)
+                elif self._get_legacy_index_path(collection_name).exists():
+                    self.stores[collection_name] = self._migrate_legacy(collection_name)
                 else:
-                    self.id_map[collection_name] = {}
+                    raise FileNotFoundError(f"Collection {collection_name} does not exist")
             
             return True
         except Exception as e:
-            print(f"Failed to load collection {collection_name}: {e}")
+            if not quiet:
+                print(f"Failed to load collection {collection_name}: {e}")
             return False
     
+    def _migrate_legacy(self, collection_name: str) -> FAISSCollectionStore:
+        """Convert a single-file flat index and its pickles into a segmented collection."""
+        index = faiss.read_index(str(self._get_legacy_index_path(collection_name)))
+        with open(self.storage_path / f"{collection_name}.metadata", "rb") as f:
+            metadata = pickle.load(f)
+        
+        store = FAISSCollectionStore.create(self._get_collection_path(collection_name), index.d, StorageSpec())
+        positions = sorted(metadata)
+        if positions:
+            vectors = np.stack([index.reconstruct(int(i)) for i in positions])
+            store.append(
+                [metadata[i]["id"] for i in positions],
+                [metadata[i]["text"] for i in positions],
+                [metadata[i]["metadata"] for i in positions],
+                vectors
+            )
+        
+        for suffix in (".index", ".metadata", ".idmap"):
+            legacy_path = self.storage_path / f"{collection_name}{suffix}"
+            if legacy_path.exists():
+                legacy_path.unlink()
+        return store
+    
     def ingest_documents(self, 
                         collection_name: str, 
-                        documents: List[DocumentChunk]) -> bool:
-        """Ingest multiple document chunks into FAISS."""
+                        documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest multiple document chunks into FAISS as a new segment, replacing documents with the same id."""
         try:
+            batch = DocumentBatch.from_documents(documents)
+
             # Load collection if not already in memory
             if not self._load_collection(collection_name):
                 return False
             
-            # Get references to index and metadata
-            index = self.indexes[collection_name]
-            metadata = self.metadata_store[collection_name]
-            id_map = self.id_map[collection_name]
-            
-            # Get current size of index for ID mapping
-            current_index_size = index.ntotal
-            
-            # Prepare embeddings as numpy array and normalize them for cosine similarity
-            embeddings = np.array([doc.embedding for doc in documents], dtype=np.float32)
+            # Normalize a float32 copy for cosine similarity; the batch itself is left untouched
+            embeddings = np.array(batch.embeddings, dtype=np.float32, order="C")
             faiss.normalize_L2(embeddings)
             
-            # Add vectors to the index
-            index.add(embeddings)
-            
-            # Update metadata and ID mapping
-            for i, doc in enumerate(documents):
-                faiss_idx = current_index_size + i
-                id_map[doc.id] = faiss_idx
-                metadata[faiss_idx] = {
-                    "id": doc.id,
-                    "text": doc.text,
-                    "metadata": doc.metadata
-                }
-            
-            # Save updated index and metadata
-            self._save_index(collection_name)
-            self._save_metadata(collection_name)
-            self._save_id_map(collection_name)
-            
+            # Re-ingested ids supersede their previous vectors inside the store
+            self.stores[collection_name].append(batch.ids, batch.texts, batch.metadatas, embeddings)
             return True
         except Exception as e:
             print(f"Failed to ingest documents into {collection_name}: {e}")
             return False
     
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """
+        Delete documents from a FAISS collection.
+        
+        Deleted vectors are tombstoned and skipped by search; compaction
+        drops them once they pass the vacuum threshold.
+        """
+        try:
+            if not self._load_collection(collection_name):
+                return False
+            
+            self.stores[collection_name].delete(ids)
+            return True
+        except Exception as e:
+            print(f"Failed to delete documents from {collection_name}: {e}")
+            return False
+    
     def search(self, 
                collection_name: str,
-               query_vector: List[float],
+               query_vector: Vector,
                top_k: int = 10,
                filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
         """Search for similar vectors in FAISS."""
+        results = self.search_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters)
+        return results[0] if results else []
+    
+    def search_batch(self,
+                     collection_name: str,
+                     query_vectors: Union[np.ndarray, List[Vector]],
+                     top_k: int = 10,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Search with all queries in one FAISS matrix search per segment."""
         try:
             # Load collection if not already in memory
             if not self._load_collection(collection_name):
                 return []
             
-            # Get references to index and metadata
-            index = self.indexes[collection_name]
-            metadata = self.metadata_store[collection_name]
+            # Normalize a float32 copy of the query matrix
+            queries = np.array(np.atleast_2d(query_vectors), dtype=np.float32, order="C")
+            faiss.normalize_L2(queries)
             
-            # Convert query to numpy array and normalize
-            query_np = np.array([query_vector], dtype=np.float32)
-            faiss.normalize_L2(query_np)
-            
-            # Search for similar vectors
-            scores, indices = index.search(query_np, top_k)
-            
-            results = []
-            for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-                # Skip invalid indices
-                if idx == -1 or idx not in metadata:
-                    continue
-                
-                doc_data = metadata[idx]
-                doc_metadata = doc_data.get("metadata", {})
-                
-                # Apply filters if provided
-                if filters and not self._match_filters(doc_metadata, filters):
-                    continue
-                
-                results.append(SearchResult(
-                    id=doc_data["id"],
-                    text=doc_data["text"],
-                    score=float(score),  # Convert numpy float to Python float
-                    metadata=doc_metadata
-                ))
-            
-            return results
+            # Filters are resolved through the collection's metadata index before searching
+            return [
+                [
+                    SearchResult(
+                        id=doc_data["id"],
+                        text=doc_data["text"],
+                        score=score,
+                        metadata=doc_data.get("metadata", {})
+                    )
+                    for score, doc_data in hits
+                ]
+                for hits in self.stores[collection_name].search_batch(queries, top_k, filters)
+            ]
         except Exception as e:
             print(f"Failed to search in {collection_name}: {e}")
             return []
     
-    def _match_filters(self, metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
-        """Check if metadata matches all filters."""
-        for key, value in filters.items():
-            if key not in metadata or metadata[key] != value:
+    def compact(self, collection_name: str) -> bool:
+        """Merge a collection's segments now instead of waiting for the background trigger."""
+        try:
+            if not self._load_collection(collection_name):
+                return False
+            
+            self.stores[collection_name].compact()
+            return True
+        except Exception as e:
+            print(f"Failed to compact {collection_name}: {e}")
+            return False
+    
+    def rebuild_index(self, collection_name: str, index: Optional[IndexSpec] = None) -> bool:
+        """Retrain and rebuild a collection's index, optionally switching to another index spec."""
+        try:
+            if not self._load_collection(collection_name):
+                return False
+            
+            self.stores[collection_name].rebuild(index)
+            return True
+        except Exception as e:
+            print(f"Failed to rebuild index for {collection_name}: {e}")
+            return False
+    
+    def set_search_params(self,
+                          collection_name: str,
+                          nprobe: Optional[int] = None,
+                          ef_search: Optional[int] = None) -> bool:
+        """Tune IVF nprobe / HNSW efSearch for a collection without rebuilding."""
+        try:
+            if not self._load_collection(collection_name):
                 return False
-        return True
+            
+            self.stores[collection_name].set_search_params(nprobe, ef_search)
+            return True
+        except Exception as e:
+            print(f"Failed to set search params for {collection_name}: {e}")
+            return False
+    
+    def get_index_spec(self, collection_name: str) -> Optional[IndexSpec]:
+        """ANN index spec recorded for a collection."""
+        if not self._load_collection(collection_name):
+            return None
+        return self.stores[collection_name].index_spec
+    
+    def get_storage_spec(self, collection_name: str) -> Optional[StorageSpec]:
+        """Storage spec recorded for a collection."""
+        if not self._load_collection(collection_name):
+            return None
+        return self.stores[collection_name].spec
     
     def count_documents(self, collection_name: str) -> int:
         """Count the number of documents in a collection."""
@@ -296,9 +286,8 @@ class FAISSDBClient(VectorDatabaseClient):
             if not self._load_collection(collection_name):
                 return 0
             
-            # Get the index
-            index = self.indexes[collection_name]
-            return index.ntotal
+            # Deleted and superseded vectors are tombstoned, so count live entries
+            return self.stores[collection_name].live_count()
         except Exception as e:
             print(f"Failed to count documents in {collection_name}: {e}")
-            return 0
\ No newline at end of file
+            return 0
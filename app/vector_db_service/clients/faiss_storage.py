@@ -0,0 +1,780 @@
+"""
+FAISS segment storage - append-only segments, transactional manifest and compaction
+"""
+import os
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import faiss
+
+from app.vector_db_service.compression import StorageSpec, VectorProjector, binarize, binary_rescore
+from app.vector_db_service.indexing import IndexSpec
+
+METADATA_DB_NAME = "collection.db"
+FAISS_MAX_SEGMENTS = int(os.getenv("FAISS_MAX_SEGMENTS", "8"))
+# Vacuum once tombstoned vectors make up this share of the index...
+FAISS_VACUUM_RATIO = float(os.getenv("FAISS_VACUUM_RATIO", "0.2"))
+# ...and there are at least this many of them
+FAISS_VACUUM_MIN_TOMBSTONES = int(os.getenv("FAISS_VACUUM_MIN_TOMBSTONES", "256"))
+# Open segment indexes memory-mapped instead of reading them into RAM
+FAISS_MMAP = os.getenv("FAISS_MMAP", "true").lower() == "true"
+# IVF training uses at most this many points per cluster
+IVF_TRAINING_POINTS_PER_LIST = 256
+# Keep IN (...) lists under SQLite's host parameter limit
+SQLITE_MAX_PARAMS = 900
+
+# Metadata values that go into the inverted index; anything else is filtered after search
+INDEXABLE_TYPES = (str, int, float, bool)
+# Bumped when the posting encoding changes, so older collections rebuild their postings
+POSTINGS_VERSION = 2
+
+MMAP_FLAGS = faiss.IO_FLAG_MMAP | getattr(faiss, "IO_FLAG_MMAP_IFC", 0) | faiss.IO_FLAG_READ_ONLY
+
+
+def _chunks(values: List, size: int = SQLITE_MAX_PARAMS) -> Iterable[List]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _encode_value(value) -> str:
+    """
+    Posting key of a scalar metadata value.
+
+    Values that compare equal in Python encode the same way (True, 1 and
+    1.0 all become "1"), so the inverted index matches like match_filters.
+    """
+    if isinstance(value, bool):
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return json.dumps(value)
+
+
+def _postings(internal_id: int, metadata: Dict[str, Any]) -> List[Tuple[str, str, int]]:
+    """(key, encoded value, id) rows for the scalar metadata of one document."""
+    return [
+        (key, _encode_value(value), internal_id)
+        for key, value in metadata.items()
+        if isinstance(value, INDEXABLE_TYPES)
+    ]
+
+
+def match_filters(metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Check if metadata matches all filters."""
+    for key, value in filters.items():
+        if key not in metadata or metadata[key] != value:
+            return False
+    return True
+
+
+class Segment:
+    """One immutable, id-mapped block of vectors written by a single ingest or compaction."""
+
+    __slots__ = ("name", "index")
+
+    def __init__(self, name: str, index):
+        self.name = name
+        self.index = index
+
+    def ids(self) -> np.ndarray:
+        """Internal ids of every vector in the segment."""
+        return faiss.vector_to_array(self.index.id_map)
+
+
+class FAISSCollectionStore:
+    """
+    On-disk FAISS collection made of append-only segments.
+
+    Every ingest writes a new segment index file and then commits it, its
+    documents and any superseded ids in one SQLite transaction, so write
+    cost scales with the batch rather than the collection and a crash
+    mid-write leaves the previous state intact. The manifest (segment list,
+    tombstones, id counter) lives in the same database.
+
+    Document text and metadata are rows keyed by the int64 id used in the
+    FAISS indexes and are only read for the hits a search returns. Segment
+    files are immutable, so they are opened memory-mapped and an idle
+    collection costs little resident memory.
+
+    Scalar metadata values are also written to an inverted index
+    (key, value) -> ids. Filtered searches resolve the filter to candidate
+    ids first and pass them to FAISS as an IDSelector, so a selective filter
+    still returns the best matching documents instead of whatever survives
+    post-filtering of the global top-k.
+
+    Every stored vector gets a 64-bit id from a persistent counter; ids are
+    never reused and IndexIDMap2 keeps them stable through compaction. An
+    upsert writes the new version under a fresh id and tombstones the old
+    one, as does a delete. Once there are more than `max_segments`
+    segments, or tombstones exceed FAISS_VACUUM_RATIO of the stored
+    vectors, a background thread merges the segments into one and drops
+    tombstoned vectors, so the index stays proportional to the live count.
+
+    New segments are always exact (flat) indexes. When the collection has an
+    ANN IndexSpec and grows past its training threshold, compaction trains
+    and builds the merged segment with that index type instead; the trained
+    but empty index is kept as a template so later compactions only re-add.
+
+    When the stored codes are lossy (int8, binary or IVF-PQ), each segment
+    also keeps its float vectors in a memory-mapped sidecar file, so
+    compaction and rebuilds encode from the originals rather than from
+    decoded codes.
+    """
+
+    def __init__(self, path: Path, conn: sqlite3.Connection, manifest: Dict[str, Any],
+                 max_segments: int = FAISS_MAX_SEGMENTS):
+        self.path = Path(path)
+        self.conn = conn
+        self.manifest = manifest
+        self.dimension = manifest["dimension"]
+        self.spec = StorageSpec.from_dict(manifest.get("spec"))
+        self.index_spec = IndexSpec.from_dict(manifest.get("index"))
+        self.max_segments = max_segments
+        self.segments: List[Segment] = []
+        self.tombstones: Set[int] = set(manifest.get("tombstones", []))
+        self.projector = VectorProjector(self.spec, self.dimension)
+        self.projector.load(self.path / "pca.npz")
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------ lifecycle
+
+    @staticmethod
+    def _connect(path: Path) -> sqlite3.Connection:
+        # Compaction commits from a background thread; every use is under the store lock
+        conn = sqlite3.connect(str(Path(path) / METADATA_DB_NAME), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS manifest (id INTEGER PRIMARY KEY CHECK (id = 0), body TEXT NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "id INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, text TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "key TEXT NOT NULL, value TEXT NOT NULL, id INTEGER NOT NULL, PRIMARY KEY (key, value, id)) WITHOUT ROWID"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS postings_id ON postings(id)")
+        conn.commit()
+        return conn
+
+    @classmethod
+    def create(cls,
+               path: Path,
+               dimension: int,
+               spec: StorageSpec,
+               index_spec: Optional[IndexSpec] = None) -> "FAISSCollectionStore":
+        """Create an empty collection directory with its first manifest."""
+        index_spec = index_spec or IndexSpec()
+        cls._validate_index_spec(spec, index_spec, dimension)
+        os.makedirs(path, exist_ok=True)
+        manifest = {
+            "version": 0,
+            "dimension": dimension,
+            "spec": spec.to_dict(),
+            "index": index_spec.to_dict(),
+            "segments": [],
+            "tombstones": [],
+            "next_id": 0,
+            "next_segment": 1,
+            "postings": POSTINGS_VERSION
+        }
+        store = cls(path, cls._connect(path), manifest)
+        with store.conn:
+            store._write_manifest()
+        return store
+
+    @classmethod
+    def open(cls, path: Path) -> "FAISSCollectionStore":
+        """Load a collection from its last committed manifest."""
+        conn = cls._connect(path)
+        row = conn.execute("SELECT body FROM manifest WHERE id = 0").fetchone()
+        if row is None:
+            conn.close()
+            raise FileNotFoundError(f"No manifest committed in {path}")
+        store = cls(path, conn, json.loads(row[0]))
+        for name in store.manifest["segments"]:
+            store.segments.append(store._read_segment(name))
+        store._remove_uncommitted_files()
+        if store.manifest.get("postings") != POSTINGS_VERSION:
+            store._build_postings()
+        return store
+
+    def _build_postings(self) -> None:
+        """(Re)build the inverted index for collections written before it or its current encoding existed."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM postings")
+            for internal_id, metadata in self.conn.execute("SELECT id, metadata FROM records").fetchall():
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO postings (key, value, id) VALUES (?, ?, ?)",
+                    _postings(internal_id, json.loads(metadata))
+                )
+            self.manifest["postings"] = POSTINGS_VERSION
+            self._write_manifest()
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (Path(path) / METADATA_DB_NAME).exists()
+
+    def close(self) -> None:
+        with self._lock:
+            self.conn.close()
+
+    @staticmethod
+    def _validate_index_spec(spec: StorageSpec, index_spec: IndexSpec, dimension: int) -> None:
+        if index_spec.index_type == "diskann":
+            raise ValueError("FAISS has no DiskANN index; use hnsw, ivf_flat or ivf_pq")
+        if not index_spec.is_default() and spec.quantization != "none":
+            raise ValueError(f"ANN index {index_spec.index_type} needs float storage, not {spec.quantization}")
+        index_spec.validate(spec.stored_dimension(dimension))
+
+    def _write_manifest(self) -> None:
+        """Stage the manifest in the current transaction; the caller commits."""
+        self.manifest["version"] += 1
+        self.manifest["segments"] = [segment.name for segment in self.segments]
+        self.manifest["tombstones"] = sorted(self.tombstones)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO manifest (id, body) VALUES (0, ?)", (json.dumps(self.manifest),)
+        )
+
+    def _remove_uncommitted_files(self) -> None:
+        """Delete segment files left behind by a crash before their commit."""
+        committed = set(self.manifest["segments"])
+        for file in self.path.glob("seg-*"):
+            if file.name.split(".")[0] not in committed:
+                file.unlink()
+
+    # ------------------------------------------------------------------ segment files
+
+    def _new_index(self):
+        """Empty id-mapped index in the collection's storage format."""
+        dimension = self.spec.stored_dimension(self.dimension)
+        if self.spec.quantization == "binary":
+            return faiss.IndexBinaryIDMap2(faiss.IndexBinaryFlat(dimension))
+        if self.spec.quantization == "int8":
+            template_path = self.path / "template.index"
+            if template_path.exists():
+                # Reuse the quantizer ranges learnt from the first ingest
+                return faiss.IndexIDMap2(faiss.read_index(str(template_path)))
+            return faiss.IndexIDMap2(
+                faiss.IndexScalarQuantizer(dimension, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+            )
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+
+    def _new_ann_index(self):
+        """Empty id-mapped ANN index, reusing trained parameters from an earlier build."""
+        template_path = self.path / "ann_template.index"
+        if template_path.exists():
+            return faiss.IndexIDMap2(faiss.read_index(str(template_path)))
+        dimension = self.spec.stored_dimension(self.dimension)
+        spec = self.index_spec
+        if spec.index_type == "hnsw":
+            index = faiss.IndexHNSWFlat(dimension, spec.m, faiss.METRIC_INNER_PRODUCT)
+            index.hnsw.efConstruction = spec.ef_construction
+        elif spec.index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimension), dimension, spec.nlist, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFPQ(faiss.IndexFlatIP(dimension), dimension, spec.nlist,
+                                     spec.pq_m, spec.pq_bits, faiss.METRIC_INNER_PRODUCT)
+        return faiss.IndexIDMap2(index)
+
+    def _build_ann(self, vectors: np.ndarray, ids: np.ndarray):
+        """Train (first time only) and fill an ANN index."""
+        index = self._new_ann_index()
+        if not index.is_trained:
+            sample = vectors
+            max_points = IVF_TRAINING_POINTS_PER_LIST * self.index_spec.nlist
+            if len(vectors) > max_points:
+                rng = np.random.default_rng(0)
+                sample = vectors[rng.choice(len(vectors), max_points, replace=False)]
+            index.train(sample)
+            template = faiss.clone_index(faiss.downcast_index(index.index))
+            template.reset()
+            faiss.write_index(template, str(self.path / "ann_template.index"))
+        index.add_with_ids(vectors, ids)
+        return index
+
+    @staticmethod
+    def _enable_reconstruct(index) -> None:
+        """IVF indexes need a direct map before vectors can be read back for compaction."""
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.make_direct_map()
+
+    @staticmethod
+    def _is_ann(segment: Segment) -> bool:
+        if isinstance(segment.index, faiss.IndexBinary):
+            return False
+        inner = faiss.downcast_index(segment.index.index)
+        return isinstance(inner, (faiss.IndexHNSW, faiss.IndexIVF))
+
+    def _search_params(self, segment: Segment, top_k: int, selector=None):
+        """Per-query HNSW/IVF parameters from the collection's index spec, plus an optional id filter."""
+        inner = faiss.downcast_index(segment.index.index)
+        if isinstance(inner, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=max(self.index_spec.ef_search, top_k))
+        if isinstance(inner, faiss.IndexIVF):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=self.index_spec.nprobe)
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
+
+    def _is_lossy(self) -> bool:
+        """True when stored codes cannot be decoded back to the vectors that were added."""
+        return self.spec.quantization != "none" or self.index_spec.index_type == "ivf_pq"
+
+    def _write_segment(self, name: str, index, vectors: Optional[np.ndarray] = None) -> Segment:
+        """
+        Persist a freshly built index and reopen it from disk.
+
+        `vectors` are the reduced float vectors in the order they were added;
+        they are written as the segment's sidecar when the index is lossy.
+        """
+        index_path = self.path / f"{name}.index"
+        if isinstance(index, faiss.IndexBinary):
+            faiss.write_index_binary(index, str(index_path))
+        else:
+            faiss.write_index(index, str(index_path))
+        if vectors is not None and self._is_lossy():
+            np.save(self.path / f"{name}.vectors.npy", np.ascontiguousarray(vectors, dtype=np.float32))
+        return self._read_segment(name)
+
+    def _read_segment(self, name: str) -> Segment:
+        index_path = str(self.path / f"{name}.index")
+        read = faiss.read_index_binary if self.spec.quantization == "binary" else faiss.read_index
+        index = None
+        if FAISS_MMAP:
+            try:
+                index = read(index_path, MMAP_FLAGS)
+            except RuntimeError:
+                # Some index types (e.g. IVF lists in some FAISS builds) cannot be mapped
+                index = None
+        if index is None:
+            index = read(index_path)
+        if not isinstance(index, faiss.IndexBinary):
+            self._enable_reconstruct(index)
+        return Segment(name, index)
+
+    def _delete_segment_files(self, name: str) -> None:
+        for file in (self.path / f"{name}.index", self.path / f"{name}.vectors.npy"):
+            if file.exists():
+                file.unlink()
+
+    def _live_vectors(self, segment: Segment, dead: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Live ids of a segment and their float vectors, read with one bulk call.
+
+        Vectors come from the float sidecar when there is one; otherwise they
+        are decoded from the index, which is exact for float storage. Binary
+        codes without a sidecar are expanded to +/-1, which binarizes back to
+        the same codes.
+        """
+        ids = segment.ids()
+        live = ~np.isin(ids, dead)
+        sidecar = self.path / f"{segment.name}.vectors.npy"
+        if sidecar.exists():
+            vectors = np.load(sidecar, mmap_mode="r")
+            if len(vectors) == len(ids):
+                return ids[live], np.asarray(vectors[live], dtype=np.float32)
+        if isinstance(segment.index, faiss.IndexBinary):
+            codes = segment.index.index.reconstruct_n(0, segment.index.ntotal)[live]
+            signs = np.unpackbits(codes, axis=1)[:, :segment.index.d].astype(np.float32)
+            return ids[live], signs * 2.0 - 1.0
+        return ids[live], segment.index.reconstruct_batch(ids[live])
+
+    def _next_segment_name(self) -> str:
+        name = f"seg-{self.manifest['next_segment']:06d}"
+        self.manifest["next_segment"] += 1
+        return name
+
+    # ------------------------------------------------------------------ vectors
+
+    def _reduce(self, vectors: np.ndarray, fit: bool = False) -> np.ndarray:
+        """Apply the collection's dimensionality reduction to normalized float32 vectors."""
+        if self.spec.reduction != "none":
+            if fit and not self.projector.is_fitted:
+                self.projector.fit(vectors)
+                self.projector.save(self.path / "pca.npz")
+            vectors = self.projector.transform(vectors)
+        return vectors
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Turn reduced float vectors into what the segment index is fed."""
+        if self.spec.quantization == "binary":
+            return binarize(vectors)
+        return vectors
+
+    def to_storage(self, vectors: np.ndarray, fit: bool = False) -> np.ndarray:
+        """Reduce and quantize normalized float32 vectors to the stored representation."""
+        return self._encode(self._reduce(vectors, fit))
+
+    def _project_query(self, query: np.ndarray) -> np.ndarray:
+        if self.spec.reduction != "none":
+            return self.projector.transform(query)
+        return query
+
+    # ------------------------------------------------------------------ records
+
+    def _lookup_ids(self, doc_ids: List[str]) -> Dict[str, int]:
+        """Document id -> internal id for the documents that are live."""
+        found = {}
+        for chunk in _chunks(list(doc_ids)):
+            placeholders = ",".join("?" * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT doc_id, id FROM records WHERE doc_id IN ({placeholders})", chunk
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def _delete_records(self, internal_ids: List[int]) -> None:
+        for chunk in _chunks(list(internal_ids)):
+            placeholders = ",".join("?" * len(chunk))
+            self.conn.execute(f"DELETE FROM records WHERE id IN ({placeholders})", chunk)
+            self.conn.execute(f"DELETE FROM postings WHERE id IN ({placeholders})", chunk)
+
+    @staticmethod
+    def is_indexable(filters: Dict[str, Any]) -> bool:
+        """True when every filter value can be answered from the inverted index."""
+        return all(isinstance(value, INDEXABLE_TYPES) for value in filters.values())
+
+    def filter_ids(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Sorted internal ids of live documents matching every (key, value) filter."""
+        query = " INTERSECT ".join(["SELECT id FROM postings WHERE key = ? AND value = ?"] * len(filters))
+        params = [part for key, value in filters.items() for part in (key, _encode_value(value))]
+        with self._lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return np.array(sorted(row[0] for row in rows), dtype=np.int64)
+
+    def _selector(self, candidates: np.ndarray):
+        """
+        IDSelector for candidate ids.
+
+        Ids are allocated sequentially, so a dense candidate set is cheaper
+        as a bitmap over [0, next_id) than as a hashed id batch. The backing
+        array is returned too and must outlive the search.
+        """
+        next_id = self.manifest["next_id"]
+        if len(candidates) * 64 >= next_id:
+            mask = np.zeros(next_id, dtype=bool)
+            mask[candidates] = True
+            bitmap = np.packbits(mask, bitorder="little")
+            return faiss.IDSelectorBitmap(next_id, faiss.swig_ptr(bitmap)), bitmap
+        return faiss.IDSelectorBatch(len(candidates), faiss.swig_ptr(candidates)), candidates
+
+    def fetch_records(self, internal_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """Text and metadata for the given internal ids, read on demand."""
+        records = {}
+        with self._lock:
+            for chunk in _chunks(list(internal_ids)):
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT id, doc_id, text, metadata FROM records WHERE id IN ({placeholders})", chunk
+                ).fetchall()
+                for internal_id, doc_id, text, metadata in rows:
+                    records[internal_id] = {"id": doc_id, "text": text, "metadata": json.loads(metadata)}
+        return records
+
+    # ------------------------------------------------------------------ writes
+
+    def append(self,
+               doc_ids: List[str],
+               texts: List[str],
+               metadatas: List[Dict[str, Any]],
+               vectors: np.ndarray) -> None:
+        """Write normalized float32 vectors as a new segment and commit it."""
+        if not doc_ids:
+            return
+        # A document repeated within the batch keeps its last occurrence
+        last = {doc_id: position for position, doc_id in enumerate(doc_ids)}
+        if len(last) != len(doc_ids):
+            keep = sorted(last.values())
+            doc_ids = [doc_ids[i] for i in keep]
+            texts = [texts[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            vectors = vectors[keep]
+
+        with self._lock:
+            reduced = self._reduce(vectors, fit=True)
+            stored = self._encode(reduced)
+            index = self._new_index()
+            if not index.is_trained:
+                # Learn per-dimension int8 ranges from the first ingested batch
+                index.train(stored)
+                template = faiss.clone_index(faiss.downcast_index(index.index))
+                template.reset()
+                faiss.write_index(template, str(self.path / "template.index"))
+
+            start = self.manifest["next_id"]
+            internal_ids = np.arange(start, start + len(doc_ids), dtype=np.int64)
+            index.add_with_ids(stored, internal_ids)
+            segment = self._write_segment(self._next_segment_name(), index, reduced)
+
+            with self.conn:
+                # Re-ingested ids supersede their previous vectors
+                superseded = list(self._lookup_ids(doc_ids).values())
+                self.tombstones.update(superseded)
+                self._delete_records(superseded)
+                self.conn.executemany(
+                    "INSERT INTO records (id, doc_id, text, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (internal_id, doc_id, text, json.dumps(metadata or {}, default=str))
+                        for internal_id, doc_id, text, metadata in zip(internal_ids.tolist(), doc_ids, texts, metadatas)
+                    ]
+                )
+                self.conn.executemany(
+                    "INSERT OR IGNORE INTO postings (key, value, id) VALUES (?, ?, ?)",
+                    [
+                        posting
+                        for internal_id, metadata in zip(internal_ids.tolist(), metadatas)
+                        for posting in _postings(internal_id, metadata or {})
+                    ]
+                )
+                self.manifest["next_id"] = start + len(doc_ids)
+                self.segments.append(segment)
+                self._write_manifest()
+        self.maybe_compact()
+
+    def delete(self, doc_ids: List[str]) -> int:
+        """Tombstone documents; returns how many were live."""
+        with self._lock:
+            found = list(self._lookup_ids(doc_ids).values())
+            if not found:
+                return 0
+            with self.conn:
+                self.tombstones.update(found)
+                self._delete_records(found)
+                self._write_manifest()
+        self.maybe_compact()
+        return len(found)
+
+    # ------------------------------------------------------------------ reads
+
+    def _search_segment(self,
+                        segment: Segment,
+                        queries: np.ndarray,
+                        top_k: int,
+                        selector=None) -> Tuple[np.ndarray, np.ndarray]:
+        """Search one segment for a (n_queries, dimension) matrix; returns (scores, ids) matrices."""
+        if self.spec.quantization != "binary":
+            return segment.index.search(queries, top_k, params=self._search_params(segment, top_k, selector))
+
+        # Hamming search over-fetches candidates, then float re-scoring picks the top_k
+        params = faiss.SearchParameters(sel=selector) if selector is not None else None
+        _, candidates = segment.index.search(binarize(queries), top_k * self.spec.rescore_factor, params=params)
+        scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+        for row, (query, row_candidates) in enumerate(zip(queries, candidates)):
+            row_candidates = row_candidates[row_candidates != -1]
+            if len(row_candidates) == 0:
+                continue
+            codes = np.stack([segment.index.reconstruct(int(i)) for i in row_candidates])
+            rescored = binary_rescore(query, codes, segment.index.d)
+            best = np.argsort(-rescored)[:top_k]
+            scores[row, :len(best)] = rescored[best]
+            ids[row, :len(best)] = row_candidates[best]
+        return scores, ids
+
+    def search_ids(self,
+                   queries: np.ndarray,
+                   top_k: int,
+                   candidates: Optional[np.ndarray] = None) -> List[List[Tuple[float, int]]]:
+        """
+        Search every segment with a query matrix and merge the hits by score.
+
+        Args:
+            queries: Normalized float32 queries of shape (n_queries, dimension)
+            candidates: Restrict the search to these internal ids
+
+        Returns:
+            Per query, up to `top_k` (score, internal id) pairs for live vectors, best first
+        """
+        queries = self._project_query(queries)
+        with self._lock:
+            segments = list(self.segments)
+            tombstones = np.fromiter(self.tombstones, dtype=np.int64, count=len(self.tombstones))
+
+        selector, keep_alive = None, None
+        if candidates is not None:
+            if len(candidates) == 0:
+                return [[] for _ in range(len(queries))]
+            selector, keep_alive = self._selector(candidates)
+            # Candidates come from live postings, so no tombstoned hits need making up for
+            fetch = min(top_k, len(candidates))
+            max_fetch = fetch
+        else:
+            # Over-fetch so tombstoned hits do not leave the result short; fetching
+            # top_k + every tombstone per segment always fills the result
+            fetch = top_k + min(len(tombstones), top_k)
+            max_fetch = top_k + len(tombstones)
+
+        while True:
+            score_blocks, id_blocks, exhausted = [], [], True
+            for segment in segments:
+                if segment.index.ntotal == 0:
+                    continue
+                scores, ids = self._search_segment(segment, queries, fetch, selector)
+                score_blocks.append(scores)
+                id_blocks.append(ids)
+                exhausted = exhausted and fetch >= segment.index.ntotal
+            if not id_blocks:
+                return [[] for _ in range(len(queries))]
+
+            scores = np.concatenate(score_blocks, axis=1)
+            ids = np.concatenate(id_blocks, axis=1)
+            scores[(ids == -1) | np.isin(ids, tombstones)] = -np.inf
+            live = np.isfinite(scores).sum(axis=1)
+            if fetch >= max_fetch or exhausted or live.min() >= top_k:
+                break
+            # Tombstones crowded out live hits for some query; search deeper
+            fetch = min(fetch * 2, max_fetch)
+
+        order = np.argsort(-scores, axis=1)[:, :top_k]
+        hits = []
+        for row_scores, row_ids, row_order in zip(scores, ids, order):
+            hits.append([
+                (float(row_scores[i]), int(row_ids[i]))
+                for i in row_order
+                if row_scores[i] != -np.inf
+            ])
+        return hits
+
+    def search_batch(self,
+                     queries: np.ndarray,
+                     top_k: int,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[Tuple[float, Dict[str, Any]]]]:
+        """
+        Search a query matrix, optionally pre-filtered, loading text/metadata
+        for each query's best `top_k` hits only.
+        """
+        post_filter = bool(filters) and not self.is_indexable(filters)
+        if filters and not post_filter:
+            hits = self.search_ids(queries, top_k, self.filter_ids(filters))
+        else:
+            # Filter values the inverted index cannot answer are checked on over-fetched hits
+            hits = self.search_ids(queries, top_k * 4 if post_filter else top_k)
+
+        records = self.fetch_records(list({internal_id for row in hits for _, internal_id in row}))
+        results = []
+        for row in hits:
+            row_results = []
+            for score, internal_id in row:
+                record = records.get(internal_id)
+                if record is None or (post_filter and not match_filters(record["metadata"], filters)):
+                    continue
+                row_results.append((score, record))
+                if len(row_results) == top_k:
+                    break
+            results.append(row_results)
+        return results
+
+    def search(self,
+               query: np.ndarray,
+               top_k: int,
+               filters: Optional[Dict[str, Any]] = None) -> List[Tuple[float, Dict[str, Any]]]:
+        """Search for a single (1, dimension) query."""
+        return self.search_batch(query, top_k, filters)[0]
+
+    def live_count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+
+    def stats(self) -> Dict[str, int]:
+        """Live documents against vectors actually held by the segment indexes."""
+        with self._lock:
+            return {
+                "live": self.live_count(),
+                "vectors": sum(segment.index.ntotal for segment in self.segments),
+                "tombstones": len(self.tombstones),
+                "segments": len(self.segments)
+            }
+
+    # ------------------------------------------------------------------ compaction
+
+    def _ann_pending(self) -> bool:
+        """True once the collection is big enough for its ANN index but has none yet."""
+        if self.index_spec.is_default() or self.live_count() < self.index_spec.min_vectors():
+            return False
+        return not any(self._is_ann(segment) for segment in self.segments)
+
+    def _vacuum_due(self) -> bool:
+        """True once tombstoned vectors take up enough of the index to be worth dropping."""
+        if len(self.tombstones) < FAISS_VACUUM_MIN_TOMBSTONES:
+            return False
+        stored = sum(segment.index.ntotal for segment in self.segments)
+        return len(self.tombstones) > FAISS_VACUUM_RATIO * stored
+
+    def maybe_compact(self) -> None:
+        """Start a background compaction if segments or tombstones have piled up, or the ANN index is due."""
+        if len(self.segments) <= self.max_segments and not self._vacuum_due() and not self._ann_pending():
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+
+    def compact(self, force: bool = False) -> None:
+        """Merge all current segments into one, dropping tombstoned vectors."""
+        with self._compaction_lock:
+            with self._lock:
+                snapshot = list(self.segments)
+                dead = set(self.tombstones)
+            if len(snapshot) < 2 and not dead and not force and not self._ann_pending():
+                return
+
+            dead_ids = np.fromiter(dead, dtype=np.int64, count=len(dead))
+            merged_ids, merged_vectors = [], []
+            for segment in snapshot:
+                live_ids, vectors = self._live_vectors(segment, dead_ids)
+                if len(live_ids):
+                    merged_ids.append(live_ids)
+                    merged_vectors.append(vectors)
+
+            dimension = self.spec.stored_dimension(self.dimension)
+            ids = np.concatenate(merged_ids) if merged_ids else np.zeros(0, dtype=np.int64)
+            vectors = np.concatenate(merged_vectors) if merged_vectors else np.zeros((0, dimension), dtype=np.float32)
+            if self.index_spec.is_default() or len(ids) < self.index_spec.min_vectors():
+                merged_index = self._new_index()
+                if len(ids):
+                    merged_index.add_with_ids(self._encode(vectors), ids)
+            else:
+                merged_index = self._build_ann(vectors, ids)
+
+            with self._lock:
+                name = self._next_segment_name()
+            merged = self._write_segment(name, merged_index, vectors)
+
+            with self._lock, self.conn:
+                # Keep segments appended while we were merging
+                merged_names = {segment.name for segment in snapshot}
+                self.segments = [merged] + [s for s in self.segments if s.name not in merged_names]
+                self.tombstones -= dead
+                self._write_manifest()
+
+            for segment in snapshot:
+                self._delete_segment_files(segment.name)
+
+    def rebuild(self, index_spec: Optional[IndexSpec] = None) -> None:
+        """Retrain and rebuild the index now, optionally switching to a new index spec."""
+        with self._lock:
+            if index_spec is not None:
+                self._validate_index_spec(self.spec, index_spec, self.dimension)
+                self.index_spec = index_spec
+                self.manifest["index"] = index_spec.to_dict()
+            template_path = self.path / "ann_template.index"
+            if template_path.exists():
+                template_path.unlink()
+        self.compact(force=True)
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None) -> None:
+        """Change the recall/latency trade-off of ANN searches without rebuilding."""
+        with self._lock, self.conn:
+            if nprobe is not None:
+                self.index_spec.nprobe = max(1, nprobe)
+            if ef_search is not None:
+                self.index_spec.ef_search = max(1, ef_search)
+            self.manifest["index"] = self.index_spec.to_dict()
+            self._write_manifest()
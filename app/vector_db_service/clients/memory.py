@@ -0,0 +1,467 @@
+"""
+In-process NumPy Vector Database Client Implementation
+"""
+from typing import List, Dict, Any, Optional, Tuple, Union
+import os
+import json
+import shutil
+import struct
+import threading
+import numpy as np
+from pathlib import Path
+from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, DocumentBatch, SearchResult, Vector
+from app.vector_db_service.compression import StorageSpec
+from app.vector_db_service.indexing import IndexSpec
+
+VECTORS_FILE_NAME = "vectors.npy"
+DOCUMENTS_FILE_NAME = "documents.json"
+# Writes since the last snapshot, appended as length-prefixed records
+LOG_FILE_NAME = "writes.log"
+LOG_HEADER = struct.Struct("<I")
+# The log is folded into a new snapshot once it outgrows this many bytes or
+# the snapshot itself, whichever is larger, so rewrites stay amortized O(1)
+MEMORY_DB_SNAPSHOT_BYTES = int(os.getenv("MEMORY_DB_SNAPSHOT_BYTES", str(64 * 1024 * 1024)))
+# Open persisted vectors memory-mapped instead of reading them into RAM
+MEMORY_DB_MMAP = os.getenv("MEMORY_DB_MMAP", "true").lower() == "true"
+# Filter masks kept per collection; cleared whenever the collection changes
+MEMORY_DB_FILTER_CACHE_SIZE = int(os.getenv("MEMORY_DB_FILTER_CACHE_SIZE", "64"))
+
+
+def _normalized(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.array(vectors, dtype=np.float32, order="C")
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class MemoryCollection:
+    """
+    One collection as a contiguous, L2-normalized float32 matrix plus
+    row-aligned ids, texts and metadata.
+
+    The arrays are replaced, never mutated, so searches read a consistent
+    snapshot without taking the write lock.
+    """
+
+    def __init__(self,
+                 dimension: int,
+                 vectors: Optional[np.ndarray] = None,
+                 ids: Optional[List[str]] = None,
+                 texts: Optional[List[str]] = None,
+                 metadatas: Optional[List[Dict[str, Any]]] = None):
+        self.dimension = dimension
+        self.log_bytes = 0
+        self.snapshot_bytes = 0
+        # Reentrant so the client can hold it across a write and the save that follows
+        self.lock = threading.RLock()
+        self._set(
+            vectors if vectors is not None else np.zeros((0, dimension), dtype=np.float32),
+            ids or [],
+            texts or [],
+            metadatas or []
+        )
+
+    def _set(self, vectors: np.ndarray, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        # Published as one tuple so readers never see vectors and ids from different writes;
+        # the filter mask cache belongs to the snapshot it was computed on
+        self.state = (vectors, ids, texts, metadatas, {doc_id: i for i, doc_id in enumerate(ids)}, {})
+
+    def __len__(self) -> int:
+        return len(self.state[1])
+
+    def upsert(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """Append rows, dropping older rows with the same ids (the last duplicate in a batch wins)."""
+        if vectors.shape[1] != self.dimension:
+            raise ValueError(f"Expected dimension {self.dimension}, got {vectors.shape[1]}")
+        latest = {doc_id: i for i, doc_id in enumerate(ids)}
+        take = sorted(latest.values())
+        with self.lock:
+            old_vectors, old_ids, old_texts, old_metadatas, positions, _ = self.state
+            keep = self._keep_mask(len(old_ids), positions, latest)
+            self._set(
+                np.concatenate([old_vectors[keep], vectors[take]]),
+                [doc_id for doc_id, kept in zip(old_ids, keep) if kept] + [ids[i] for i in take],
+                [text for text, kept in zip(old_texts, keep) if kept] + [texts[i] for i in take],
+                [metadata for metadata, kept in zip(old_metadatas, keep) if kept] + [metadatas[i] for i in take]
+            )
+
+    def delete(self, ids: List[str]) -> bool:
+        """Drop rows with these ids; returns whether any were there."""
+        with self.lock:
+            old_vectors, old_ids, old_texts, old_metadatas, positions, _ = self.state
+            keep = self._keep_mask(len(old_ids), positions, ids)
+            if keep.all():
+                return False
+            self._set(
+                np.ascontiguousarray(old_vectors[keep]),
+                [doc_id for doc_id, kept in zip(old_ids, keep) if kept],
+                [text for text, kept in zip(old_texts, keep) if kept],
+                [metadata for metadata, kept in zip(old_metadatas, keep) if kept]
+            )
+            return True
+
+    @staticmethod
+    def _keep_mask(count: int, positions: Dict[str, int], ids) -> np.ndarray:
+        keep = np.ones(count, dtype=bool)
+        drop = [positions[doc_id] for doc_id in ids if doc_id in positions]
+        keep[drop] = False
+        return keep
+
+    @staticmethod
+    def _filter_mask(filters: Dict[str, Any], metadatas: List[Dict[str, Any]], cache: Dict[Tuple, np.ndarray]) -> np.ndarray:
+        """Rows whose metadata equals every filter value, cached per filter until the next write."""
+        try:
+            key = tuple(sorted(filters.items()))
+            hash(key)
+        except TypeError:
+            key = None
+        mask = cache.get(key) if key is not None else None
+        if mask is None:
+            mask = np.fromiter(
+                (all(key in metadata and metadata[key] == value for key, value in filters.items())
+                 for metadata in metadatas),
+                dtype=bool,
+                count=len(metadatas)
+            )
+            if key is not None and len(cache) < MEMORY_DB_FILTER_CACHE_SIZE:
+                cache[key] = mask
+        return mask
+
+    def search_batch(self,
+                     queries: np.ndarray,
+                     top_k: int,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[Tuple[float, str, str, Dict[str, Any]]]]:
+        """
+        Exact cosine search for a normalized query matrix: one matmul for
+        all queries, then argpartition for each row's top_k.
+
+        Returns (score, id, text, metadata) per hit, best first.
+        """
+        vectors, ids, texts, metadatas, _, masks = self.state
+        count = len(ids)
+        if count == 0 or top_k <= 0:
+            return [[] for _ in range(len(queries))]
+
+        scores = queries @ vectors.T
+        if filters:
+            mask = self._filter_mask(filters, metadatas, masks)
+            scores[:, ~mask] = -np.inf
+
+        k = min(top_k, count)
+        if k < count:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(count), (len(queries), count))
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        return [
+            [(float(score), ids[row], texts[row], metadatas[row]) for score, row in zip(row_scores, rows) if score != -np.inf]
+            for row_scores, rows in zip(top_scores, top)
+        ]
+
+    def save(self, path: Path) -> None:
+        """
+        Snapshot vectors as .npy and the documents as JSON, each replaced
+        atomically, then drop the write log the snapshot now covers.
+        """
+        vectors, ids, texts, metadatas, _, _ = self.state
+        path.mkdir(parents=True, exist_ok=True)
+
+        # np.save appends .npy to names without it, so keep the suffix on the temp file
+        tmp_vectors = path / f"tmp.{VECTORS_FILE_NAME}"
+        np.save(tmp_vectors, vectors)
+        tmp_documents = path / f"{DOCUMENTS_FILE_NAME}.tmp"
+        with open(tmp_documents, "w") as f:
+            json.dump({"dimension": self.dimension, "ids": ids, "texts": texts, "metadatas": metadatas}, f, default=str)
+
+        os.replace(tmp_vectors, path / VECTORS_FILE_NAME)
+        os.replace(tmp_documents, path / DOCUMENTS_FILE_NAME)
+        # Replaying records the snapshot already holds gives the same rows,
+        # so a crash before this unlink loses nothing
+        (path / LOG_FILE_NAME).unlink(missing_ok=True)
+        self.log_bytes = 0
+        self.snapshot_bytes = (path / VECTORS_FILE_NAME).stat().st_size + (path / DOCUMENTS_FILE_NAME).stat().st_size
+
+    def log(self, path: Path, record: Dict[str, Any], vectors: Optional[np.ndarray] = None) -> None:
+        """Append one write to the log: a JSON header, then its float32 vectors."""
+        header = json.dumps(record, default=str).encode()
+        payload = np.ascontiguousarray(vectors, dtype="<f4").tobytes() if vectors is not None else b""
+        with open(path / LOG_FILE_NAME, "ab") as f:
+            f.write(LOG_HEADER.pack(len(header)) + header + payload)
+        self.log_bytes += LOG_HEADER.size + len(header) + len(payload)
+
+    def needs_snapshot(self) -> bool:
+        return self.log_bytes > max(MEMORY_DB_SNAPSHOT_BYTES, self.snapshot_bytes)
+
+    def _replay(self, path: Path) -> None:
+        """Apply logged writes; a record cut short by a crash is dropped."""
+        log_path = path / LOG_FILE_NAME
+        if not log_path.exists():
+            return
+        data = log_path.read_bytes()
+        offset = 0
+        while offset + LOG_HEADER.size <= len(data):
+            (header_size,) = LOG_HEADER.unpack_from(data, offset)
+            start = offset + LOG_HEADER.size
+            if start + header_size > len(data):
+                break
+            record = json.loads(data[start:start + header_size])
+            end = start + header_size + 4 * self.dimension * record.get("rows", 0)
+            if end > len(data):
+                break
+            if record["op"] == "upsert":
+                vectors = np.frombuffer(data, dtype="<f4", count=self.dimension * record["rows"],
+                                        offset=start + header_size).reshape(-1, self.dimension)
+                self.upsert(record["ids"], record["texts"], record["metadatas"], vectors.astype(np.float32))
+            else:
+                self.delete(record["ids"])
+            offset = end
+        if offset < len(data):
+            with open(log_path, "r+b") as f:
+                f.truncate(offset)
+        self.log_bytes = offset
+
+    @classmethod
+    def load(cls, path: Path) -> "MemoryCollection":
+        with open(path / DOCUMENTS_FILE_NAME) as f:
+            documents = json.load(f)
+        vectors = np.load(path / VECTORS_FILE_NAME, mmap_mode="r" if MEMORY_DB_MMAP else None)
+        if vectors.shape != (len(documents["ids"]), documents["dimension"]):
+            raise ValueError(f"Vectors {vectors.shape} do not match {len(documents['ids'])} documents in {path}")
+        collection = cls(documents["dimension"], vectors, documents["ids"], documents["texts"], documents["metadatas"])
+        collection.snapshot_bytes = (path / VECTORS_FILE_NAME).stat().st_size + (path / DOCUMENTS_FILE_NAME).stat().st_size
+        collection._replay(path)
+        return collection
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return (path / DOCUMENTS_FILE_NAME).exists()
+
+
+class MemoryDBClient(VectorDatabaseClient):
+    """
+    Client keeping each collection in process as a NumPy matrix and
+    searching it exactly with one BLAS matmul per query batch.
+
+    Meant for small collections, where scanning every vector costs less
+    than a round trip to a database; the scan grows with vectors x dimension,
+    so large collections belong in an ANN-indexed backend. With a persistence_path every write is appended
+    to a log, which is folded into a .npy + JSON snapshot once it grows past
+    the snapshot's size and on close(); collections are memory-mapped back
+    on load and the log replayed. Without one, collections live only as
+    long as the process.
+    """
+
+    # Each write copies the collection in memory, so few large uploads
+    ingest_batch_size = 50000
+    ingest_max_batch_bytes = 256 * 1024 * 1024
+    ingest_concurrency = 1
+
+    def __init__(self, persistence_path: Optional[str] = None):
+        self.persistence_path = Path(persistence_path) if persistence_path else None
+        self.collections: Dict[str, MemoryCollection] = {}
+        self._lock = threading.Lock()
+
+    def connect(self) -> bool:
+        """Ensure the persistence directory exists, if there is one."""
+        try:
+            if self.persistence_path is not None:
+                os.makedirs(self.persistence_path, exist_ok=True)
+            return True
+        except Exception as e:
+            print(f"Failed to create persistence directory: {e}")
+            return False
+
+    def health_check(self) -> bool:
+        """Check the persistence directory is still there."""
+        return self.persistence_path is None or self.persistence_path.is_dir()
+
+    def close(self) -> None:
+        """Snapshot collections with logged writes, then drop them; persisted ones reload on next use."""
+        with self._lock:
+            collections, self.collections = self.collections, {}
+        for collection_name, collection in collections.items():
+            path = self._get_collection_path(collection_name)
+            if path is None or not collection.log_bytes:
+                continue
+            try:
+                with collection.lock:
+                    collection.save(path)
+            except Exception as e:
+                print(f"Failed to snapshot collection {collection_name}: {e}")
+
+    def _get_collection_path(self, collection_name: str) -> Optional[Path]:
+        if self.persistence_path is None:
+            return None
+        return self.persistence_path / collection_name
+
+    def _load_collection(self, collection_name: str, quiet: bool = False) -> Optional[MemoryCollection]:
+        """Return the collection, loading it from disk if needed."""
+        collection = self.collections.get(collection_name)
+        if collection is not None:
+            return collection
+        try:
+            with self._lock:
+                if collection_name not in self.collections:
+                    path = self._get_collection_path(collection_name)
+                    if path is None or not MemoryCollection.exists(path):
+                        raise FileNotFoundError(f"Collection {collection_name} does not exist")
+                    self.collections[collection_name] = MemoryCollection.load(path)
+                return self.collections[collection_name]
+        except Exception as e:
+            if not quiet:
+                print(f"Failed to load collection {collection_name}: {e}")
+            return None
+
+    def _save(self, collection_name: str, collection: MemoryCollection) -> None:
+        path = self._get_collection_path(collection_name)
+        if path is not None:
+            collection.save(path)
+
+    def _log(self, collection_name: str, collection: MemoryCollection,
+             record: Dict[str, Any], vectors: Optional[np.ndarray] = None) -> None:
+        """Persist one write, snapshotting instead once the log is due for it."""
+        path = self._get_collection_path(collection_name)
+        if path is None:
+            return
+        collection.log(path, record, vectors)
+        if collection.needs_snapshot():
+            collection.save(path)
+
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
+        """Create a new in-memory collection; only exact float32 search is supported."""
+        try:
+            if storage is not None and (not storage.is_default() or storage.on_disk):
+                raise ValueError("Memory collections store full float32 vectors in RAM; "
+                                 "reduction, quantization and on_disk are not supported")
+            if index is not None and index.index_type != "flat":
+                raise ValueError(f"Memory collections are searched exactly, not with {index.index_type}")
+
+            # Check if collection already exists
+            if self._load_collection(collection_name, quiet=True) is not None:
+                return True
+
+            with self._lock:
+                collection = MemoryCollection(dimension)
+                self._save(collection_name, collection)
+                self.collections[collection_name] = collection
+            return True
+        except Exception as e:
+            print(f"Failed to create collection {collection_name}: {e}")
+            return False
+
+    def delete_collection(self, collection_name: str) -> bool:
+        """Delete a collection and its files."""
+        try:
+            with self._lock:
+                self.collections.pop(collection_name, None)
+                path = self._get_collection_path(collection_name)
+                if path is not None and path.exists():
+                    shutil.rmtree(path)
+            return True
+        except Exception as e:
+            print(f"Failed to delete collection {collection_name}: {e}")
+            return False
+
+    def ingest_documents(self,
+                         collection_name: str,
+                         documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest document chunks, replacing documents with the same id."""
+        try:
+            batch = DocumentBatch.from_documents(documents)
+            collection = self._load_collection(collection_name)
+            if collection is None:
+                return False
+            if not len(batch):
+                return True
+
+            vectors = _normalized(batch.embeddings)
+            with collection.lock:
+                collection.upsert(batch.ids, batch.texts, batch.metadatas, vectors)
+                self._log(collection_name, collection, {
+                    "op": "upsert",
+                    "rows": len(batch),
+                    "ids": list(batch.ids),
+                    "texts": list(batch.texts),
+                    "metadatas": list(batch.metadatas)
+                }, vectors)
+            return True
+        except Exception as e:
+            print(f"Failed to ingest documents into {collection_name}: {e}")
+            return False
+
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """Delete documents from a collection."""
+        try:
+            collection = self._load_collection(collection_name)
+            if collection is None:
+                return False
+
+            with collection.lock:
+                if collection.delete(ids):
+                    self._log(collection_name, collection, {"op": "delete", "ids": list(ids)})
+            return True
+        except Exception as e:
+            print(f"Failed to delete documents from {collection_name}: {e}")
+            return False
+
+    def search(self,
+               collection_name: str,
+               query_vector: Vector,
+               top_k: int = 10,
+               filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
+        """Search for similar vectors in a collection."""
+        results = self.search_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters)
+        return results[0] if results else []
+
+    def search_batch(self,
+                     collection_name: str,
+                     query_vectors: Union[np.ndarray, List[Vector]],
+                     top_k: int = 10,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Search with all queries in one matrix multiplication."""
+        try:
+            collection = self._load_collection(collection_name)
+            if collection is None:
+                return []
+
+            hits = collection.search_batch(_normalized(np.atleast_2d(query_vectors)), top_k, filters)
+            return [
+                [
+                    SearchResult(id=doc_id, text=text, score=score, metadata=metadata)
+                    for score, doc_id, text, metadata in query_hits
+                ]
+                for query_hits in hits
+            ]
+        except Exception as e:
+            print(f"Failed to search in {collection_name}: {e}")
+            return []
+
+    def get_index_spec(self, collection_name: str) -> Optional[IndexSpec]:
+        """Memory collections are always searched exactly."""
+        if self._load_collection(collection_name) is None:
+            return None
+        return IndexSpec("flat")
+
+    def get_storage_spec(self, collection_name: str) -> Optional[StorageSpec]:
+        """Memory collections always store float32 vectors."""
+        if self._load_collection(collection_name) is None:
+            return None
+        return StorageSpec()
+
+    def count_documents(self, collection_name: str) -> int:
+        """Count the number of documents in a collection."""
+        try:
+            collection = self._load_collection(collection_name)
+            if collection is None:
+                return 0
+            return len(collection)
+        except Exception as e:
+            print(f"Failed to count documents in {collection_name}: {e}")
+            return 0
@@ -1,10 +1,14 @@
 """
 Milvus Vector Database Client Implementation
 """
-from typing import List, Dict, Any, Optional
+import json
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
 import random
 import string
-from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, SearchResult
+from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, DocumentBatch, SearchResult, Vector
+from app.vector_db_service.compression import StorageSpec
+from app.vector_db_service.indexing import IndexSpec
 
 from pymilvus import (
     connections,
@@ -16,11 +20,180 @@ from pymilvus import (
     MilvusException
 )
 
-from vector_database import VectorDatabaseClient, DocumentChunk, SearchResult
+# Metadata keys stored as typed scalar columns with their own index; every
+# other key is filtered through a path expression on the JSON metadata field
+SCALAR_FIELDS = {
+    "section": (DataType.VARCHAR, ""),
+    "chunk_index": (DataType.INT64, -1),
+}
+
+# Byte limits of the VARCHAR scalar columns. Section headings are free text,
+# so they get more room than a short label would need
+VARCHAR_MAX_LENGTHS = {
+    "section": 4096,
+}
+
+# Index built when create_collection is called without an index spec
+DEFAULT_INDEX_SPEC = IndexSpec("hnsw", m=8, ef_construction=64, ef_search=64)
+
+COMPARISON_OPERATORS = {
+    "$eq": "==",
+    "$ne": "!=",
+    "$gt": ">",
+    "$gte": ">=",
+    "$lt": "<",
+    "$lte": "<=",
+}
+
+
+def index_params(spec: IndexSpec) -> Dict[str, Any]:
+    """Milvus create_index parameters for an index spec."""
+    if spec.index_type == "hnsw":
+        index_type, params = "HNSW", {"M": spec.m, "efConstruction": spec.ef_construction}
+    elif spec.index_type == "ivf_flat":
+        index_type, params = "IVF_FLAT", {"nlist": spec.nlist}
+    elif spec.index_type == "ivf_pq":
+        index_type, params = "IVF_PQ", {"nlist": spec.nlist, "m": spec.pq_m, "nbits": spec.pq_bits}
+    elif spec.index_type == "diskann":
+        index_type, params = "DISKANN", {}
+    else:
+        index_type, params = "FLAT", {}
+    return {"metric_type": "COSINE", "index_type": index_type, "params": params}
+
+
+def spec_from_index(params: Dict[str, Any], recorded: Optional[Dict[str, Any]] = None) -> IndexSpec:
+    """
+    Index spec for a built vector index.
+
+    Build parameters come from the index itself; search-time values
+    (nprobe, ef_search) come from the spec recorded at creation, if any.
+    """
+    build = params.get("params") or {}
+    if isinstance(build, str):
+        build = json.loads(build)
+    build = {key: int(value) for key, value in build.items() if str(value).isdigit()}
+    index_type = {
+        "HNSW": "hnsw",
+        "IVF_FLAT": "ivf_flat",
+        "IVF_PQ": "ivf_pq",
+        "DISKANN": "diskann",
+    }.get(params.get("index_type"), "flat")
+
+    spec = dict(recorded or {})
+    spec["index_type"] = index_type
+    for ours, theirs in (("m", "M"), ("ef_construction", "efConstruction"), ("nlist", "nlist")):
+        if theirs in build:
+            spec[ours] = build[theirs]
+    if index_type == "ivf_pq":
+        spec.update({"pq_m": build.get("m", spec.get("pq_m", 16)), "pq_bits": build.get("nbits", spec.get("pq_bits", 8))})
+    return IndexSpec.from_dict(spec)
+
+
+def search_params(spec: IndexSpec, top_k: int, overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Milvus search parameters for an index spec.
+
+    Overrides ('ef', 'nprobe', 'search_list') replace the spec's values for
+    one call; ef and search_list are raised to top_k, which Milvus requires.
+    """
+    overrides = overrides or {}
+    if spec.index_type == "hnsw":
+        params = {"ef": max(overrides.get("ef", spec.ef_search), top_k)}
+    elif spec.is_ivf:
+        params = {"nprobe": overrides.get("nprobe", spec.nprobe)}
+    elif spec.index_type == "diskann":
+        params = {"search_list": max(overrides.get("search_list", spec.ef_search), top_k)}
+    else:
+        params = {}
+    return {"metric_type": "COSINE", "params": params}
+
+
+def _literal(value: Any) -> str:
+    """Milvus expression literal for a filter value."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, str):
+        return json.dumps(value)
+    raise ValueError(f"Unsupported filter value: {value!r}")
+
+
+def _fit_varchar(value: Any, max_length: int) -> Any:
+    """Cut a string to max_length UTF-8 bytes without splitting a character."""
+    if not isinstance(value, str):
+        return value
+    encoded = value.encode("utf-8")
+    if len(encoded) <= max_length:
+        return value
+    return encoded[:max_length].decode("utf-8", errors="ignore")
+
+
+def _fits_column(key: str, condition: Any, varchar_max_lengths: Dict[str, int]) -> bool:
+    """Whether every string operand of a filter fits the key's VARCHAR column."""
+    if key not in varchar_max_lengths:
+        return True
+    operands = condition.values() if isinstance(condition, dict) else [condition]
+    values = [item for value in operands for item in (value if isinstance(value, list) else [value])]
+    return all(not isinstance(value, str) or len(value.encode("utf-8")) <= varchar_max_lengths[key]
+               for value in values)
+
+
+def compile_filter(filters: Dict[str, Any],
+                   scalar_fields=SCALAR_FIELDS,
+                   json_field: str = "metadata",
+                   varchar_max_lengths: Dict[str, int] = VARCHAR_MAX_LENGTHS) -> str:
+    """
+    Compile a metadata filter into a Milvus boolean expression.
+
+    Plain values are equality tests, combined with AND. A value may also be
+    an operator dict ($eq, $ne, $gt, $gte, $lt, $lte, $in, $nin), and
+    $and / $or take a list of filters. Keys in scalar_fields compile to their
+    indexed column; any other key to a path on the JSON field. A string too
+    long for its column (per varchar_max_lengths) is matched on the JSON
+    field, since the column only holds a truncated copy.
+
+    Raises:
+        ValueError: If an operator or value type is not supported.
+    """
+    clauses = []
+    for key, condition in filters.items():
+        if key in ("$and", "$or"):
+            joiner = " and " if key == "$and" else " or "
+            clauses.append("(" + joiner.join(f"({compile_filter(sub, scalar_fields, json_field, varchar_max_lengths)})" for sub in condition) + ")")
+            continue
+        field = key if key in scalar_fields and _fits_column(key, condition, varchar_max_lengths) else f"{json_field}[{json.dumps(key)}]"
+        operators = condition if isinstance(condition, dict) else {"$eq": condition}
+        for operator, value in operators.items():
+            if operator in COMPARISON_OPERATORS:
+                clauses.append(f"{field} {COMPARISON_OPERATORS[operator]} {_literal(value)}")
+            elif operator in ("$in", "$nin"):
+                values = ", ".join(_literal(item) for item in value)
+                clauses.append(f"{field} {'in' if operator == '$in' else 'not in'} [{values}]")
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+    return " and ".join(clauses)
+
+
+def _legacy_filter(filters: Dict[str, Any]) -> str:
+    """Substring match on the metadata_json string of collections created before scalar fields."""
+    clauses = []
+    for key, value in filters.items():
+        if isinstance(value, dict) or key.startswith("$"):
+            raise ValueError("Operator filters need a collection with a JSON metadata field; recreate it")
+        pair = json.dumps({key: value})[1:-1].replace("\\", "\\\\").replace('"', '\\"')
+        clauses.append(f'metadata_json like "%{pair}%"')
+    return " and ".join(clauses)
+
 
 class MilvusDBClient(VectorDatabaseClient):
     """Client for Milvus vector database."""
     
+    # Inserts are gRPC messages capped at 64 MB
+    ingest_batch_size = 2000
+    ingest_max_batch_bytes = 32 * 1024 * 1024
+    ingest_concurrency = 4
+    
     def __init__(self, 
                  host: str = 'localhost', 
                  port: str = '19530',
@@ -34,6 +207,8 @@ class MilvusDBClient(VectorDatabaseClient):
         self.secure = secure
         self.connection_alias = 'default'
         self._collections = {}
+        self._index_specs: Dict[str, IndexSpec] = {}
+        self._loaded = set()
     
     def connect(self) -> bool:
         """Establish connection to Milvus."""
@@ -53,8 +228,31 @@ class MilvusDBClient(VectorDatabaseClient):
             print(f"Failed to connect to Milvus: {e}")
             return False
     
-    def create_collection(self, collection_name: str, dimension: int) -> bool:
+    def health_check(self) -> bool:
+        """Check the server still answers a collection listing."""
+        try:
+            utility.list_collections(using=self.connection_alias)
+            return True
+        except Exception:
+            return False
+    
+    def close(self) -> None:
+        """Disconnect this client's connection alias."""
+        try:
+            connections.disconnect(self.connection_alias)
+        except Exception as e:
+            print(f"Failed to disconnect from Milvus: {e}")
+    
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
         """Create a new collection in Milvus."""
+        if storage is not None and (not storage.is_default() or storage.on_disk):
+            print(f"Milvus client does not support storage option {storage}")
+            return False
+        index = index or DEFAULT_INDEX_SPEC
         try:
             # Check if collection exists
             if utility.has_collection(collection_name):
@@ -66,11 +264,17 @@ class MilvusDBClient(VectorDatabaseClient):
                 FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=100),
                 FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
                 FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dimension),
-                # For metadata, we'll create specific fields for commonly used types
-                FieldSchema(name="metadata_json", dtype=DataType.VARCHAR, max_length=65535)
+                # Commonly filtered metadata gets typed columns; the full dict stays queryable as JSON
+                *[
+                    FieldSchema(name=name, dtype=dtype, max_length=VARCHAR_MAX_LENGTHS[name]) if dtype == DataType.VARCHAR
+                    else FieldSchema(name=name, dtype=dtype)
+                    for name, (dtype, _) in SCALAR_FIELDS.items()
+                ],
+                FieldSchema(name="metadata", dtype=DataType.JSON)
             ]
             
-            schema = CollectionSchema(fields=fields)
+            # The description records the index spec so search params survive a restart
+            schema = CollectionSchema(fields=fields, description=json.dumps({"index": index.to_dict()}))
             
             # Create collection
             collection = Collection(
@@ -80,18 +284,23 @@ class MilvusDBClient(VectorDatabaseClient):
             )
             
             # Create index for vector field
-            index_params = {
-                "metric_type": "COSINE",
-                "index_type": "HNSW",
-                "params": {"M": 8, "efConstruction": 64}
-            }
-            
             collection.create_index(
                 field_name="embedding",
-                index_params=index_params
+                index_params=index_params(index),
+                index_name="embedding_index"
             )
             
-            collection.load()
+            # Inverted indexes let filtered searches skip non-matching entities
+            for name in SCALAR_FIELDS:
+                collection.create_index(
+                    field_name=name,
+                    index_params={"index_type": "INVERTED"},
+                    index_name=f"{name}_index"
+                )
+            
+            self._collections[collection_name] = collection
+            self._index_specs[collection_name] = index
+            self.load_collection(collection_name)
             return True
         except Exception as e:
             print(f"Failed to create collection {collection_name}: {e}")
@@ -105,6 +314,8 @@ class MilvusDBClient(VectorDatabaseClient):
                 
             if collection_name in self._collections:
                 del self._collections[collection_name]
+            self._index_specs.pop(collection_name, None)
+            self._loaded.discard(collection_name)
                 
             return True
         except Exception as e:
@@ -121,86 +332,208 @@ class MilvusDBClient(VectorDatabaseClient):
                 name=collection_name,
                 using=self.connection_alias
             )
-            self._collections[collection_name].load()
             
         return self._collections[collection_name]
     
+    def load_collection(self, collection_name: str) -> Collection:
+        """
+        Load a collection into query node memory once and remember it.
+        
+        Searches need a loaded collection; writes do not, so only search
+        paths call this. A collection already loaded by another process is
+        adopted without reloading.
+        """
+        collection = self._get_collection(collection_name)
+        if collection_name not in self._loaded:
+            state = utility.load_state(collection_name, using=self.connection_alias)
+            if state.name != "Loaded":
+                collection.load()
+            self._loaded.add(collection_name)
+        return collection
+    
+    def release_collection(self, collection_name: str) -> bool:
+        """Release a collection from query node memory."""
+        try:
+            self._get_collection(collection_name).release()
+            self._loaded.discard(collection_name)
+            return True
+        except Exception as e:
+            print(f"Failed to release collection {collection_name}: {e}")
+            return False
+    
+    def get_index_spec(self, collection_name: str) -> Optional[IndexSpec]:
+        """Index spec of the collection's vector index."""
+        if collection_name not in self._index_specs:
+            try:
+                collection = self._get_collection(collection_name)
+                try:
+                    recorded = json.loads(collection.description or "{}").get("index")
+                except (ValueError, AttributeError):
+                    recorded = None
+                vector_index = next((index for index in collection.indexes if index.field_name == "embedding"), None)
+                if vector_index is None:
+                    return IndexSpec.from_dict(recorded) if recorded else DEFAULT_INDEX_SPEC
+                self._index_specs[collection_name] = spec_from_index(vector_index.params, recorded)
+            except Exception as e:
+                print(f"Failed to read index spec for {collection_name}: {e}")
+                return None
+        return self._index_specs[collection_name]
+    
+    def set_search_params(self,
+                          collection_name: str,
+                          nprobe: Optional[int] = None,
+                          ef_search: Optional[int] = None) -> bool:
+        """Change this client's default IVF nprobe / HNSW ef (DiskANN search_list) for a collection."""
+        spec = self.get_index_spec(collection_name)
+        if spec is None:
+            return False
+        updated = spec.to_dict()
+        if nprobe is not None:
+            updated["nprobe"] = nprobe
+        if ef_search is not None:
+            updated["ef_search"] = ef_search
+        try:
+            self._index_specs[collection_name] = IndexSpec.from_dict(updated)
+            return True
+        except ValueError as e:
+            print(f"Failed to set search params for {collection_name}: {e}")
+            return False
+    
+    @staticmethod
+    def _varchar_limits(collection: Collection) -> Dict[str, int]:
+        """VARCHAR scalar column limits as built, which may predate VARCHAR_MAX_LENGTHS."""
+        return {
+            field.name: int(field.params.get("max_length", VARCHAR_MAX_LENGTHS[field.name]))
+            for field in collection.schema.fields
+            if field.name in VARCHAR_MAX_LENGTHS
+        }
+    
+    @staticmethod
+    def _is_legacy(collection: Collection) -> bool:
+        """Collections created before scalar fields keep metadata as one JSON string."""
+        return any(field.name == "metadata_json" for field in collection.schema.fields)
+    
     def ingest_documents(self, 
                          collection_name: str, 
-                         documents: List[DocumentChunk]) -> bool:
+                         documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
         """Ingest multiple document chunks into Milvus."""
         try:
             collection = self._get_collection(collection_name)
-            
-            ids = [doc.id for doc in documents]
-            texts = [doc.text for doc in documents]
-            embeddings = [doc.embedding for doc in documents]
-            
+            collection.insert(self._to_entities(collection, DocumentBatch.from_documents(documents)))
+            return True
+        except Exception as e:
+            print(f"Failed to ingest documents into {collection_name}: {e}")
+            return False
+    
+    def upsert(self,
+               collection_name: str,
+               documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Insert or replace entities by primary key (a plain insert would duplicate them)."""
+        try:
+            collection = self._get_collection(collection_name)
+            collection.upsert(self._to_entities(collection, DocumentBatch.from_documents(documents)))
+            return True
+        except Exception as e:
+            print(f"Failed to upsert documents into {collection_name}: {e}")
+            return False
+    
+    def _to_entities(self, collection: Collection, batch: DocumentBatch) -> List[Any]:
+        """Column-ordered entity lists matching the collection schema."""
+        if self._is_legacy(collection):
             # Convert metadata dictionaries to JSON strings
-            import json
-            metadata_jsons = [json.dumps(doc.metadata) for doc in documents]
-            
-            entities = [
-                ids,
-                texts,
-                embeddings,
-                metadata_jsons
+            metadata_column = [json.dumps(metadata) for metadata in batch.metadatas]
+            scalar_columns = []
+        else:
+            metadata_column = batch.metadatas
+            scalar_columns = [
+                [default if metadata.get(name) is None else metadata[name] for metadata in batch.metadatas]
+                for name, (_, default) in SCALAR_FIELDS.items()
             ]
-            
-            collection.insert(entities)
+            # Milvus rejects the whole insert if one VARCHAR value is over its
+            # max_length, so over-long values are truncated in the column; the
+            # full value stays in the JSON metadata, which compile_filter uses
+            # for strings that long
+            limits = self._varchar_limits(collection)
+            for name, column in zip(SCALAR_FIELDS, scalar_columns):
+                if name in limits:
+                    column[:] = [_fit_varchar(value, limits[name]) for value in column]
+        
+        # pymilvus accepts the float32 matrix rows directly
+        return [
+            batch.ids,
+            batch.texts,
+            batch.float32(),
+            *scalar_columns,
+            metadata_column
+        ]
+    
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """Delete entities by primary key from Milvus."""
+        try:
+            if ids:
+                collection = self._get_collection(collection_name)
+                collection.delete(expr=f"id in {json.dumps(list(ids))}")
             return True
         except Exception as e:
-            print(f"Failed to ingest documents into {collection_name}: {e}")
+            print(f"Failed to delete documents from {collection_name}: {e}")
             return False
     
     def search(self, 
                collection_name: str,
-               query_vector: List[float],
+               query_vector: Vector,
                top_k: int = 10,
-               filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
-        """Search for similar vectors in Milvus."""
+               filters: Optional[Dict[str, Any]] = None,
+               params: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
+        """
+        Search for similar vectors in Milvus.
+        
+        params overrides the collection's search parameters for this call
+        ('ef' for HNSW, 'nprobe' for IVF, 'search_list' for DiskANN).
+        """
+        results = self.search_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters, params)
+        return results[0] if results else []
+    
+    def search_batch(self,
+                     collection_name: str,
+                     query_vectors: Union[np.ndarray, List[Vector]],
+                     top_k: int = 10,
+                     filters: Optional[Dict[str, Any]] = None,
+                     params: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Search with all queries as one multi-vector Milvus search."""
         try:
-            collection = self._get_collection(collection_name)
-            
-            # Prepare search parameters
-            search_params = {
-                "metric_type": "COSINE",
-                "params": {"ef": 64}
-            }
+            collection = self.load_collection(collection_name)
             
-            # Build expression for filtering if provided
+            # Scalar fields hit their inverted index; other keys use JSON path expressions
+            legacy = self._is_legacy(collection)
             expr = None
             if filters:
-                # This is simplified - for complex filters you'd need to build expressions
-                # based on available fields and filter values
-                import json
-                filter_json = json.dumps(filters)
-                # Simple string matching for JSON (not very efficient but works for demo)
-                expr = f"metadata_json like '%{filter_json.replace('"', '\\"')}%'"
+                expr = _legacy_filter(filters) if legacy else compile_filter(
+                    filters, varchar_max_lengths=self._varchar_limits(collection))
+            metadata_field = "metadata_json" if legacy else "metadata"
             
             results = collection.search(
-                data=[query_vector],
+                data=list(np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))),
                 anns_field="embedding",
-                param=search_params,
+                param=search_params(self.get_index_spec(collection_name), top_k, params),
                 limit=top_k,
                 expr=expr,
-                output_fields=["id", "text", "metadata_json"]
+                output_fields=["id", "text", metadata_field]
             )
             
-            search_results = []
-            import json
+            batch_results = []
             
             for hits in results:
+                search_results = []
                 for hit in hits:
                     entity = hit.entity
                     
-                    # Parse metadata from JSON string
-                    metadata = {}
-                    if "metadata_json" in entity:
+                    metadata = entity.get(metadata_field) or {}
+                    if legacy:
+                        # Parse metadata from JSON string
                         try:
-                            metadata = json.loads(entity.get("metadata_json", "{}"))
-                        except json.JSONDecodeError:
-                            pass
+                            metadata = json.loads(metadata)
+                        except (TypeError, json.JSONDecodeError):
+                            metadata = {}
                     
                     search_results.append(SearchResult(
                         id=entity.get("id", ""),
@@ -208,8 +541,9 @@ class MilvusDBClient(VectorDatabaseClient):
                         score=hit.score, 
                         metadata=metadata
                     ))
+                batch_results.append(search_results)
             
-            return search_results
+            return batch_results
         except Exception as e:
             print(f"Failed to search in {collection_name}: {e}")
             return []
@@ -1,25 +1,61 @@
 """
 Qdrant Vector Database Client Implementation
 """
-from typing import List, Dict, Any, Optional
+import asyncio
+from typing import List, Dict, Any, Optional, Set, Union
+import numpy as np
 import qdrant_client
 from qdrant_client.http import models
 from qdrant_client.http.exceptions import UnexpectedResponse
 
-from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, SearchResult
+from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, DocumentBatch, SearchResult, Vector
+from app.vector_db_service.compression import StorageSpec
+from app.vector_db_service.indexing import IndexSpec
+
+# Metadata keys that get a payload index so filtered searches skip the payload scan
+PAYLOAD_INDEXES = {
+    "section": models.PayloadSchemaType.KEYWORD,
+    "chunk_index": models.PayloadSchemaType.INTEGER,
+}
+
+
+def quantization_config(storage: StorageSpec) -> Optional[models.QuantizationConfig]:
+    """Qdrant quantization for a storage spec; quantized vectors always stay in RAM."""
+    if storage.quantization == "int8":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    if storage.quantization == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    return None
+
+
 class QdrantDBClient(VectorDatabaseClient):
     """Client for Qdrant vector database."""
     
+    # Vectors travel as JSON (~3x their binary size) against a 32 MB request limit
+    ingest_batch_size = 256
+    ingest_max_batch_bytes = 8 * 1024 * 1024
+    ingest_concurrency = 4
+    
     def __init__(self, 
                  host: str = 'localhost', 
                  port: int = 6333, 
                  api_key: Optional[str] = None,
-                 https: bool = False):
+                 https: bool = False,
+                 payload_indexes: Optional[Dict[str, str]] = None):
         self.host = host
         self.port = port
         self.api_key = api_key
         self.https = https
+        self.payload_indexes = PAYLOAD_INDEXES if payload_indexes is None else payload_indexes
         self._client = None
+        self._async_client = None
+        # Holds a close() scheduled on a running loop until it completes
+        self._closing: Optional[asyncio.Task] = None
+        self._search_params: Dict[str, Optional[models.SearchParams]] = {}
+        # Collections whose payload indexes were checked by this client
+        self._indexed_collections: Set[str] = set()
     
     def connect(self) -> bool:
         """Establish connection to Qdrant."""
@@ -37,13 +73,85 @@ class QdrantDBClient(VectorDatabaseClient):
             print(f"Failed to connect to Qdrant: {e}")
             return False
     
-    def create_collection(self, collection_name: str, dimension: int) -> bool:
-        """Create a new collection in Qdrant."""
+    def health_check(self) -> bool:
+        """Check the server still answers a collection listing."""
+        try:
+            if self._client is None:
+                return False
+            self._client.get_collections()
+            return True
+        except Exception:
+            return False
+    
+    def close(self) -> None:
+        """
+        Close the HTTP/gRPC channels.
+
+        The async client's close() is a coroutine: it is scheduled on the
+        running loop when called from one, and run to completion otherwise.
+        Prefer aclose() from async code so the close is awaited.
+        """
+        async_client, self._async_client = self._async_client, None
+        if async_client is not None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+            try:
+                if loop is not None:
+                    self._closing = loop.create_task(async_client.close())
+                else:
+                    asyncio.run(async_client.close())
+            except Exception as e:
+                print(f"Failed to close async Qdrant client: {e}")
+        try:
+            if self._client is not None:
+                self._client.close()
+        except Exception as e:
+            print(f"Failed to close Qdrant client: {e}")
+        self._client = None
+
+    async def aclose(self) -> None:
+        """Close both clients, awaiting the async client's channels."""
+        async_client, self._async_client = self._async_client, None
+        if async_client is not None:
+            try:
+                await async_client.close()
+            except Exception as e:
+                print(f"Failed to close async Qdrant client: {e}")
+        self.close()
+    
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
+        """
+        Create a new collection in Qdrant.
+        
+        int8 / binary storage maps to Qdrant quantization, searched with
+        rescoring over rescore_factor x oversampling; on_disk keeps the
+        float vectors and payloads on disk. An hnsw index spec sets m and
+        ef_construct (flat keeps Qdrant's default HNSW). Payload indexes are
+        created for the client's payload_indexes keys, including on an
+        existing collection that is missing some of them.
+        """
+        storage = storage or StorageSpec()
+        index = index or IndexSpec()
+        # Qdrant stores the vectors it is given, so reductions would have to happen client-side
+        if storage.reduction != "none":
+            print(f"Qdrant client does not support storage option {storage}")
+            return False
+        if index.index_type not in ("flat", "hnsw"):
+            print(f"Qdrant only supports HNSW indexes, not {index}")
+            return False
         try:
             # First check if collection already exists
             collections = self._client.get_collections()
             if collection_name in [col.name for col in collections.collections]:
                 print(f"Collection {collection_name} already exists.")
+                # Collections created before an index was configured get it now
+                self._ensure_payload_indexes(collection_name)
                 return True
             
             # Create collection with vector configuration
@@ -51,18 +159,46 @@ class QdrantDBClient(VectorDatabaseClient):
                 collection_name=collection_name,
                 vectors_config=models.VectorParams(
                     size=dimension,
-                    distance=models.Distance.COSINE
-                )
+                    distance=models.Distance.COSINE,
+                    on_disk=storage.on_disk
+                ),
+                hnsw_config=models.HnswConfigDiff(
+                    m=index.m,
+                    ef_construct=index.ef_construction
+                ) if index.index_type == "hnsw" else None,
+                quantization_config=quantization_config(storage),
+                on_disk_payload=storage.on_disk
             )
+            
+            self._ensure_payload_indexes(collection_name)
+            
+            self._search_params[collection_name] = self._to_search_params(storage, index)
             return True
         except Exception as e:
             print(f"Failed to create collection {collection_name}: {e}")
             return False
     
+    def _ensure_payload_indexes(self, collection_name: str) -> None:
+        """Create the configured payload indexes the collection does not have yet."""
+        if not self.payload_indexes or collection_name in self._indexed_collections:
+            return
+        existing = self._client.get_collection(collection_name=collection_name).payload_schema or {}
+        for field_name, field_schema in self.payload_indexes.items():
+            if field_name in existing:
+                continue
+            self._client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema
+            )
+        self._indexed_collections.add(collection_name)
+    
     def delete_collection(self, collection_name: str) -> bool:
         """Delete a collection from Qdrant."""
         try:
             self._client.delete_collection(collection_name=collection_name)
+            self._search_params.pop(collection_name, None)
+            self._indexed_collections.discard(collection_name)
             return True
         except UnexpectedResponse as e:
             if "does not exist" in str(e):
@@ -74,75 +210,175 @@ class QdrantDBClient(VectorDatabaseClient):
             print(f"Failed to delete collection {collection_name}: {e}")
             return False
     
+    def _to_points(self, documents: Union[List[DocumentChunk], DocumentBatch]) -> models.Batch:
+        batch = DocumentBatch.from_documents(documents)
+        # Column-oriented upload avoids building one PointStruct per document
+        return models.Batch(
+            ids=batch.ids,
+            vectors=batch.float32().tolist(),
+            payloads=[
+                {"text": text, **metadata}
+                for text, metadata in zip(batch.texts, batch.metadatas)
+            ]
+        )
+    
     def ingest_documents(self, 
                          collection_name: str, 
-                         documents: List[DocumentChunk]) -> bool:
+                         documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
         """Ingest multiple document chunks into Qdrant."""
         try:
-            points = []
-            for doc in documents:
-                points.append(
-                    models.PointStruct(
-                        id=doc.id,
-                        vector=doc.embedding,
-                        payload={
-                            "text": doc.text,
-                            **doc.metadata
-                        }
-                    )
-                )
-            
             self._client.upsert(
                 collection_name=collection_name,
-                points=points
+                points=self._to_points(documents)
             )
             return True
         except Exception as e:
             print(f"Failed to ingest documents into {collection_name}: {e}")
             return False
     
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """Delete points by id from Qdrant."""
+        try:
+            if ids:
+                self._client.delete(
+                    collection_name=collection_name,
+                    points_selector=models.PointIdsList(points=list(ids))
+                )
+            return True
+        except Exception as e:
+            print(f"Failed to delete documents from {collection_name}: {e}")
+            return False
+    
     def search(self, 
                collection_name: str,
-               query_vector: List[float],
+               query_vector: Vector,
                top_k: int = 10,
                filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
         """Search for similar vectors in Qdrant."""
-        try:
-            # Convert filters to Qdrant filter format if provided
-            filter_condition = None
-            if filters:
-                # This is a simplified filter conversion logic
-                # For complex filters, you might need a more sophisticated approach
-                filter_condition = models.Filter(
-                    must=[
-                        models.FieldCondition(
-                            key=key,
-                            match=models.MatchValue(value=value)
-                        )
-                        for key, value in filters.items()
-                    ]
+        results = self.search_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters)
+        return results[0] if results else []
+    
+    def _to_filter(self, filters: Optional[Dict[str, Any]]) -> Optional[models.Filter]:
+        """Convert filters to Qdrant filter format."""
+        if not filters:
+            return None
+        # This is a simplified filter conversion logic
+        # For complex filters, you might need a more sophisticated approach
+        return models.Filter(
+            must=[
+                models.FieldCondition(
+                    key=key,
+                    match=models.MatchValue(value=value)
                 )
-            
-            search_results = self._client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
+                for key, value in filters.items()
+            ]
+        )
+    
+    @staticmethod
+    def _to_search_params(storage: StorageSpec, index: IndexSpec) -> Optional[models.SearchParams]:
+        """hnsw_ef for tuned HNSW indexes, rescoring for quantized storage."""
+        quantization = None
+        if storage.quantization != "none":
+            quantization = models.QuantizationSearchParams(
+                rescore=True,
+                oversampling=float(storage.rescore_factor)
+            )
+        hnsw_ef = index.ef_search if index.index_type == "hnsw" else None
+        if quantization is None and hnsw_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+    
+    @staticmethod
+    def _to_storage_spec(config: models.CollectionConfig) -> StorageSpec:
+        """Storage spec read back from a collection's quantization and on-disk config."""
+        quantization = "none"
+        if isinstance(config.quantization_config, models.ScalarQuantization):
+            quantization = "int8"
+        elif isinstance(config.quantization_config, models.BinaryQuantization):
+            quantization = "binary"
+        return StorageSpec(
+            quantization=quantization,
+            on_disk=bool(config.params.on_disk_payload)
+        )
+    
+    def get_storage_spec(self, collection_name: str) -> Optional[StorageSpec]:
+        """Storage spec read back from the collection's quantization and on-disk config."""
+        try:
+            return self._to_storage_spec(self._client.get_collection(collection_name=collection_name).config)
+        except Exception as e:
+            print(f"Failed to read storage spec for {collection_name}: {e}")
+            return None
+    
+    def _cache_search_params(self, collection_name: str, storage: StorageSpec) -> Optional[models.SearchParams]:
+        # hnsw_ef falls back to the server default (ef_construct) for collections created elsewhere
+        self._search_params[collection_name] = self._to_search_params(storage, IndexSpec())
+        return self._search_params[collection_name]
+    
+    def _get_search_params(self, collection_name: str) -> Optional[models.SearchParams]:
+        """Search params for a collection, derived from its config if this client did not create it."""
+        if collection_name in self._search_params:
+            return self._search_params[collection_name]
+        storage = self.get_storage_spec(collection_name)
+        return self._cache_search_params(collection_name, storage) if storage is not None else None
+    
+    async def _aget_search_params(self, collection_name: str) -> Optional[models.SearchParams]:
+        """Like _get_search_params, reading the collection config through the async client."""
+        if collection_name in self._search_params:
+            return self._search_params[collection_name]
+        try:
+            info = await self._get_async_client().get_collection(collection_name=collection_name)
+        except Exception as e:
+            print(f"Failed to read storage spec for {collection_name}: {e}")
+            return None
+        return self._cache_search_params(collection_name, self._to_storage_spec(info.config))
+    
+    def _search_requests(self,
+                         query_vectors: Union[np.ndarray, List[Vector]],
+                         top_k: int,
+                         filters: Optional[Dict[str, Any]],
+                         params: Optional[models.SearchParams]) -> List[models.QueryRequest]:
+        filter_condition = self._to_filter(filters)
+        queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+        return [
+            models.QueryRequest(
+                query=query.tolist(),
                 limit=top_k,
-                query_filter=filter_condition
+                filter=filter_condition,
+                params=params,
+                with_payload=True
             )
-            
-            results = []
-            for res in search_results:
+            for query in queries
+        ]
+    
+    def _to_results(self, batch_results) -> List[List[SearchResult]]:
+        results = []
+        for response in batch_results:
+            query_results = []
+            for res in response.points:
                 # Extract text and metadata from payload
                 text = res.payload.pop("text", "")
                 
-                results.append(SearchResult(
+                query_results.append(SearchResult(
                     id=res.id,
                     text=text,
                     score=res.score,
                     metadata=res.payload
                 ))
-            
-            return results
+            results.append(query_results)
+        return results
+    
+    def search_batch(self,
+                     collection_name: str,
+                     query_vectors: Union[np.ndarray, List[Vector]],
+                     top_k: int = 10,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Search with all queries in one Qdrant query_batch_points request."""
+        try:
+            batch_results = self._client.query_batch_points(
+                collection_name=collection_name,
+                requests=self._search_requests(query_vectors, top_k, filters, self._get_search_params(collection_name))
+            )
+            return self._to_results(batch_results)
         except Exception as e:
             print(f"Failed to search in {collection_name}: {e}")
             return []
@@ -154,4 +390,65 @@ class QdrantDBClient(VectorDatabaseClient):
             return collection_info.vectors_count
         except Exception as e:
             print(f"Failed to count documents in {collection_name}: {e}")
-            return 0
\ No newline at end of file
+            return 0
+    
+    def _get_async_client(self) -> qdrant_client.AsyncQdrantClient:
+        """Native async client, created on first use so sync-only callers never open it."""
+        if self._async_client is None:
+            self._async_client = qdrant_client.AsyncQdrantClient(
+                host=self.host,
+                port=self.port,
+                api_key=self.api_key,
+                https=self.https
+            )
+        return self._async_client
+    
+    async def aingest_documents(self,
+                                collection_name: str,
+                                documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest documents through the async Qdrant client."""
+        try:
+            await self._get_async_client().upsert(
+                collection_name=collection_name,
+                points=self._to_points(documents)
+            )
+            return True
+        except Exception as e:
+            print(f"Failed to ingest documents into {collection_name}: {e}")
+            return False
+    
+    async def asearch(self,
+                      collection_name: str,
+                      query_vector: Vector,
+                      top_k: int = 10,
+                      filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
+        """Search through the async Qdrant client."""
+        results = await self.asearch_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters)
+        return results[0] if results else []
+    
+    async def asearch_batch(self,
+                            collection_name: str,
+                            query_vectors: Union[np.ndarray, List[Vector]],
+                            top_k: int = 10,
+                            filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Batched search through the async Qdrant client."""
+        try:
+            # Collection config is read with the async client too, so no call here blocks the loop
+            params = await self._aget_search_params(collection_name)
+            batch_results = await self._get_async_client().query_batch_points(
+                collection_name=collection_name,
+                requests=self._search_requests(query_vectors, top_k, filters, params)
+            )
+            return self._to_results(batch_results)
+        except Exception as e:
+            print(f"Failed to search in {collection_name}: {e}")
+            return []
+    
+    async def acount_documents(self, collection_name: str) -> int:
+        """Count documents through the async Qdrant client."""
+        try:
+            collection_info = await self._get_async_client().get_collection(collection_name=collection_name)
+            return collection_info.vectors_count
+        except Exception as e:
+            print(f"Failed to count documents in {collection_name}: {e}")
+            return 0
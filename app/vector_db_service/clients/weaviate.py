@@ -1,26 +1,66 @@
 """
 Weaviate Vector Database Client Implementation
 """
-from typing import List, Dict, Any, Optional
+import json
+import os
+from typing import List, Dict, Any, Optional, Union
+import numpy as np
 import weaviate
-from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, SearchResult
+from app.vector_db_service.vector_database import VectorDatabaseClient, DocumentChunk, DocumentBatch, SearchResult, Vector
+from app.vector_db_service.compression import StorageSpec
+from app.vector_db_service.indexing import IndexSpec
+
+# Starting batch size; with dynamic batching Weaviate resizes it from observed latency
+WEAVIATE_BATCH_SIZE = int(os.getenv("WEAVIATE_BATCH_SIZE", "100"))
+WEAVIATE_BATCH_WORKERS = int(os.getenv("WEAVIATE_BATCH_WORKERS", "4"))
+# Ids per batch delete; Weaviate caps one delete at QUERY_MAXIMUM_RESULTS (10000 by default)
+WEAVIATE_DELETE_BATCH_SIZE = int(os.getenv("WEAVIATE_DELETE_BATCH_SIZE", "1000"))
+
+# Metadata keys stored as top-level, filterable properties; the full dict is
+# kept as an unindexed JSON string for results
+FILTERABLE_PROPERTIES = {
+    "section": "text",
+    "chunk_index": "int",
+}
+
+WHERE_VALUE_KEYS = {
+    "text": "valueText",
+    "int": "valueInt",
+    "number": "valueNumber",
+    "boolean": "valueBoolean",
+}
+
+
 class WeaviateDBClient(VectorDatabaseClient):
     """Client for Weaviate vector database."""
     
+    # The client's own batcher re-splits each upsert and uploads with
+    # several workers; it is not thread-safe, so upserts run one at a time
+    ingest_batch_size = 5000
+    ingest_max_batch_bytes = 64 * 1024 * 1024
+    ingest_concurrency = 1
+    
     def __init__(self, 
                  host: str = 'localhost', 
                  port: int = 8080,
                  http_host: str = None,
                  api_key: str = None,
                  grpc_port: int = None,
-                 https: bool = False):
+                 https: bool = False,
+                 batch_size: int = WEAVIATE_BATCH_SIZE,
+                 batch_workers: int = WEAVIATE_BATCH_WORKERS,
+                 dynamic_batching: bool = True):
         self.host = host
         self.port = port
         self.http_host = http_host or f"{'https' if https else 'http'}://{host}:{port}"
         self.api_key = api_key
         self.grpc_port = grpc_port
         self.https = https
+        self.batch_size = batch_size
+        self.batch_workers = batch_workers
+        self.dynamic_batching = dynamic_batching
         self._client = None
+        self._legacy_classes: Dict[str, bool] = {}
         self.class_prefix = "VectorDB_"
     
     def connect(self) -> bool:
@@ -45,14 +85,35 @@ class WeaviateDBClient(VectorDatabaseClient):
             print(f"Failed to connect to Weaviate: {e}")
             return False
     
+    def health_check(self) -> bool:
+        """Check the server reports ready."""
+        try:
+            return self._client is not None and bool(self._client.is_ready())
+        except Exception:
+            return False
+    
+    def close(self) -> None:
+        """Drop the client."""
+        self._client = None
+    
     def _get_class_name(self, collection_name: str) -> str:
         """Convert collection name to Weaviate class name format."""
         # Weaviate class names must be CamelCase and can't start with a number
         cleaned_name = ''.join(word.capitalize() for word in collection_name.split('_'))
         return f"{self.class_prefix}{cleaned_name}"
     
-    def create_collection(self, collection_name: str, dimension: int) -> bool:
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
         """Create a new class in Weaviate."""
+        if storage is not None and (not storage.is_default() or storage.on_disk):
+            print(f"Weaviate client does not support storage option {storage}")
+            return False
+        if index is not None and not index.is_default():
+            print(f"Weaviate client does not support index option {index}")
+            return False
         try:
             class_name = self._get_class_name(collection_name)
             
@@ -70,16 +131,37 @@ class WeaviateDBClient(VectorDatabaseClient):
                 "vectorIndexConfig": {
                     "distance": "cosine"
                 },
+                # Only the flattened metadata properties are filtered on, so skip the optional indexes
+                "invertedIndexConfig": {
+                    "indexTimestamps": False,
+                    "indexNullState": False,
+                    "indexPropertyLength": False
+                },
                 "properties": [
                     {
                         "name": "text",
                         "dataType": ["text"],
-                        "description": "The text content of the document chunk"
+                        "description": "The text content of the document chunk",
+                        "indexFilterable": False,
+                        "indexSearchable": True
                     },
+                    *[
+                        {
+                            "name": name,
+                            "dataType": [data_type],
+                            "description": f"Metadata field {name}, flattened for filtering",
+                            "indexFilterable": True,
+                            "indexSearchable": False,
+                            **({"tokenization": "field"} if data_type == "text" else {})
+                        }
+                        for name, data_type in FILTERABLE_PROPERTIES.items()
+                    ],
                     {
-                        "name": "metadata",
-                        "dataType": ["object"],
-                        "description": "Metadata associated with the document chunk"
+                        "name": "metadata_json",
+                        "dataType": ["text"],
+                        "description": "Metadata associated with the document chunk, as JSON",
+                        "indexFilterable": False,
+                        "indexSearchable": False
                     }
                 ]
             }
@@ -106,6 +188,7 @@ class WeaviateDBClient(VectorDatabaseClient):
             
             # Delete class
             self._client.schema.delete_class(class_name)
+            self._legacy_classes.pop(class_name, None)
             return True
         except Exception as e:
             print(f"Failed to delete collection {collection_name}: {e}")
@@ -113,77 +196,157 @@ class WeaviateDBClient(VectorDatabaseClient):
     
     def ingest_documents(self, 
                          collection_name: str, 
-                         documents: List[DocumentChunk]) -> bool:
+                         documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
         """Ingest multiple document chunks into Weaviate."""
         try:
             class_name = self._get_class_name(collection_name)
+            documents = DocumentBatch.from_documents(documents)
+            embeddings = documents.float32()
+            legacy = self._is_legacy(class_name)
+            errors = []
             
-            # Use batch to efficiently insert documents
+            def collect_errors(results):
+                for result in results or []:
+                    error = (result.get("result") or {}).get("errors")
+                    if error:
+                        errors.append(error)
+            
+            # Dynamic batching resizes batches from observed latency; workers upload in parallel
+            self._client.batch.configure(
+                batch_size=self.batch_size,
+                dynamic=self.dynamic_batching,
+                num_workers=self.batch_workers,
+                timeout_retries=3,
+                connection_error_retries=3,
+                callback=collect_errors
+            )
             with self._client.batch as batch:
-                batch.batch_size = min(100, len(documents))  # Adjust batch size
-                
-                for doc in documents:
+                for i, doc_id in enumerate(documents.ids):
                     # Prepare properties
-                    properties = {
-                        "text": doc.text,
-                        "metadata": doc.metadata
-                    }
-                    
-                    # Add object to batch
                     batch.add_data_object(
-                        data_object=properties,
+                        data_object=self._to_properties(documents.texts[i], documents.metadatas[i], legacy),
                         class_name=class_name,
-                        uuid=doc.id,
-                        vector=doc.embedding
+                        uuid=doc_id,
+                        vector=embeddings[i]
                     )
             
+            if errors:
+                print(f"Failed to ingest {len(errors)} objects into {collection_name}: {errors[0]}")
+                return False
             return True
         except Exception as e:
             print(f"Failed to ingest documents into {collection_name}: {e}")
             return False
     
+    def _is_legacy(self, class_name: str) -> bool:
+        """Classes created before flattened properties keep metadata as one nested object."""
+        if class_name not in self._legacy_classes:
+            properties = self._client.schema.get(class_name).get("properties", [])
+            self._legacy_classes[class_name] = any(prop["name"] == "metadata" for prop in properties)
+        return self._legacy_classes[class_name]
+    
+    @staticmethod
+    def _to_properties(text: str, metadata: Dict[str, Any], legacy: bool) -> Dict[str, Any]:
+        if legacy:
+            return {"text": text, "metadata": metadata}
+        properties = {"text": text, "metadata_json": json.dumps(metadata, default=str)}
+        for name in FILTERABLE_PROPERTIES:
+            if metadata.get(name) is not None:
+                properties[name] = metadata[name]
+        return properties
+    
+    @staticmethod
+    def _to_where(filters: Dict[str, Any]) -> Dict[str, Any]:
+        """Equality filter on flattened properties, served by their inverted index."""
+        operands = []
+        for key, value in filters.items():
+            if key not in FILTERABLE_PROPERTIES:
+                raise ValueError(f"Metadata key {key} is not filterable; filterable keys are {list(FILTERABLE_PROPERTIES)}")
+            operands.append({
+                "path": [key],
+                "operator": "Equal",
+                WHERE_VALUE_KEYS[FILTERABLE_PROPERTIES[key]]: value
+            })
+        return operands[0] if len(operands) == 1 else {"operator": "And", "operands": operands}
+    
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """Delete objects by uuid from Weaviate, one batch delete per chunk of ids."""
+        try:
+            class_name = self._get_class_name(collection_name)
+            failed = 0
+            for start in range(0, len(ids), WEAVIATE_DELETE_BATCH_SIZE):
+                response = self._client.batch.delete_objects(
+                    class_name=class_name,
+                    where={
+                        "path": ["id"],
+                        "operator": "ContainsAny",
+                        "valueTextArray": list(ids[start:start + WEAVIATE_DELETE_BATCH_SIZE])
+                    },
+                    output="minimal"
+                )
+                failed += (response.get("results") or {}).get("failed", 0)
+            if failed:
+                print(f"Failed to delete {failed} objects from {collection_name}")
+                return False
+            return True
+        except Exception as e:
+            print(f"Failed to delete documents from {collection_name}: {e}")
+            return False
+    
     def search(self, 
                collection_name: str,
-               query_vector: List[float],
+               query_vector: Vector,
                top_k: int = 10,
                filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
         """Search for similar vectors in Weaviate."""
+        results = self.search_batch(collection_name, np.asarray(query_vector, dtype=np.float32).reshape(1, -1), top_k, filters)
+        return results[0] if results else []
+    
+    def search_batch(self,
+                     collection_name: str,
+                     query_vectors: Union[np.ndarray, List[Vector]],
+                     top_k: int = 10,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Search with all queries as aliased Get queries in one GraphQL request."""
         try:
             class_name = self._get_class_name(collection_name)
+            queries = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+            legacy = self._is_legacy(class_name)
+            if filters and legacy:
+                raise ValueError("Filtering needs flattened metadata properties; recreate the collection")
+            where_filter = self._to_where(filters) if filters else None
+            metadata_property = "metadata" if legacy else "metadata_json"
             
-            # Build query
-            query = self._client.query.get(class_name, ["text", "metadata", "_additional {id distance}"])
-            
-            # Add where filter if provided
-            if filters:
-                # This is a simplified implementation - Weaviate has more complex filter options
-                where_filter = {
-                    "path": ["metadata"],
-                    "operator": "Equal",
-                    "valueObject": filters
-                }
-                query = query.with_where(where_filter)
-            
-            # Add vector search
-            query = query.with_near_vector({
-                "vector": query_vector,
-                "certainty": 0.7  # Adjust threshold as needed
-            })
-            
-            # Set limit
-            query = query.with_limit(top_k)
+            builders = []
+            for i, query_vector in enumerate(queries):
+                # Build query
+                query = self._client.query.get(class_name, ["text", metadata_property, "_additional {id distance}"])
+                
+                # Add where filter if provided
+                if where_filter:
+                    query = query.with_where(where_filter)
+                
+                # Add vector search; top_k bounds the results, not a similarity cutoff
+                query = query.with_near_vector({
+                    "vector": query_vector.tolist()
+                })
+                
+                # Set limit; the alias keeps each query's hits apart in the response
+                builders.append(query.with_limit(top_k).with_alias(f"q{i}"))
             
             # Execute query
-            result = query.do()
+            result = self._client.query.multi_get(builders).do()
             
             # Process results
-            search_results = []
-            if result and "data" in result and "Get" in result["data"] and class_name in result["data"]["Get"]:
-                for item in result["data"]["Get"][class_name]:
+            batch_results = []
+            data = (result or {}).get("data", {}).get("Get", {})
+            for i in range(len(queries)):
+                search_results = []
+                for item in data.get(f"q{i}") or []:
                     # Extract data
                     item_id = item["_additional"]["id"]
                     text = item.get("text", "")
-                    metadata = item.get("metadata", {})
+                    metadata = (item.get("metadata") or {}) if legacy else json.loads(item.get("metadata_json") or "{}")
                     
                     # Convert distance to similarity score
                     distance = item["_additional"].get("distance", 0)
@@ -195,8 +358,9 @@ class WeaviateDBClient(VectorDatabaseClient):
                         score=score,
                         metadata=metadata
                     ))
+                batch_results.append(search_results)
             
-            return search_results
+            return batch_results
         except Exception as e:
             print(f"Failed to search in {collection_name}: {e}")
             return []
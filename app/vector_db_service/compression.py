@@ -0,0 +1,162 @@
+"""
+Vector Database Service - Per-collection storage options for embeddings
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional
+import numpy as np
+
+
+class StorageSpec:
+    """
+    How a collection stores its vectors.
+
+    Args:
+        dimension: Stored dimension after reduction (None keeps the input dimension)
+        reduction: 'none', 'truncate' (keep the leading components) or 'pca'
+        quantization: 'none' (float32), 'int8' (scalar) or 'binary' (1 bit per dimension)
+        rescore_factor: For quantized storage, how many candidates per requested
+            result are re-scored against the float query
+        on_disk: Keep full-precision vectors and payloads on disk, leaving only
+            quantized vectors and the index in RAM (Qdrant; FAISS segments are
+            memory-mapped regardless)
+    """
+
+    REDUCTIONS = ("none", "truncate", "pca")
+    QUANTIZATIONS = ("none", "int8", "binary")
+
+    def __init__(self,
+                 dimension: Optional[int] = None,
+                 reduction: str = "none",
+                 quantization: str = "none",
+                 rescore_factor: int = 4,
+                 on_disk: bool = False):
+        if reduction not in self.REDUCTIONS:
+            raise ValueError(f"Unsupported reduction: {reduction}")
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization: {quantization}")
+        if reduction != "none" and not dimension:
+            raise ValueError(f"Reduction '{reduction}' needs a target dimension")
+        if quantization == "binary" and dimension and dimension % 8 != 0:
+            raise ValueError("Binary quantization needs a dimension divisible by 8")
+        self.dimension = dimension
+        self.reduction = reduction
+        self.quantization = quantization
+        self.rescore_factor = max(1, rescore_factor)
+        self.on_disk = on_disk
+
+    def is_default(self) -> bool:
+        """True when vectors are stored unmodified as float32."""
+        return self.reduction == "none" and self.quantization == "none"
+
+    def stored_dimension(self, input_dimension: int) -> int:
+        """Dimension of the vectors actually stored."""
+        if self.reduction == "none":
+            return input_dimension
+        return min(self.dimension, input_dimension)
+
+    def bytes_per_vector(self, input_dimension: int) -> float:
+        """Storage cost of one vector, excluding index overhead."""
+        dimension = self.stored_dimension(input_dimension)
+        if self.quantization == "binary":
+            return dimension / 8
+        if self.quantization == "int8":
+            return float(dimension)
+        return dimension * 4.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "dimension": self.dimension,
+            "reduction": self.reduction,
+            "quantization": self.quantization,
+            "rescore_factor": self.rescore_factor,
+            "on_disk": self.on_disk
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "StorageSpec":
+        return cls(**data) if data else cls()
+
+    def __repr__(self):
+        return (f"StorageSpec(dimension={self.dimension}, reduction={self.reduction}, "
+                f"quantization={self.quantization}, rescore_factor={self.rescore_factor}, on_disk={self.on_disk})")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.clip(norms, 1e-12, None)
+
+
+class VectorProjector:
+    """
+    Dimension reduction applied before storage and to queries.
+
+    Truncation keeps the leading components; PCA centres vectors and
+    projects them onto the principal components fitted from the first
+    ingested batch. Outputs are re-normalized so inner product stays cosine.
+    """
+
+    def __init__(self, spec: StorageSpec, input_dimension: int):
+        self.spec = spec
+        self.input_dimension = input_dimension
+        self.output_dimension = spec.stored_dimension(input_dimension)
+        self.mean: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.spec.reduction != "pca" or self.components is not None
+
+    def fit(self, vectors: np.ndarray) -> None:
+        """Fit PCA components; a no-op for other reductions."""
+        if self.spec.reduction != "pca" or self.is_fitted:
+            return
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.shape[0] < self.output_dimension:
+            raise ValueError(
+                f"PCA to {self.output_dimension} dimensions needs at least "
+                f"{self.output_dimension} vectors in the first ingest, got {vectors.shape[0]}"
+            )
+        self.mean = vectors.mean(axis=0)
+        _, _, vt = np.linalg.svd(vectors - self.mean, full_matrices=False)
+        self.components = vt[:self.output_dimension].astype(np.float32)
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """Project vectors to the stored dimension as normalized float32."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.spec.reduction == "truncate":
+            vectors = vectors[:, :self.output_dimension]
+        elif self.spec.reduction == "pca":
+            if not self.is_fitted:
+                raise ValueError("PCA projector has not been fitted")
+            vectors = (vectors - self.mean) @ self.components.T
+        return _normalize(vectors).astype(np.float32)
+
+    def save(self, path: Path) -> None:
+        """Persist fitted PCA parameters."""
+        if self.spec.reduction == "pca" and self.is_fitted:
+            np.savez(path, mean=self.mean, components=self.components)
+
+    def load(self, path: Path) -> None:
+        """Load fitted PCA parameters if they were saved."""
+        if self.spec.reduction == "pca" and Path(path).exists():
+            data = np.load(path)
+            self.mean = data["mean"]
+            self.components = data["components"]
+
+
+def binarize(vectors: np.ndarray) -> np.ndarray:
+    """Pack the sign bit of each dimension into uint8 codes."""
+    return np.packbits(np.asarray(vectors) > 0, axis=1)
+
+
+def binary_rescore(query: np.ndarray, codes: np.ndarray, dimension: int) -> np.ndarray:
+    """
+    Score binary codes against a float query.
+
+    The codes are expanded to +/-1 and dotted with the float query, which
+    ranks candidates far better than Hamming distance alone. Scores are
+    divided by sqrt(dimension) so they fall in the cosine range.
+    """
+    signs = np.unpackbits(codes, axis=1)[:, :dimension].astype(np.float32) * 2.0 - 1.0
+    return (signs @ np.asarray(query, dtype=np.float32)) / np.sqrt(dimension)
+
@@ -1,23 +1,42 @@
-
+import os
+import json
+import threading
+import time
 from .vector_database import VectorDatabaseClient
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
+
+# Seconds a cached client is trusted before the next lookup re-probes it
+VECTOR_DB_HEALTH_CHECK_INTERVAL = float(os.getenv("VECTOR_DB_HEALTH_CHECK_INTERVAL", "30"))
+
+# Config keys naming a local directory; relative and absolute spellings share a client
+PATH_CONFIG_KEYS = ("persistence_path", "storage_path")
+
+
 class VectorDBClientFactory:
     """Factory for creating vector database clients."""
-    
+
+    # Process-wide connected clients, keyed by (backend, normalized config)
+    _clients: Dict[Tuple[str, Tuple], VectorDatabaseClient] = {}
+    _checked_at: Dict[Tuple[str, Tuple], float] = {}
+    # Clients replaced after a failed health check; callers may still hold them,
+    # so they are only closed at shutdown
+    _retired: List[VectorDatabaseClient] = []
+    _lock = threading.Lock()
+
     @staticmethod
     def get_client(db_type: str, **kwargs) -> VectorDatabaseClient:
         """
         Get a specific vector database client based on type.
-        
+
         Args:
-            db_type: The type of vector database ('qdrant', 'milvus', 'chromadb', 'faiss', 'weaviate')
+            db_type: The type of vector database ('qdrant', 'milvus', 'chromadb', 'faiss', 'weaviate', 'memory')
             **kwargs: Additional connection parameters for the specific database
-            
+
         Returns:
             An instance of the appropriate VectorDatabaseClient
         """
         db_type = db_type.lower()
-        
+
         if db_type == 'qdrant':
             from .clients.qdrant import QdrantDBClient
             return QdrantDBClient(**kwargs)
@@ -33,5 +52,86 @@ class VectorDBClientFactory:
         elif db_type == 'weaviate':
             from .clients.weaviate import WeaviateDBClient
             return WeaviateDBClient(**kwargs)
+        elif db_type == 'memory':
+            from .clients.memory import MemoryDBClient
+            return MemoryDBClient(**kwargs)
         else:
-            raise ValueError(f"Unsupported vector database type: {db_type}")
\ No newline at end of file
+            raise ValueError(f"Unsupported vector database type: {db_type}")
+
+    @staticmethod
+    def _cache_key(db_type: str, kwargs: Dict[str, Any]) -> Tuple[str, Tuple]:
+        config = []
+        for key, value in sorted(kwargs.items()):
+            if key in PATH_CONFIG_KEYS and value is not None:
+                value = os.path.abspath(os.path.expanduser(str(value)))
+            # Values may be dicts or lists (e.g. payload_indexes), which are not hashable
+            config.append((key, json.dumps(value, sort_keys=True, default=str)))
+        return db_type.lower(), tuple(config)
+
+    @classmethod
+    def get_connected_client(cls, db_type: str, **kwargs) -> VectorDatabaseClient:
+        """
+        Get a shared, connected client for this backend and config.
+
+        The first call connects; later calls reuse the client, re-probing it
+        with health_check() at most every VECTOR_DB_HEALTH_CHECK_INTERVAL
+        seconds and reconnecting if the probe fails. A client that fails its
+        probe stays cached until its replacement has connected, and is not
+        closed before shutdown() since earlier callers may still be using it.
+
+        Raises:
+            ValueError: If the database type is not supported
+            ConnectionError: If the client cannot connect
+        """
+        key = cls._cache_key(db_type, kwargs)
+        client = cls._clients.get(key)
+        if client is not None and time.monotonic() - cls._checked_at.get(key, 0.0) < VECTOR_DB_HEALTH_CHECK_INTERVAL:
+            return client
+
+        with cls._lock:
+            client = cls._clients.get(key)
+            if client is not None:
+                if time.monotonic() - cls._checked_at.get(key, 0.0) < VECTOR_DB_HEALTH_CHECK_INTERVAL:
+                    return client
+                if client.health_check():
+                    cls._checked_at[key] = time.monotonic()
+                    return client
+                print(f"Vector database client for {key[0]} failed its health check, reconnecting")
+
+            replacement = cls.get_client(db_type, **kwargs)
+            if not replacement.connect():
+                raise ConnectionError(f"Failed to connect to vector database {key[0]}")
+            if client is not None:
+                cls._retired.append(client)
+            cls._clients[key] = replacement
+            cls._checked_at[key] = time.monotonic()
+            return replacement
+
+    @classmethod
+    def _take_all(cls) -> List[Tuple[str, VectorDatabaseClient]]:
+        """Forget every cached and retired client, returning them for closing."""
+        with cls._lock:
+            clients = [(db_type, client) for (db_type, _), client in cls._clients.items()]
+            clients += [(type(client).__name__, client) for client in cls._retired]
+            cls._clients.clear()
+            cls._checked_at.clear()
+            cls._retired.clear()
+        return clients
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Close and forget every cached client."""
+        for db_type, client in cls._take_all():
+            try:
+                client.close()
+            except Exception as e:
+                print(f"Failed to close {db_type} client: {e}")
+
+    @classmethod
+    async def ashutdown(cls) -> None:
+        """Close and forget every cached client, awaiting async connections."""
+        for db_type, client in cls._take_all():
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"Failed to close {db_type} client: {e}")
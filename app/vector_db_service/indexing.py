@@ -0,0 +1,97 @@
+"""
+Vector Database Service - Per-collection ANN index options
+"""
+import os
+from typing import Any, Dict, Optional
+
+# Collections smaller than this are searched exactly even if an ANN index was requested
+ANN_MIN_VECTORS = int(os.getenv("ANN_MIN_VECTORS", "10000"))
+
+
+class IndexSpec:
+    """
+    Which approximate nearest neighbour index a collection searches with.
+
+    Args:
+        index_type: 'flat' (exact), 'hnsw', 'ivf_flat', 'ivf_pq' or
+            'diskann' (Milvus only)
+        nlist: Number of IVF clusters
+        nprobe: IVF clusters visited per query (higher = better recall, slower)
+        m: HNSW graph degree
+        ef_construction: HNSW candidate list size while building
+        ef_search: HNSW candidate list size while searching (DiskANN search_list)
+        pq_m: IVF-PQ sub-quantizers (must divide the stored dimension)
+        pq_bits: Bits per IVF-PQ sub-quantizer code
+        train_threshold: Live vector count at which the ANN index is built;
+            defaults to ANN_MIN_VECTORS, raised for IVF so every cluster
+            gets enough training points
+    """
+
+    INDEX_TYPES = ("flat", "hnsw", "ivf_flat", "ivf_pq", "diskann")
+
+    def __init__(self,
+                 index_type: str = "flat",
+                 nlist: int = 1024,
+                 nprobe: int = 16,
+                 m: int = 32,
+                 ef_construction: int = 200,
+                 ef_search: int = 64,
+                 pq_m: int = 16,
+                 pq_bits: int = 8,
+                 train_threshold: Optional[int] = None):
+        if index_type not in self.INDEX_TYPES:
+            raise ValueError(f"Unsupported index type: {index_type}")
+        if min(nlist, nprobe, m, ef_construction, ef_search, pq_m, pq_bits) < 1:
+            raise ValueError("Index parameters must be positive")
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.pq_m = pq_m
+        self.pq_bits = pq_bits
+        self.train_threshold = train_threshold
+
+    def is_default(self) -> bool:
+        """True for exact (brute force) search."""
+        return self.index_type == "flat"
+
+    @property
+    def is_ivf(self) -> bool:
+        return self.index_type in ("ivf_flat", "ivf_pq")
+
+    def min_vectors(self) -> int:
+        """Live vectors needed before the ANN index is built."""
+        if self.is_default():
+            return 0
+        threshold = self.train_threshold if self.train_threshold is not None else ANN_MIN_VECTORS
+        if self.is_ivf:
+            # FAISS wants ~39 training points per centroid
+            threshold = max(threshold, 39 * self.nlist)
+        return threshold
+
+    def validate(self, dimension: int) -> None:
+        """Check the spec can index vectors of the stored dimension."""
+        if self.index_type == "ivf_pq" and dimension % self.pq_m != 0:
+            raise ValueError(f"IVF-PQ needs pq_m ({self.pq_m}) to divide the dimension ({dimension})")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "index_type": self.index_type,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "m": self.m,
+            "ef_construction": self.ef_construction,
+            "ef_search": self.ef_search,
+            "pq_m": self.pq_m,
+            "pq_bits": self.pq_bits,
+            "train_threshold": self.train_threshold
+        }
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]]) -> "IndexSpec":
+        return cls(**data) if data else cls()
+
+    def __repr__(self):
+        return f"IndexSpec({', '.join(f'{k}={v}' for k, v in self.to_dict().items())})"
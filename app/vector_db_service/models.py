@@ -1,34 +1,113 @@
-from typing import List, Dict, Any, Optional
-from abc import ABC, abstractmethod
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Union
+import numpy as np
+
+# Embeddings may arrive as plain lists (legacy callers) or NumPy arrays
+Vector = Union[List[float], np.ndarray]
+
+
+def as_vector(embedding: Vector) -> np.ndarray:
+    """Return float32/float16 arrays as-is and convert anything else to float32."""
+    if isinstance(embedding, np.ndarray) and embedding.dtype in (np.float32, np.float16):
+        return embedding
+    return np.asarray(embedding, dtype=np.float32)
+
+
 class DocumentChunk:
     """Represents a document chunk with its embedding vector and metadata."""
-    
-    def __init__(self, 
+
+    __slots__ = ("id", "text", "embedding", "metadata")
+
+    def __init__(self,
                  id: str,
-                 text: str, 
-                 embedding: List[float], 
+                 text: str,
+                 embedding: Vector,
                  metadata: Optional[Dict[str, Any]] = None):
         self.id = id
         self.text = text
-        self.embedding = embedding
+        self.embedding = as_vector(embedding)
         self.metadata = metadata or {}
-    
+
     def __repr__(self):
         return f"DocumentChunk(id={self.id}, text={self.text[:30]}..., metadata={self.metadata})"
 
 
 class SearchResult:
     """Standardized search result format."""
-    
-    def __init__(self, 
+
+    __slots__ = ("id", "text", "score", "metadata")
+
+    def __init__(self,
                  id: str,
                  text: str,
-                 score: float, 
+                 score: float,
                  metadata: Optional[Dict[str, Any]] = None):
         self.id = id
         self.text = text
         self.score = score
         self.metadata = metadata or {}
-    
+
     def __repr__(self):
         return f"SearchResult(id={self.id}, score={self.score:.4f}, text={self.text[:30]}...)"
+
+
+class DocumentBatch:
+    """
+    Columnar batch of document chunks.
+
+    Embeddings are held as one contiguous 2-D float32/float16 matrix so
+    clients can hand them to their backend without per-row conversion.
+    Iterating yields DocumentChunks whose embeddings are row views into
+    that matrix.
+    """
+
+    __slots__ = ("ids", "texts", "embeddings", "metadatas")
+
+    def __init__(self,
+                 ids: Sequence[str],
+                 texts: Sequence[str],
+                 embeddings: np.ndarray,
+                 metadatas: Optional[Sequence[Dict[str, Any]]] = None):
+        embeddings = as_vector(embeddings)
+        if embeddings.ndim != 2 or embeddings.shape[0] != len(ids) or len(texts) != len(ids):
+            raise ValueError("DocumentBatch needs one text and one embedding row per id")
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.embeddings = embeddings
+        self.metadatas = list(metadatas) if metadatas is not None else [{} for _ in self.ids]
+
+    @classmethod
+    def from_documents(cls, documents: Union["DocumentBatch", Sequence[DocumentChunk]]) -> "DocumentBatch":
+        """Return a batch unchanged, or stack a list of chunks into one."""
+        if isinstance(documents, DocumentBatch):
+            return documents
+        if not documents:
+            return cls([], [], np.zeros((0, 0), dtype=np.float32), [])
+        return cls(
+            ids=[doc.id for doc in documents],
+            texts=[doc.text for doc in documents],
+            embeddings=np.stack([as_vector(doc.embedding) for doc in documents]),
+            metadatas=[doc.metadata for doc in documents]
+        )
+
+    def float32(self) -> np.ndarray:
+        """Embedding matrix as C-contiguous float32, copying only if needed."""
+        return np.ascontiguousarray(self.embeddings, dtype=np.float32)
+
+    def slice(self, start: int, stop: int) -> "DocumentBatch":
+        """Sub-batch sharing the same embedding storage."""
+        return DocumentBatch(
+            self.ids[start:stop],
+            self.texts[start:stop],
+            self.embeddings[start:stop],
+            self.metadatas[start:stop]
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[DocumentChunk]:
+        for i in range(len(self.ids)):
+            yield DocumentChunk(self.ids[i], self.texts[i], self.embeddings[i], self.metadatas[i])
+
+    def __repr__(self):
+        return f"DocumentBatch(size={len(self.ids)}, dimension={self.embeddings.shape[1]}, dtype={self.embeddings.dtype})"
@@ -0,0 +1,247 @@
+"""
+Vector Database Service - Incremental FAQ-to-collection sync
+"""
+import hashlib
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.middleware.database import FAQEntry, FAQJob, CollectionSyncEntry
+from app.middleware.logger import logger
+from app.vector_db_service.vector_database import VectorDatabaseClient
+from app.search_service.lexical import LexicalIndex
+
+# Collection name -> fingerprint of the FAQ jobs it was last fully synced from in this process
+_synced_fingerprints: Dict[str, Tuple] = {}
+_fingerprints_lock = threading.Lock()
+
+
+class SyncPlan:
+    """Differences between the FAQ rows and what a collection already holds."""
+
+    def __init__(self, added: List, changed: List, deleted: List[str], chunk_indexes: Optional[Dict[str, int]] = None):
+        self.added = added
+        self.changed = changed
+        self.deleted = deleted
+        # Entry id -> chunk_index of every entry in the job set
+        self.chunk_indexes = chunk_indexes or {}
+
+    @property
+    def upserts(self) -> List:
+        return self.added + self.changed
+
+    def upsert_chunk_indexes(self) -> List[int]:
+        """chunk_index of each upsert, in upserts order."""
+        return [self.chunk_indexes[str(faq.id)] for faq in self.upserts]
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.changed or self.deleted)
+
+    def __repr__(self):
+        return f"SyncPlan(added={len(self.added)}, changed={len(self.changed)}, deleted={len(self.deleted)})"
+
+
+class CollectionSync:
+    """
+    Keeps a vector collection in step with a set of FAQ jobs.
+
+    The ids and content hashes of the entries each collection holds are
+    recorded in `collection_sync_entries`. A sync only embeds and upserts
+    new or edited entries and deletes removed ones, so an unchanged
+    collection costs one column query and no vector database writes.
+    The collection's BM25 index (see LexicalIndex) is updated in the same
+    commit as the recorded state.
+
+    Each entry's chunk_index is recorded too. A first sync numbers entries
+    by position in the id-ordered job set, like a full ingest; afterwards
+    edited entries keep their index and new ones take the next unused one,
+    so indexes stay unique across edits and deletions.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.lexical = LexicalIndex(db)
+
+    @staticmethod
+    def content_hash(faq) -> str:
+        """Hash of everything that ends up in a chunk's text or filterable metadata."""
+        digest = hashlib.sha256()
+        for part in (faq.section or "", faq.question or "", faq.answer or ""):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def fingerprint(self, job_ids: List[str]) -> Tuple:
+        """
+        Cheap change marker for a job set: entry count, highest entry id and
+        latest job update. Entries are written with their job, so any
+        re-run or new job changes it.
+        """
+        count, max_id = (
+            self.db.query(func.count(FAQEntry.id), func.max(FAQEntry.id))
+            .filter(FAQEntry.job_id.in_(job_ids))
+            .one()
+        )
+        updated_at = self.db.query(func.max(FAQJob.updated_at)).filter(FAQJob.id.in_(job_ids)).scalar()
+        return tuple(sorted(job_ids)), count, max_id, str(updated_at)
+
+    def is_current(self, collection_name: str, job_ids: List[str]) -> bool:
+        """True if the collection was synced from these jobs, unchanged since, in this process."""
+        recorded = _synced_fingerprints.get(collection_name)
+        return recorded is not None and bool(job_ids) and recorded == self.fingerprint(job_ids)
+
+    def load_entries(self, job_ids: List[str]) -> List:
+        """FAQ rows for the given jobs, loading only the columns a sync needs."""
+        if not job_ids:
+            return []
+        return (
+            self.db.query(FAQEntry.id, FAQEntry.section, FAQEntry.question, FAQEntry.answer)
+            .filter(FAQEntry.job_id.in_(job_ids))
+            .order_by(FAQEntry.id)
+            .all()
+        )
+
+    def recorded_hashes(self, collection_name: str) -> Dict[str, str]:
+        """Entry id -> content hash for everything the collection already holds."""
+        return {entry_id: content_hash for entry_id, (content_hash, _) in self.recorded_entries(collection_name).items()}
+
+    def recorded_entries(self, collection_name: str) -> Dict[str, Tuple[str, Optional[int]]]:
+        """Entry id -> (content hash, chunk_index) for everything the collection already holds."""
+        rows = (
+            self.db.query(CollectionSyncEntry.entry_id, CollectionSyncEntry.content_hash, CollectionSyncEntry.chunk_index)
+            .filter(CollectionSyncEntry.collection_name == collection_name)
+            .all()
+        )
+        return {entry_id: (content_hash, chunk_index) for entry_id, content_hash, chunk_index in rows}
+
+    def plan(self, collection_name: str, faqs: List) -> SyncPlan:
+        """Compute additions, edits and deletions against the recorded state."""
+        recorded = self.recorded_entries(collection_name)
+        next_index = max((chunk_index for _, chunk_index in recorded.values() if chunk_index is not None), default=-1) + 1
+        added, changed = [], []
+        chunk_indexes = {}
+        for position, faq in enumerate(faqs):
+            entry_id = str(faq.id)
+            if entry_id not in recorded:
+                added.append(faq)
+                chunk_indexes[entry_id] = next_index
+                next_index += 1
+                continue
+            content_hash, chunk_index = recorded[entry_id]
+            # Entries recorded before chunk indexes were stored fall back to their position
+            chunk_indexes[entry_id] = chunk_index if chunk_index is not None else position
+            if content_hash != self.content_hash(faq):
+                changed.append(faq)
+        deleted = [entry_id for entry_id in recorded if entry_id not in chunk_indexes]
+        return SyncPlan(added, changed, deleted, chunk_indexes)
+
+    def record(self,
+               collection_name: str,
+               faqs: List,
+               deleted: Optional[List[str]] = None,
+               chunk_indexes: Optional[List[int]] = None) -> None:
+        """
+        Record entries as synced and forget deleted ones, updating the lexical
+        index to match. chunk_indexes are the ones the entries were ingested with.
+        """
+        if chunk_indexes is None:
+            chunk_indexes = list(range(len(faqs)))
+        self.lexical.update(collection_name, faqs, chunk_indexes)
+        if deleted:
+            self.lexical.remove(collection_name, deleted)
+        for faq, chunk_index in zip(faqs, chunk_indexes):
+            self.db.merge(CollectionSyncEntry(
+                collection_name=collection_name,
+                entry_id=str(faq.id),
+                content_hash=self.content_hash(faq),
+                chunk_index=chunk_index
+            ))
+        if deleted:
+            self.db.query(CollectionSyncEntry).filter(
+                CollectionSyncEntry.collection_name == collection_name,
+                CollectionSyncEntry.entry_id.in_(deleted)
+            ).delete(synchronize_session=False)
+        self.db.commit()
+
+    def reset(self, collection_name: str) -> None:
+        """Forget everything recorded for a collection (e.g. after it was dropped)."""
+        with _fingerprints_lock:
+            _synced_fingerprints.pop(collection_name, None)
+        self.lexical.reset(collection_name)
+        self.db.query(CollectionSyncEntry).filter(
+            CollectionSyncEntry.collection_name == collection_name
+        ).delete(synchronize_session=False)
+        self.db.commit()
+
+    def backfill_lexical(self, collection_name: str, faqs: List) -> None:
+        """Index every recorded entry of a collection synced before it had a lexical index."""
+        recorded = self.recorded_entries(collection_name)
+        if not recorded or self.lexical.has_collection(collection_name):
+            return
+        entries = [
+            (faq, recorded[str(faq.id)][1] if recorded[str(faq.id)][1] is not None else position)
+            for position, faq in enumerate(faqs) if str(faq.id) in recorded
+        ]
+        self.lexical.update(collection_name, [faq for faq, _ in entries], [position for _, position in entries])
+        self.db.commit()
+        logger.info(f"Built lexical index for {collection_name} from {len(recorded)} synced entries")
+
+    def sync(self,
+             vector_db: VectorDatabaseClient,
+             collection_name: str,
+             job_ids: List[str],
+             faqs: Optional[List] = None,
+             progress: Optional[Callable[[int], None]] = None) -> SyncPlan:
+        """
+        Apply the diff between the FAQ jobs and the collection.
+
+        Upserts go through the client's bulk ingestion; progress is called
+        with the running count of upserted entries. Afterwards the job set's
+        fingerprint is remembered, so is_current() can skip the next sync.
+
+        Raises:
+            Exception: If the vector database rejects the upsert or delete.
+        """
+        # Taken before reading entries, so writes that land during the sync show up next time
+        fingerprint = self.fingerprint(job_ids) if job_ids else None
+        faqs = faqs if faqs is not None else self.load_entries(job_ids)
+
+        # If the collection was emptied behind our back, rebuild it from scratch
+        if self.recorded_hashes(collection_name) and vector_db.count_documents(collection_name) == 0:
+            logger.warning(f"Collection {collection_name} is empty but has sync state; resyncing")
+            self.reset(collection_name)
+        self.backfill_lexical(collection_name, faqs)
+
+        plan = self.plan(collection_name, faqs)
+        if not plan.is_empty:
+            self.apply(vector_db, collection_name, plan, progress)
+        self.remember(collection_name, fingerprint)
+        return plan
+
+    def remember(self, collection_name: str, fingerprint: Optional[Tuple]) -> None:
+        """Record the job set fingerprint a collection is now in step with."""
+        if fingerprint is not None:
+            with _fingerprints_lock:
+                _synced_fingerprints[collection_name] = fingerprint
+
+    def apply(self,
+              vector_db: VectorDatabaseClient,
+              collection_name: str,
+              plan: SyncPlan,
+              progress: Optional[Callable[[int], None]] = None) -> None:
+        """Embed and upsert, then delete, then record a non-empty plan."""
+        from app.embedding_service.ingestion import build_faq_chunks
+
+        upserts = plan.upserts
+        chunk_indexes = plan.upsert_chunk_indexes()
+        if upserts:
+            chunks = build_faq_chunks(upserts, chunk_indexes=chunk_indexes)
+            vector_db.ingest_stream(collection_name, [chunks], progress)
+        if plan.deleted:
+            if not vector_db.delete_documents(collection_name, plan.deleted):
+                raise Exception(f"Failed to delete {len(plan.deleted)} entries from {collection_name}")
+
+        self.record(collection_name, upserts, plan.deleted, chunk_indexes)
+        logger.info(f"Synced {collection_name}: {plan}")
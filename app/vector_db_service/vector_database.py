@@ -1,22 +1,69 @@
 """
 Vector Database Service - Core Interfaces and Models
 """
+import asyncio
+import functools
+import os
+import threading
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Dict, Any, Optional, Union
 import numpy as np
-from .models import DocumentChunk, SearchResult
+from .models import DocumentChunk, DocumentBatch, SearchResult, Vector, as_vector
+from .compression import StorageSpec
+from .indexing import IndexSpec
+
+# Threads shared by every client without a native async API; bounded so a burst of
+# concurrent requests queues instead of opening unbounded connections
+VECTOR_DB_ASYNC_WORKERS = int(os.getenv("VECTOR_DB_ASYNC_WORKERS", "16"))
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=VECTOR_DB_ASYNC_WORKERS, thread_name_prefix="vector-db")
+        return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking client call on the shared vector DB thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args, **kwargs))
+
 
 class VectorDatabaseClient(ABC):
     """Abstract interface for all vector database operations."""
     
+    # Bulk ingestion tuning (see bulk.ingest_stream); backends override these
+    # to stay under their request size limits
+    ingest_batch_size = 1000
+    ingest_max_batch_bytes = 16 * 1024 * 1024
+    ingest_concurrency = 4
+    
     @abstractmethod
     def connect(self) -> bool:
         """Establish connection to the database."""
         pass
     
+    def health_check(self) -> bool:
+        """Cheap probe that an established connection is still usable."""
+        return True
+    
+    def close(self) -> None:
+        """Release the connection and any open handles."""
+        pass
+    
     @abstractmethod
-    def create_collection(self, collection_name: str, dimension: int) -> bool:
-        """Create a new collection/index in the database."""
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
+        """Create a new collection/index in the database, optionally with reduced or quantized storage and an ANN index."""
         pass
     
     @abstractmethod
@@ -27,23 +74,103 @@ class VectorDatabaseClient(ABC):
     @abstractmethod
     def ingest_documents(self, 
                          collection_name: str, 
-                         documents: List[DocumentChunk]) -> bool:
-        """Ingest multiple document chunks into the database."""
+                         documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest multiple document chunks (or a columnar batch) into the database."""
+        pass
+    
+    def upsert(self,
+               collection_name: str,
+               documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """
+        Insert documents, replacing any stored document with the same id.
+        
+        Backends whose ingest already replaces by id use this default;
+        backends where ingest appends duplicates must override it.
+        """
+        return self.ingest_documents(collection_name, documents)
+    
+    def ingest_stream(self,
+                      collection_name: str,
+                      documents: Iterable[Union[DocumentChunk, DocumentBatch]],
+                      progress: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Upsert an iterator of chunks or batches in backend-sized, concurrent,
+        individually retried batches; returns the number of rows written.
+        
+        Raises:
+            Exception: If a batch still fails after its retries.
+        """
+        from .bulk import ingest_stream
+        return ingest_stream(self, collection_name, documents, progress=progress)
+    
+    @abstractmethod
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """Delete documents by id from a collection."""
         pass
     
     @abstractmethod
     def search(self, 
                collection_name: str,
-               query_vector: List[float],
+               query_vector: Vector,
                top_k: int = 10,
                filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
         """Search for similar vectors in the database."""
         pass
     
+    def search_batch(self,
+                     collection_name: str,
+                     query_vectors: Union[np.ndarray, List[Vector]],
+                     top_k: int = 10,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """
+        Search for several query vectors at once, returning one result list per query row.
+        
+        The default loops over search(); backends with a batched query API override it.
+        """
+        queries = np.atleast_2d(as_vector(query_vectors))
+        return [self.search(collection_name, query, top_k, filters) for query in queries]
+    
     @abstractmethod
     def count_documents(self, collection_name: str) -> int:
         """Count the number of documents in a collection."""
         pass
+    
+    # Async counterparts. The defaults offload the sync methods to a bounded
+    # thread pool; backends with a native async client override them.
+    
+    async def aingest_documents(self,
+                                collection_name: str,
+                                documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest documents without blocking the event loop."""
+        return await run_blocking(self.ingest_documents, collection_name, documents)
+    
+    async def asearch(self,
+                      collection_name: str,
+                      query_vector: Vector,
+                      top_k: int = 10,
+                      filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
+        """Search without blocking the event loop."""
+        return await run_blocking(self.search, collection_name, query_vector, top_k, filters)
+    
+    async def asearch_batch(self,
+                            collection_name: str,
+                            query_vectors: Union[np.ndarray, List[Vector]],
+                            top_k: int = 10,
+                            filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Batched search without blocking the event loop."""
+        return await run_blocking(self.search_batch, collection_name, query_vectors, top_k, filters)
+    
+    async def acount_documents(self, collection_name: str) -> int:
+        """Count documents without blocking the event loop."""
+        return await run_blocking(self.count_documents, collection_name)
+    
+    async def aclose(self) -> None:
+        """Close without blocking the event loop."""
+        await run_blocking(self.close)
+    
+    def get_storage_spec(self, collection_name: str) -> Optional[StorageSpec]:
+        """Storage spec recorded in the collection's metadata, if the backend tracks one."""
+        return None
 
 
 class VectorDBService:
@@ -56,9 +183,13 @@ class VectorDBService:
         """Connect to the database."""
         return self.client.connect()
     
-    def create_collection(self, collection_name: str, dimension: int) -> bool:
+    def create_collection(self,
+                          collection_name: str,
+                          dimension: int,
+                          storage: Optional[StorageSpec] = None,
+                          index: Optional[IndexSpec] = None) -> bool:
         """Create a new collection in the database."""
-        return self.client.create_collection(collection_name, dimension)
+        return self.client.create_collection(collection_name, dimension, storage, index)
     
     def delete_collection(self, collection_name: str) -> bool:
         """Delete a collection from the database."""
@@ -66,18 +197,69 @@ class VectorDBService:
     
     def ingest_documents(self, 
                           collection_name: str, 
-                          documents: List[DocumentChunk]) -> bool:
-        """Ingest multiple document chunks into the database."""
+                          documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest multiple document chunks (or a columnar batch) into the database."""
         return self.client.ingest_documents(collection_name, documents)
     
+    def upsert(self,
+               collection_name: str,
+               documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Insert documents, replacing any stored document with the same id."""
+        return self.client.upsert(collection_name, documents)
+    
+    def ingest_stream(self,
+                      collection_name: str,
+                      documents: Iterable[Union[DocumentChunk, DocumentBatch]],
+                      progress: Optional[Callable[[int], None]] = None) -> int:
+        """Upsert an iterator of chunks or batches in concurrent, retried batches."""
+        return self.client.ingest_stream(collection_name, documents, progress)
+    
+    def delete_documents(self, collection_name: str, ids: List[str]) -> bool:
+        """Delete documents by id from a collection."""
+        return self.client.delete_documents(collection_name, ids)
+    
     def search(self, 
                collection_name: str,
-               query_vector: List[float],
+               query_vector: Vector,
                top_k: int = 10,
                filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
         """Search for similar vectors in the database."""
         return self.client.search(collection_name, query_vector, top_k, filters)
     
+    def search_batch(self,
+                     collection_name: str,
+                     query_vectors: Union[np.ndarray, List[Vector]],
+                     top_k: int = 10,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Search for several query vectors at once, returning one result list per query row."""
+        return self.client.search_batch(collection_name, query_vectors, top_k, filters)
+    
     def count_documents(self, collection_name: str) -> int:
         """Count the number of documents in a collection."""
         return self.client.count_documents(collection_name)
+    
+    async def aingest_documents(self,
+                                collection_name: str,
+                                documents: Union[List[DocumentChunk], DocumentBatch]) -> bool:
+        """Ingest documents without blocking the event loop."""
+        return await self.client.aingest_documents(collection_name, documents)
+    
+    async def asearch(self,
+                      collection_name: str,
+                      query_vector: Vector,
+                      top_k: int = 10,
+                      filters: Optional[Dict[str, Any]] = None) -> List[SearchResult]:
+        """Search without blocking the event loop."""
+        return await self.client.asearch(collection_name, query_vector, top_k, filters)
+    
+    async def asearch_batch(self,
+                            collection_name: str,
+                            query_vectors: Union[np.ndarray, List[Vector]],
+                            top_k: int = 10,
+                            filters: Optional[Dict[str, Any]] = None) -> List[List[SearchResult]]:
+        """Batched search without blocking the event loop."""
+        return await self.client.asearch_batch(collection_name, query_vectors, top_k, filters)
+    
+    async def acount_documents(self, collection_name: str) -> int:
+        """Count documents without blocking the event loop."""
+        return await self.client.acount_documents(collection_name)
@@ -39,6 +39,13 @@ app.include_router(health.router)
 app.include_router(rag_chat.router)
 app.include_router(smart_conversation.router)
 
+@app.on_event("shutdown")
+async def close_shared_services():
+    from app.vector_db_service.factory import VectorDBClientFactory
+    from app.embedding_service.server import shutdown_embedding_server
+    await shutdown_embedding_server()
+    await VectorDBClientFactory.ashutdown()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the FAQ Pipeline API! Check the documentation for available endpoints."}
@@ -315,7 +315,8 @@ def main():
                 "milvus": "Milvus 🟠",
                 "qdrant": "Qdrant 🔵",
                 "faiss": "FAISS 🟢",
-                "weaviate": "Weaviate 🟡"
+                "weaviate": "Weaviate 🟡",
+                "memory": "In-memory (NumPy) ⚪"
             }
             
             vector_db = st.selectbox(
@@ -0,0 +1,11 @@
+"""
+Shared test setup.
+
+app.middleware.database binds its engine and creates tables at import time,
+so the test database has to be chosen before any app module is imported.
+"""
+import os
+import tempfile
+
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault("EMBEDDING_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "embedding_cache.db"))
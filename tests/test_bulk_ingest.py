@@ -0,0 +1,85 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app.vector_db_service import bulk
+from app.vector_db_service.models import DocumentChunk
+
+
+class FlakyVectorDB:
+    """Fake client whose upserts fail a set number of times per batch."""
+
+    ingest_batch_size = 4
+    ingest_concurrency = 2
+    ingest_max_batch_bytes = 1 << 20
+
+    def __init__(self, failures=0, fail_first_id=None):
+        self.failures = failures
+        self.fail_first_id = fail_first_id
+        self.attempts = {}
+        self.written = []
+        self._lock = threading.Lock()
+
+    def upsert(self, collection_name, batch):
+        first_id = batch.ids[0]
+        with self._lock:
+            attempt = self.attempts.get(first_id, 0)
+            self.attempts[first_id] = attempt + 1
+            if self.fail_first_id in (None, first_id) and attempt < self.failures:
+                return False
+            self.written.extend(batch.ids)
+        return True
+
+
+def chunks(count):
+    return [DocumentChunk(id=str(i), text=f"text {i}", embedding=np.full(4, i, dtype=np.float32))
+            for i in range(count)]
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    delays = []
+    monkeypatch.setattr(bulk.time, "sleep", delays.append)
+    monkeypatch.setattr(bulk, "VECTOR_DB_INGEST_RETRY_BACKOFF", 0.5)
+    return delays
+
+
+def test_ingest_without_failures_reports_running_totals(sleeps):
+    db = FlakyVectorDB()
+    progress = []
+
+    assert bulk.ingest_stream(db, "faqs", chunks(10), progress=progress.append) == 10
+
+    assert sorted(db.written, key=int) == [str(i) for i in range(10)]
+    assert set(db.attempts.values()) == {1}
+    assert len(progress) == 3
+    assert progress == sorted(progress) and progress[-1] == 10
+    assert sleeps == []
+
+
+def test_ingest_retries_failed_batches_with_backoff(sleeps):
+    db = FlakyVectorDB(failures=2, fail_first_id="4")
+    progress = []
+
+    assert bulk.ingest_stream(db, "faqs", chunks(10), max_retries=3, progress=progress.append) == 10
+
+    assert db.attempts == {"0": 1, "4": 3, "8": 1}
+    assert sorted(db.written, key=int) == [str(i) for i in range(10)]
+    assert sleeps == [0.5, 1.0]
+    assert progress[-1] == 10
+
+
+def test_ingest_gives_up_after_max_retries(sleeps):
+    db = FlakyVectorDB(failures=5, fail_first_id="4")
+    progress = []
+
+    with pytest.raises(Exception, match="after 3 attempts"):
+        bulk.ingest_stream(db, "faqs", chunks(12), max_in_flight=1, max_retries=2,
+                           progress=progress.append)
+
+    # Batches are sent one at a time, so nothing after the failed batch goes out.
+    assert db.attempts == {"0": 1, "4": 3}
+    assert db.written == ["0", "1", "2", "3"]
+    assert progress == [4]
+    assert sleeps == [0.5, 1.0]
@@ -0,0 +1,146 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.embedding_service.ingestion as ingestion
+from app.middleware.database import Base, FAQEntry, FAQJob
+from app.vector_db_service.sync import CollectionSync
+
+
+class RecordingVectorDB:
+    """Collects what a sync writes instead of embedding and storing it."""
+
+    def __init__(self):
+        self.documents = {}
+        self.upserted = []
+        self.deleted = []
+
+    def ingest_stream(self, collection_name, batches, progress=None):
+        count = 0
+        for batch in batches:
+            for doc_id, metadata in zip(batch.ids, batch.metadatas):
+                self.documents[doc_id] = metadata
+                self.upserted.append(doc_id)
+                count += 1
+        return count
+
+    def delete_documents(self, collection_name, ids):
+        for doc_id in ids:
+            self.documents.pop(doc_id, None)
+        self.deleted.extend(ids)
+        return True
+
+    def count_documents(self, collection_name):
+        return len(self.documents)
+
+    def reset_calls(self):
+        self.upserted, self.deleted = [], []
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        ingestion, "embed_texts",
+        lambda texts, *args, **kwargs: np.ones((len(texts), 4), dtype=np.float32)
+    )
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(FAQJob(id="job-1", user_id="user"))
+    for i in range(1, 6):
+        session.add(FAQEntry(id=i, job_id="job-1", section="General", question=f"Question {i}?", answer=f"Answer {i}."))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_first_sync_upserts_everything_in_order(db, request):
+    collection = request.node.name
+    vector_db = RecordingVectorDB()
+
+    plan = CollectionSync(db).sync(vector_db, collection, ["job-1"])
+
+    assert len(plan.added) == 5 and not plan.changed and not plan.deleted
+    assert vector_db.upserted == ["1", "2", "3", "4", "5"]
+    assert [vector_db.documents[str(i)]["chunk_index"] for i in range(1, 6)] == [0, 1, 2, 3, 4]
+
+
+def test_resync_applies_only_the_edit_and_the_delete(db, request):
+    collection = request.node.name
+    vector_db = RecordingVectorDB()
+    sync = CollectionSync(db)
+    sync.sync(vector_db, collection, ["job-1"])
+    vector_db.reset_calls()
+
+    db.get(FAQEntry, 4).answer = "An edited answer."
+    db.delete(db.get(FAQEntry, 2))
+    db.commit()
+    plan = sync.sync(vector_db, collection, ["job-1"])
+
+    assert [faq.id for faq in plan.changed] == [4] and not plan.added
+    assert vector_db.upserted == ["4"]
+    assert vector_db.deleted == ["2"]
+    # The edited entry keeps its chunk_index even though an earlier entry is gone
+    assert vector_db.documents["4"]["chunk_index"] == 3
+
+
+def test_new_entries_never_reuse_a_chunk_index(db, request):
+    collection = request.node.name
+    vector_db = RecordingVectorDB()
+    sync = CollectionSync(db)
+    sync.sync(vector_db, collection, ["job-1"])
+
+    db.delete(db.get(FAQEntry, 5))
+    db.add(FAQEntry(id=6, job_id="job-1", section="General", question="New?", answer="New."))
+    db.commit()
+    sync.sync(vector_db, collection, ["job-1"])
+
+    chunk_indexes = [metadata["chunk_index"] for metadata in vector_db.documents.values()]
+    assert sorted(chunk_indexes) == [0, 1, 2, 3, 5]
+
+
+def test_unchanged_resync_writes_nothing(db, request):
+    collection = request.node.name
+    vector_db = RecordingVectorDB()
+    sync = CollectionSync(db)
+    sync.sync(vector_db, collection, ["job-1"])
+    vector_db.reset_calls()
+
+    plan = sync.sync(vector_db, collection, ["job-1"])
+
+    assert plan.is_empty
+    assert vector_db.upserted == [] and vector_db.deleted == []
+
+
+def test_fingerprint_skips_until_the_job_set_changes(db, request):
+    collection = request.node.name
+    vector_db = RecordingVectorDB()
+    sync = CollectionSync(db)
+    assert not sync.is_current(collection, ["job-1"])
+
+    sync.sync(vector_db, collection, ["job-1"])
+    assert sync.is_current(collection, ["job-1"])
+
+    db.add(FAQEntry(id=6, job_id="job-1", section="General", question="New?", answer="New."))
+    db.commit()
+    assert not sync.is_current(collection, ["job-1"])
+
+    sync.sync(vector_db, collection, ["job-1"])
+    assert sync.is_current(collection, ["job-1"])
+    sync.reset(collection)
+    assert not sync.is_current(collection, ["job-1"])
+
+
+def test_emptied_collection_is_rebuilt(db, request):
+    collection = request.node.name
+    vector_db = RecordingVectorDB()
+    sync = CollectionSync(db)
+    sync.sync(vector_db, collection, ["job-1"])
+    vector_db.documents.clear()
+    vector_db.reset_calls()
+
+    plan = sync.sync(vector_db, collection, ["job-1"])
+
+    assert len(plan.added) == 5
+    assert sorted(vector_db.upserted) == ["1", "2", "3", "4", "5"]
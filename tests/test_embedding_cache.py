@@ -0,0 +1,57 @@
+import numpy as np
+
+from app.embedding_service.cache import EmbeddingCache
+
+
+def vectors(count, dimension=4):
+    return np.arange(count * dimension, dtype=np.float32).reshape(count, dimension) / 10
+
+
+def test_get_many_returns_hits_by_position(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    cache.put_many("model", "rev", ["a", "b"], vectors(2))
+
+    found = cache.get_many("model", "rev", ["x", "b", "a"])
+
+    assert sorted(found) == [1, 2]
+    np.testing.assert_allclose(found[2], vectors(2)[0], atol=1e-3)
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_revision_is_part_of_the_key(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    cache.put_many("model", "rev-1", ["a"], vectors(1))
+
+    assert cache.get_many("model", "rev-2", ["a"]) == {}
+
+
+def test_size_counts_new_rows_only_and_survives_reopen(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = EmbeddingCache(path)
+    cache.put_many("model", "rev", ["a", "b"], vectors(2))
+    cache.put_many("model", "rev", ["b", "c"], vectors(2))
+
+    assert cache.size() == 3
+    assert EmbeddingCache(path).size() == 3
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"), max_entries=2, touch_interval=-1)
+    cache.put_many("model", "rev", ["old"], vectors(1))
+    cache.put_many("model", "rev", ["kept"], vectors(1))
+    # The hit is written with the next put, which makes "old" the most recent row
+    cache.get_many("model", "rev", ["old"])
+    cache.put_many("model", "rev", ["new"], vectors(1))
+
+    assert cache.size() == 2
+    assert sorted(cache.get_many("model", "rev", ["old", "kept", "new"])) == [0, 2]
+
+
+def test_lookups_do_not_write(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.db"))
+    cache.put_many("model", "rev", ["a"], vectors(1))
+    changes = cache._conn.total_changes
+
+    cache.get_many("model", "rev", ["a", "b"])
+
+    assert cache._conn.total_changes == changes
@@ -0,0 +1,230 @@
+import numpy as np
+import pytest
+
+from app.vector_db_service.clients.faiss_storage import FAISSCollectionStore
+from app.vector_db_service.compression import StorageSpec
+
+DIMENSION = 16
+
+
+def unit_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIMENSION)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def append(store, ids, vectors, metadatas=None):
+    store.append([str(i) for i in ids], [f"text {i}" for i in ids], metadatas or [{} for _ in ids], vectors)
+
+
+def wait_for_compaction(store):
+    if store._compaction_thread is not None:
+        store._compaction_thread.join()
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = FAISSCollectionStore.create(tmp_path / "collection", DIMENSION, StorageSpec())
+    yield store
+    wait_for_compaction(store)
+    store.close()
+
+
+def test_search_finds_ingested_vectors(store):
+    vectors = unit_vectors(20)
+    append(store, range(10), vectors[:10])
+    append(store, range(10, 20), vectors[10:])
+
+    for i in (3, 15):
+        score, record = store.search(vectors[i:i + 1], 1)[0]
+        assert record["id"] == str(i) and record["text"] == f"text {i}"
+        assert score == pytest.approx(1.0, abs=1e-5)
+
+
+def test_deleted_documents_are_not_returned(store):
+    vectors = unit_vectors(10)
+    append(store, range(10), vectors)
+
+    assert store.delete(["4", "missing"]) == 1
+    hits = store.search(vectors[4:5], 10)
+
+    assert "4" not in {record["id"] for _, record in hits}
+    assert len(hits) == 9
+    assert store.live_count() == 9
+
+
+def test_compaction_merges_segments_and_keeps_results(store):
+    vectors = unit_vectors(30)
+    for start in range(0, 30, 10):
+        append(store, range(start, start + 10), vectors[start:start + 10])
+    store.delete(["7"])
+    before = [record["id"] for _, record in store.search(vectors[:1], 5)]
+
+    store.compact()
+
+    stats = store.stats()
+    assert stats["segments"] == 1 and stats["vectors"] == 29 and stats["tombstones"] == 0
+    assert [record["id"] for _, record in store.search(vectors[:1], 5)] == before
+    assert sorted(path.name for path in store.path.glob("seg-*")) == [f"{store.segments[0].name}.index"]
+
+
+def test_too_many_segments_trigger_background_compaction(tmp_path):
+    store = FAISSCollectionStore.create(tmp_path / "collection", DIMENSION, StorageSpec())
+    store.max_segments = 2
+    vectors = unit_vectors(4)
+    for i in range(4):
+        append(store, [i], vectors[i:i + 1])
+    wait_for_compaction(store)
+
+    assert len(store.segments) <= 2
+    assert store.live_count() == 4
+    store.close()
+
+
+def test_collection_reopens_from_its_manifest(tmp_path):
+    path = tmp_path / "collection"
+    store = FAISSCollectionStore.create(path, DIMENSION, StorageSpec())
+    vectors = unit_vectors(10)
+    append(store, range(10), vectors)
+    store.delete(["2"])
+    store.close()
+
+    reopened = FAISSCollectionStore.open(path)
+
+    assert reopened.live_count() == 9
+    assert reopened.search(vectors[5:6], 1)[0][1]["id"] == "5"
+    assert "2" not in {record["id"] for _, record in reopened.search(vectors[2:3], 10)}
+    reopened.close()
+
+
+def test_uncommitted_segment_files_are_removed_on_open(tmp_path):
+    path = tmp_path / "collection"
+    store = FAISSCollectionStore.create(path, DIMENSION, StorageSpec())
+    append(store, range(3), unit_vectors(3))
+    store.close()
+    (path / "seg-999999.index").write_bytes(b"partial write")
+
+    FAISSCollectionStore.open(path).close()
+
+    assert not (path / "seg-999999.index").exists()
+
+
+def test_client_ingests_and_searches_through_the_store(tmp_path):
+    from app.vector_db_service.clients.faiss import FAISSDBClient
+    from app.vector_db_service.models import DocumentBatch
+
+    client = FAISSDBClient(storage_path=str(tmp_path))
+    assert client.connect()
+    assert client.create_collection("faqs", DIMENSION)
+    vectors = unit_vectors(5)
+    batch = DocumentBatch([f"doc-{i}" for i in range(5)], [f"text {i}" for i in range(5)], vectors, [{"n": i} for i in range(5)])
+
+    assert client.ingest_documents("faqs", batch)
+    results = client.search("faqs", vectors[2], top_k=2)
+
+    assert results[0].id == "doc-2" and results[0].metadata["n"] == 2
+    assert client.count_documents("faqs") == 5
+    client.close()
+
+
+def test_filtered_search_returns_best_matching_documents(store):
+    vectors = unit_vectors(40)
+    metadatas = [{"section": "billing" if i % 10 == 0 else "other", "chunk_index": i} for i in range(40)]
+    append(store, range(40), vectors, metadatas)
+
+    hits = store.search(vectors[5:6], 3, {"section": "billing"})
+
+    assert {record["id"] for _, record in hits} <= {"0", "10", "20", "30"}
+    assert len(hits) == 3
+    assert [record["id"] for _, record in store.search(vectors[5:6], 5, {"section": "billing", "chunk_index": 20})] == ["20"]
+    assert store.search(vectors[5:6], 5, {"section": "missing"}) == []
+
+
+def test_filters_match_equal_numbers_and_bools(store):
+    vectors = unit_vectors(3)
+    append(store, range(3), vectors, [{"chunk_index": 3, "flag": True}, {"chunk_index": 4, "flag": False}, {"score": 0.5}])
+
+    assert [r["id"] for _, r in store.search(vectors[:1], 5, {"chunk_index": 3.0})] == ["0"]
+    assert [r["id"] for _, r in store.search(vectors[:1], 5, {"flag": 1})] == ["0"]
+    assert [r["id"] for _, r in store.search(vectors[:1], 5, {"flag": False})] == ["1"]
+    assert [r["id"] for _, r in store.search(vectors[:1], 5, {"score": 0.5})] == ["2"]
+
+
+def test_unindexable_filter_values_are_checked_after_search(store):
+    vectors = unit_vectors(6)
+    append(store, range(6), vectors, [{"tags": ["a"] if i < 3 else ["b"]} for i in range(6)])
+
+    hits = store.search(vectors[4:5], 6, {"tags": ["a"]})
+
+    assert sorted(record["id"] for _, record in hits) == ["0", "1", "2"]
+
+
+def test_postings_in_an_older_encoding_are_rebuilt_on_open(tmp_path):
+    path = tmp_path / "collection"
+    store = FAISSCollectionStore.create(path, DIMENSION, StorageSpec())
+    vectors = unit_vectors(2)
+    append(store, range(2), vectors, [{"flag": True}, {"flag": False}])
+    with store.conn:
+        store.conn.execute("UPDATE postings SET value = 'true' WHERE value = '1'")
+        store.manifest["postings"] = True
+        store._write_manifest()
+    store.close()
+
+    reopened = FAISSCollectionStore.open(path)
+
+    assert [r["id"] for _, r in reopened.search(vectors[:1], 5, {"flag": True})] == ["0"]
+    reopened.close()
+
+
+def test_reingesting_an_id_replaces_its_vector_and_metadata(store):
+    vectors = unit_vectors(6)
+    append(store, range(5), vectors[:5], [{"version": 1} for _ in range(5)])
+
+    store.append(["2"], ["new text"], [{"version": 2}], vectors[5:6])
+
+    assert store.live_count() == 5
+    assert store.search(vectors[5:6], 1)[0][1] == {"id": "2", "text": "new text", "metadata": {"version": 2}}
+    # The old vector is gone: nothing matches it exactly any more
+    assert all(score < 0.999 for score, _ in store.search(vectors[2:3], 5))
+    assert sorted(record["id"] for _, record in store.search(vectors[:1], 5, {"version": 1})) == ["0", "1", "3", "4"]
+
+
+def test_tombstones_are_vacuumed_once_over_the_ratio(tmp_path, monkeypatch):
+    from app.vector_db_service.clients import faiss_storage
+    monkeypatch.setattr(faiss_storage, "FAISS_VACUUM_MIN_TOMBSTONES", 2)
+    store = FAISSCollectionStore.create(tmp_path / "collection", DIMENSION, StorageSpec())
+    append(store, range(10), unit_vectors(10))
+
+    store.delete(["0", "1", "2"])
+    wait_for_compaction(store)
+
+    assert store.stats() == {"live": 7, "vectors": 7, "tombstones": 0, "segments": 1}
+    store.close()
+
+
+def test_deleted_nearest_neighbours_do_not_shorten_results(store):
+    vectors = unit_vectors(200)
+    append(store, range(200), vectors)
+    nearest = np.argsort(-(vectors @ vectors[0]))[:50]
+
+    store.delete([str(i) for i in nearest])
+    hits = store.search(vectors[:1], 10)
+
+    assert len(hits) == 10
+    assert not {record["id"] for _, record in hits} & {str(i) for i in nearest}
+
+
+@pytest.mark.parametrize("quantization", ["int8", "binary"])
+def test_lossy_collections_compact_from_float_sidecars(tmp_path, quantization):
+    store = FAISSCollectionStore.create(tmp_path / "collection", DIMENSION, StorageSpec(quantization=quantization))
+    vectors = unit_vectors(20)
+    append(store, range(10), vectors[:10])
+    append(store, range(10, 20), vectors[10:])
+    store.delete(["3"])
+
+    store.compact()
+
+    merged = store.segments[0]
+    sidecar = np.load(store.path / f"{merged.name}.vectors.npy")
+    np.testing.assert_array_equal(sidecar, vectors[merged.ids()])
+    assert store.search(vectors[7:8], 1)[0][1]["id"] == "7"
+    store.close()
@@ -0,0 +1,51 @@
+import pytest
+
+from app.search_service.fusion import max_score_fusion, reciprocal_rank_fusion
+from app.vector_db_service.models import SearchResult
+
+
+def results(*ids, scores=None, text=""):
+    scores = scores or [1.0 - i / 10 for i in range(len(ids))]
+    return [SearchResult(id=doc_id, text=text or f"text {doc_id}", score=score) for doc_id, score in zip(ids, scores)]
+
+
+def test_rrf_sums_ranks_across_lists():
+    fused = reciprocal_rank_fusion([results("a", "b", "c"), results("c", "a")], top_k=3, k=60)
+
+    assert [result.id for result in fused] == ["a", "c", "b"]
+    assert fused[0].score == pytest.approx(1 / 61 + 1 / 62)
+    assert fused[1].score == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[2].score == pytest.approx(1 / 62)
+
+
+def test_rrf_ties_are_equal_and_deterministic():
+    fused = reciprocal_rank_fusion([results("b", "a"), results("a", "b")], top_k=2, k=60)
+
+    assert fused[0].score == pytest.approx(fused[1].score)
+    assert [result.id for result in fused] == ["a", "b"]
+    assert [result.id for result in reciprocal_rank_fusion([results("a", "b"), results("b", "a")], top_k=2)] == ["a", "b"]
+
+
+def test_rrf_interleaves_disjoint_lists():
+    fused = reciprocal_rank_fusion([results("a", "b"), results("c", "d")], top_k=4, k=60)
+
+    assert [result.id for result in fused] == ["a", "c", "b", "d"]
+    assert [result.score for result in fused] == pytest.approx([1 / 61, 1 / 61, 1 / 62, 1 / 62])
+    assert [result.id for result in reciprocal_rank_fusion([results("a", "b"), results("c", "d")], top_k=2)] == ["a", "c"]
+
+
+def test_rrf_ignores_scores_and_keeps_first_text():
+    vector = results("a", "b", scores=[0.9, 0.8], text="from vectors")
+    lexical = results("b", scores=[42.0], text="from bm25")
+
+    fused = reciprocal_rank_fusion([vector, lexical], top_k=2)
+
+    assert [result.id for result in fused] == ["b", "a"]
+    assert fused[0].text == "from vectors"
+    assert reciprocal_rank_fusion([[], []], top_k=5) == []
+
+
+def test_max_score_fusion_keeps_best_score_per_id():
+    fused = max_score_fusion([results("a", "b", scores=[0.5, 0.4]), results("b", "c", scores=[0.9, 0.1])], top_k=3)
+
+    assert [(result.id, result.score) for result in fused] == [("b", 0.9), ("a", 0.5), ("c", 0.1)]
@@ -0,0 +1,108 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.middleware.database import Base, FAQEntry, FAQJob
+from app.search_service.lexical import LexicalIndex, tokenize
+from app.vector_db_service.sync import CollectionSync
+
+ENTRIES = {
+    1: ("How do refunds work?", "Refunds are issued to the original card. Refunds take five days."),
+    2: ("Can I change my plan?", "Yes, plans can be changed from the billing page; a refund is prorated."),
+    3: ("Where is the API key?", "Open the dashboard settings and copy the api-key field."),
+    4: ("What payment methods are accepted?", "Cards and bank transfers are accepted for every plan."),
+}
+
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(FAQJob(id="job-1", user_id="user"))
+    for entry_id, (question, answer) in ENTRIES.items():
+        session.add(FAQEntry(id=entry_id, job_id="job-1", section="General", question=question, answer=answer))
+    session.commit()
+    yield session
+    session.close()
+
+
+def faqs(db):
+    return db.query(FAQEntry).order_by(FAQEntry.id).all()
+
+
+def test_tokenize_keeps_codes_whole_and_split():
+    assert tokenize("Where is the API-key?") == ["api-key", "api", "key"]
+
+
+def test_bm25_ranks_by_term_frequency_and_rarity(db):
+    index = LexicalIndex(db)
+    index.update("faqs", faqs(db))
+    db.commit()
+
+    # Entry 1 says "refunds" three times, entry 2 says "refund" once in a longer answer
+    hits = index.search("faqs", "refunds", top_k=5)
+    assert [hit.id for hit in hits] == ["1"]
+    hits = index.search("faqs", "refunds refund", top_k=5)
+    assert [hit.id for hit in hits] == ["1", "2"]
+    assert hits[0].score > hits[1].score > 0
+
+    # "plan" is in two entries, "billing" in one: the rarer term decides the order
+    hits = index.search("faqs", "billing plan", top_k=5)
+    assert [hit.id for hit in hits][0] == "2"
+    assert {hit.id for hit in hits} == {"2", "4"}
+
+    assert index.search("faqs", "the of and", top_k=5) == []
+    assert len(index.search("faqs", "refunds refund plan", top_k=1)) == 1
+
+
+def test_update_replaces_postings_and_keeps_chunk_index(db):
+    index = LexicalIndex(db)
+    index.update("faqs", faqs(db), chunk_indexes=[10, 11, 12, 13])
+    db.commit()
+    assert index.search("faqs", "api-key", top_k=1)[0].metadata["chunk_index"] == 12
+
+    entry = db.get(FAQEntry, 3)
+    entry.answer = "Generate a token from the developer portal."
+    index.update("faqs", [entry], chunk_indexes=[12])
+    db.commit()
+    assert index.search("faqs", "dashboard settings", top_k=5) == []
+    assert [hit.id for hit in index.search("faqs", "token", top_k=5)] == ["3"]
+
+
+def test_reset_only_clears_one_collection(db):
+    index = LexicalIndex(db)
+    index.update("faqs", faqs(db))
+    index.update("other", faqs(db))
+    db.commit()
+
+    index.reset("faqs")
+    db.commit()
+
+    assert not index.has_collection("faqs")
+    assert index.search("faqs", "refunds", top_k=5) == []
+    assert index.has_collection("other")
+    assert [hit.id for hit in index.search("other", "refunds", top_k=5)] == ["1"]
+
+
+def test_backfill_indexes_recorded_entries(db):
+    sync = CollectionSync(db)
+    entries = faqs(db)
+    sync.record("faqs", entries[:3], chunk_indexes=[0, 1, 5])
+    # A collection synced before it had a lexical index
+    sync.lexical.reset("faqs")
+    db.commit()
+
+    sync.backfill_lexical("faqs", entries)
+
+    assert sync.lexical.has_collection("faqs")
+    hit = sync.lexical.search("faqs", "api-key", top_k=1)[0]
+    assert hit.id == "3" and hit.metadata["chunk_index"] == 5
+    # Entry 4 was never synced, so it is not backfilled either
+    assert sync.lexical.search("faqs", "payment", top_k=5) == []
+
+    # With an index in place, backfill leaves it alone
+    sync.lexical.remove("faqs", ["1"])
+    db.commit()
+    sync.backfill_lexical("faqs", entries)
+    assert sync.lexical.search("faqs", "refunds", top_k=5) == []
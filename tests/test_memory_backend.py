@@ -0,0 +1,122 @@
+import numpy as np
+import pytest
+
+from app.vector_db_service.clients import memory
+from app.vector_db_service.clients.memory import LOG_FILE_NAME, VECTORS_FILE_NAME, MemoryDBClient
+from app.vector_db_service.models import DocumentBatch
+
+DIM = 8
+
+
+def unit_vectors(count, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def batch(ids, vectors, sections=None):
+    sections = sections or ["a"] * len(ids)
+    return DocumentBatch(
+        ids=list(ids),
+        texts=[f"text {doc_id}" for doc_id in ids],
+        embeddings=vectors,
+        metadatas=[{"section": section} for section in sections],
+    )
+
+
+@pytest.fixture
+def client(tmp_path):
+    client = MemoryDBClient(persistence_path=str(tmp_path))
+    assert client.connect()
+    assert client.create_collection("faqs", DIM)
+    return client
+
+
+def test_ingest_and_search(client):
+    vectors = unit_vectors(5)
+    assert client.ingest_documents("faqs", batch([str(i) for i in range(5)], vectors))
+
+    results = client.search_batch("faqs", vectors, top_k=2)
+    assert [hits[0].id for hits in results] == [str(i) for i in range(5)]
+    assert results[0][0].score == pytest.approx(1.0, abs=1e-5)
+    assert client.count_documents("faqs") == 5
+
+
+def test_upsert_replaces_and_delete_removes(client):
+    vectors = unit_vectors(4)
+    client.ingest_documents("faqs", batch(["0", "1", "2"], vectors[:3]))
+    client.ingest_documents("faqs", batch(["1"], vectors[3:], sections=["b"]))
+    assert client.count_documents("faqs") == 3
+    assert client.search("faqs", vectors[3], top_k=1)[0].id == "1"
+    assert all(hit.id != "1" for hit in client.search("faqs", vectors[1], top_k=3) if hit.score > 0.999)
+
+    assert client.delete_documents("faqs", ["0", "missing"])
+    assert client.count_documents("faqs") == 2
+    assert all(hit.id != "0" for hit in client.search("faqs", vectors[0], top_k=3))
+
+
+def test_filtered_search(client):
+    vectors = unit_vectors(4)
+    client.ingest_documents("faqs", batch(["0", "1", "2", "3"], vectors, sections=["a", "b", "a", "b"]))
+
+    hits = client.search("faqs", vectors[0], top_k=4, filters={"section": "b"})
+    assert sorted(hit.id for hit in hits) == ["1", "3"]
+
+
+def test_writes_are_logged_not_resnapshotted(client, tmp_path):
+    snapshot = tmp_path / "faqs" / VECTORS_FILE_NAME
+    mtime = snapshot.stat().st_mtime_ns
+    vectors = unit_vectors(6)
+
+    client.ingest_documents("faqs", batch(["0", "1", "2"], vectors[:3]))
+    client.ingest_documents("faqs", batch(["3", "4", "5"], vectors[3:]))
+    client.delete_documents("faqs", ["1"])
+
+    assert snapshot.stat().st_mtime_ns == mtime
+    assert (tmp_path / "faqs" / LOG_FILE_NAME).exists()
+
+    # A fresh client replays the log over the snapshot
+    reopened = MemoryDBClient(persistence_path=str(tmp_path))
+    assert reopened.count_documents("faqs") == 5
+    assert reopened.search("faqs", vectors[4], top_k=1)[0].id == "4"
+
+
+def test_log_is_folded_into_a_snapshot(client, tmp_path, monkeypatch):
+    monkeypatch.setattr(memory, "MEMORY_DB_SNAPSHOT_BYTES", 0)
+    vectors = unit_vectors(3)
+    client.ingest_documents("faqs", batch(["0", "1", "2"], vectors))
+
+    # The first write outgrows the empty snapshot, so it is folded in at once
+    assert not (tmp_path / "faqs" / LOG_FILE_NAME).exists()
+    assert MemoryDBClient(persistence_path=str(tmp_path)).count_documents("faqs") == 3
+
+
+def test_close_snapshots_pending_writes(client, tmp_path):
+    vectors = unit_vectors(3)
+    client.ingest_documents("faqs", batch(["0", "1", "2"], vectors))
+    client.close()
+
+    assert not (tmp_path / "faqs" / LOG_FILE_NAME).exists()
+    reopened = MemoryDBClient(persistence_path=str(tmp_path))
+    assert reopened.count_documents("faqs") == 3
+    assert reopened.search("faqs", vectors[2], top_k=1)[0].id == "2"
+
+
+def test_torn_log_record_is_dropped(client, tmp_path):
+    vectors = unit_vectors(4)
+    client.ingest_documents("faqs", batch(["0", "1"], vectors[:2]))
+    log_path = tmp_path / "faqs" / LOG_FILE_NAME
+    complete = log_path.stat().st_size
+    client.ingest_documents("faqs", batch(["2", "3"], vectors[2:]))
+    with open(log_path, "r+b") as f:
+        f.truncate(log_path.stat().st_size - 5)
+
+    reopened = MemoryDBClient(persistence_path=str(tmp_path))
+    assert reopened.count_documents("faqs") == 2
+    assert log_path.stat().st_size == complete
+
+
+def test_delete_collection_removes_files(client, tmp_path):
+    client.ingest_documents("faqs", batch(["0"], unit_vectors(1)))
+    assert client.delete_collection("faqs")
+    assert not (tmp_path / "faqs").exists()
+    assert client.count_documents("faqs") == 0
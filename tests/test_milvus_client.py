@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pymilvus")
+
+from pymilvus import DataType, FieldSchema
+
+from app.vector_db_service.clients.milvus import MilvusDBClient, compile_filter
+from app.vector_db_service.models import DocumentBatch
+
+
+def fake_collection(section_max_length):
+    fields = [
+        FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=100),
+        FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=65535),
+        FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=4),
+        FieldSchema(name="section", dtype=DataType.VARCHAR, max_length=section_max_length),
+        FieldSchema(name="chunk_index", dtype=DataType.INT64),
+        FieldSchema(name="metadata", dtype=DataType.JSON),
+    ]
+    return SimpleNamespace(schema=SimpleNamespace(fields=fields))
+
+
+def batch_with_sections(*sections):
+    return DocumentBatch(
+        ids=[str(i) for i in range(len(sections))],
+        texts=["text"] * len(sections),
+        embeddings=np.ones((len(sections), 4), dtype=np.float32),
+        metadatas=[{"section": section, "chunk_index": i} for i, section in enumerate(sections)],
+    )
+
+
+def test_long_sections_are_truncated_to_the_column_limit():
+    long_section = "é" * 300  # 600 bytes
+    entities = MilvusDBClient()._to_entities(fake_collection(512), batch_with_sections("Intro", long_section))
+
+    sections = entities[3]
+    assert sections[0] == "Intro"
+    assert sections[1] == "é" * 256
+    assert len(sections[1].encode("utf-8")) <= 512
+    # The JSON metadata keeps the full value
+    assert entities[5][1]["section"] == long_section
+
+
+def test_filters_on_values_longer_than_the_column_use_json():
+    assert compile_filter({"section": "Intro"}) == 'section == "Intro"'
+
+    long_section = "x" * 600
+    assert compile_filter({"section": long_section}, varchar_max_lengths={"section": 512}) == \
+        f'metadata["section"] == "{long_section}"'
+    assert compile_filter({"section": {"$in": ["a", long_section]}}, varchar_max_lengths={"section": 512}) == \
+        f'metadata["section"] in ["a", "{long_section}"]'
+    assert compile_filter({"section": long_section}) == f'section == "{long_section}"'
@@ -0,0 +1,25 @@
+"""
+ONNX Runtime embeddings must match the SentenceTransformer reference.
+
+Loads (and on first run exports) the default embedding model, so it needs
+onnxruntime, torch and sentence-transformers and the model weights.
+"""
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+pytest.importorskip("sentence_transformers")
+
+from app.embedding_service.benchmark import (
+    check_onnx_parity,
+    FP32_PARITY_THRESHOLD,
+    INT8_PARITY_THRESHOLD,
+)
+
+
+def test_onnx_fp32_matches_torch():
+    assert check_onnx_parity(threshold=FP32_PARITY_THRESHOLD) > FP32_PARITY_THRESHOLD
+
+
+def test_onnx_int8_matches_torch():
+    assert check_onnx_parity(quantize=True, threshold=INT8_PARITY_THRESHOLD) > INT8_PARITY_THRESHOLD
@@ -0,0 +1,49 @@
+import asyncio
+
+import numpy as np
+from qdrant_client.http import models
+
+from app.vector_db_service.clients.qdrant import QdrantDBClient
+
+
+class BlockingClient:
+    """Sync client that must not be touched from the event loop."""
+
+    def get_collection(self, collection_name):
+        raise AssertionError("synchronous get_collection called from async search")
+
+
+class FakeAsyncClient:
+    def __init__(self):
+        self.collection_reads = 0
+        self.requests = []
+
+    async def get_collection(self, collection_name):
+        self.collection_reads += 1
+        config = models.CollectionConfig.model_construct(
+            params=models.CollectionParams.model_construct(on_disk_payload=False),
+            quantization_config=models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8)
+            )
+        )
+        return models.CollectionInfo.model_construct(config=config)
+
+    async def query_batch_points(self, collection_name, requests):
+        self.requests.extend(requests)
+        return [models.QueryResponse(points=[]) for _ in requests]
+
+
+def test_async_search_reads_collection_config_without_blocking():
+    client = QdrantDBClient()
+    client._client = BlockingClient()
+    client._async_client = FakeAsyncClient()
+
+    async def search_twice():
+        await client.asearch_batch("faqs", np.ones((2, 4), dtype=np.float32), top_k=3)
+        await client.asearch("faqs", np.ones(4, dtype=np.float32), top_k=3)
+
+    asyncio.run(search_twice())
+
+    assert client._async_client.collection_reads == 1
+    assert all(request.params.quantization.rescore for request in client._async_client.requests)
+    assert len(client._async_client.requests) == 3
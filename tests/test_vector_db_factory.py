@@ -0,0 +1,53 @@
+import shutil
+
+import pytest
+
+from app.vector_db_service.factory import VectorDBClientFactory
+
+
+@pytest.fixture(autouse=True)
+def fresh_factory():
+    VectorDBClientFactory.shutdown()
+    yield
+    VectorDBClientFactory.shutdown()
+
+
+def test_same_config_returns_same_client(tmp_path):
+    first = VectorDBClientFactory.get_connected_client("memory", persistence_path=str(tmp_path))
+    second = VectorDBClientFactory.get_connected_client("MEMORY", persistence_path=str(tmp_path))
+    assert first is second
+
+    other = VectorDBClientFactory.get_connected_client("memory", persistence_path=str(tmp_path / "other"))
+    assert other is not first
+
+
+def test_failed_health_check_reconnects(tmp_path):
+    path = tmp_path / "store"
+    first = VectorDBClientFactory.get_connected_client("memory", persistence_path=str(path))
+
+    # A passing probe keeps the cached client.
+    VectorDBClientFactory._checked_at.clear()
+    assert VectorDBClientFactory.get_connected_client("memory", persistence_path=str(path)) is first
+
+    # Removing the directory fails the probe; connect() recreates it.
+    shutil.rmtree(path)
+    VectorDBClientFactory._checked_at.clear()
+    second = VectorDBClientFactory.get_connected_client("memory", persistence_path=str(path))
+    assert second is not first
+    assert path.is_dir()
+    assert VectorDBClientFactory._retired == [first]
+    assert VectorDBClientFactory.get_connected_client("memory", persistence_path=str(path)) is second
+
+
+def test_probe_is_skipped_within_interval(tmp_path, monkeypatch):
+    client = VectorDBClientFactory.get_connected_client("memory", persistence_path=str(tmp_path))
+    monkeypatch.setattr(client, "health_check", lambda: pytest.fail("probed within the interval"))
+    assert VectorDBClientFactory.get_connected_client("memory", persistence_path=str(tmp_path)) is client
+
+
+def test_connect_failure_raises_connection_error(tmp_path):
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    with pytest.raises(ConnectionError):
+        VectorDBClientFactory.get_connected_client("memory", persistence_path=str(blocker / "store"))
+    assert VectorDBClientFactory._clients == {}
@@ -0,0 +1,40 @@
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("weaviate")
+
+from app.vector_db_service.clients import weaviate as weaviate_client
+from app.vector_db_service.clients.weaviate import WeaviateDBClient
+
+
+class FakeBatch:
+    def __init__(self, failed=0):
+        self.failed = failed
+        self.calls = []
+
+    def delete_objects(self, class_name, where, output="minimal"):
+        self.calls.append((class_name, where))
+        return {"results": {"matches": len(where["valueTextArray"]), "failed": self.failed}}
+
+
+def client_with(batch):
+    client = WeaviateDBClient()
+    client._client = SimpleNamespace(batch=batch)
+    return client
+
+
+def test_delete_documents_batches_ids(monkeypatch):
+    monkeypatch.setattr(weaviate_client, "WEAVIATE_DELETE_BATCH_SIZE", 2)
+    batch = FakeBatch()
+
+    assert client_with(batch).delete_documents("agent_1_faqs", ["a", "b", "c", "d", "e"])
+
+    assert [where["valueTextArray"] for _, where in batch.calls] == [["a", "b"], ["c", "d"], ["e"]]
+    assert {class_name for class_name, _ in batch.calls} == {"VectorDB_Agent1Faqs"}
+    assert all(where["path"] == ["id"] and where["operator"] == "ContainsAny" for _, where in batch.calls)
+
+
+def test_delete_documents_reports_failures():
+    assert not client_with(FakeBatch(failed=1)).delete_documents("faqs", ["a"])
+    assert client_with(FakeBatch()).delete_documents("faqs", []) is True